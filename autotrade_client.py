@@ -10,12 +10,13 @@ CDP клиент для sklad.autotrade.su - подключается к уже
 import asyncio
 import logging
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from playwright.async_api import TimeoutError as PlaywrightTimeout
 
 from base_browser_client import BaseBrowserClient
 from config import AUTOTRADE_EMAIL, AUTOTRADE_PASSWORD
+from offline_parsers import autotrade_has_no_results, parse_autotrade_rows, parse_autotrade_html
 
 logger = logging.getLogger(__name__)
 
@@ -140,21 +141,6 @@ class AutoTradeClient(BaseBrowserClient):
             logger.error(f"[autotrade] Ошибка автологина: {e}")
             return False
 
-    async def keep_alive(self) -> None:
-        """Keep-alive для sklad.autotrade.su."""
-        try:
-            logger.debug("[autotrade] Keep-alive ping...")
-
-            await self.page.evaluate('''
-                fetch("https://sklad.autotrade.su/", {method: "HEAD", credentials: "include"})
-                    .catch(() => {});
-            ''')
-
-            logger.debug("[autotrade] Keep-alive OK")
-
-        except Exception as e:
-            logger.warning(f"[autotrade] Keep-alive ошибка: {e}")
-
     # ========== Методы поиска ==========
 
     async def search_part(self, partnumber: str, brand_filter: str = None) -> Dict[str, Any]:
@@ -170,6 +156,13 @@ class AutoTradeClient(BaseBrowserClient):
                 f"{self.BASE_URL}/search/?type=article&q={partnumber}"
                 f"&mode=by_full_article&page=1&limit=20&cross=1&replace=1&bycross=0&related=1"
             )
+
+            # Быстрый путь: fetch() в уже открытой странице + offline парсер
+            if self.FETCH_SEARCH:
+                result = await self._search_via_fetch(partnumber, search_url, brand_filter)
+                if result:
+                    return result
+
             logger.info(f"[autotrade] Переход: {search_url}")
 
             await self.page.goto(search_url, wait_until='domcontentloaded', timeout=30000)
@@ -212,6 +205,7 @@ class AutoTradeClient(BaseBrowserClient):
                     'status': 'NO_RESULTS',
                     'prices': None,
                     'brand': brand,
+                    'offers': data.get('offers', []),
                     'url': self.page.url
                 }
 
@@ -224,6 +218,7 @@ class AutoTradeClient(BaseBrowserClient):
                 },
                 'brand': brand,
                 'items': items,
+                'offers': data.get('offers', []),
                 'url': self.page.url
             }
 
@@ -231,6 +226,51 @@ class AutoTradeClient(BaseBrowserClient):
             logger.error(f"[autotrade] Ошибка поиска: {e}")
             raise
 
+    async def _search_via_fetch(self, partnumber: str, search_url: str, brand_filter: str = None) -> Optional[Dict[str, Any]]:
+        """Поиск через fetch() без навигации. None - нужен обычный путь через page.goto."""
+        response = await self.fetch_in_page(search_url)
+        if not response or response['status'] != 200:
+            return None
+
+        html = response['text']
+        # Без признаков авторизации цены не показываются - пусть обычный путь перелогинится
+        if 'logout' not in html.lower() and 'Выход' not in html:
+            logger.info("[autotrade] fetch: нет признаков авторизации, переходим на обычный поиск")
+            return None
+
+        data = parse_autotrade_html(html, brand_filter=brand_filter)
+        # Ни таблицы результатов, ни сообщения "ничего не найдено" - это не ответ
+        # "товара нет" (его закэширует негативный кэш), а повод загрузить страницу
+        if not data['no_results'] and not data['has_results']:
+            logger.info("[autotrade] fetch: нет ни результатов, ни сообщения об их отсутствии, переходим на обычный поиск")
+            return None
+
+        logger.info(f"[autotrade] Поиск (fetch): {partnumber}, найдено {len(data['prices'])} цен")
+
+        if data['no_results'] or not data['prices']:
+            return {
+                'partnumber': partnumber,
+                'status': 'NO_RESULTS',
+                'prices': None,
+                'brand': data['brand'],
+                'offers': data['offers'],
+                'url': search_url
+            }
+
+        prices = data['prices']
+        return {
+            'partnumber': partnumber,
+            'status': 'DONE',
+            'prices': {
+                'min': min(prices),
+                'avg': round(sum(prices) / len(prices), 2)
+            },
+            'brand': data['brand'],
+            'items': data['items'],
+            'offers': data['offers'],
+            'url': search_url
+        }
+
     async def search_part_with_retry(self, partnumber: str, brand_filter: str = None, max_retries: int = 3) -> Dict[str, Any]:
         """Поиск с retry."""
         for attempt in range(max_retries):
@@ -274,27 +314,12 @@ class AutoTradeClient(BaseBrowserClient):
         """
         try:
             page_text = await self.page.inner_text('body')
-            page_text_lower = page_text.lower()
 
             # Логируем первые 500 символов для отладки
             logger.info(f"[autotrade] Текст страницы (первые 500 символов): {page_text[:500]}")
 
-            no_results_indicators = [
-                'по вашему запросу ничего не найдено',
-                'ничего не найдено',
-                'нет результатов',
-                'ничего',  # Простой маркер
-                'no results',
-            ]
-
-            for indicator in no_results_indicators:
-                if indicator in page_text_lower:
-                    logger.info(f"[autotrade] Найдено сообщение об отсутствии результатов: '{indicator}'")
-                    return True
-
-            # Дополнительная проверка: если нет таблицы с "Артикул:" - значит нет результатов
-            if 'артикул:' not in page_text_lower:
-                logger.info("[autotrade] Не найден маркер 'Артикул:' - считаем что нет результатов")
+            if autotrade_has_no_results(page_text):
+                logger.info("[autotrade] Найдено сообщение об отсутствии результатов или нет маркера 'Артикул:'")
                 return True
 
             return False
@@ -314,110 +339,42 @@ class AutoTradeClient(BaseBrowserClient):
         prices = []
         brand = None
         items = []
-        filtered_count = 0
-        total_count = 0
+        offers = []
 
         try:
             # Получаем весь текст страницы для парсинга
             body_text = await self.page.inner_text('body')
 
-            # Ищем строки с данными о товарах
-            # Формат: "Артикул: XXX, Бренд: YYY, Страна: ZZZ"
-            article_pattern = r'Артикул:\s*([A-Za-z0-9\-\.]+)'
-            brand_pattern = r'Бренд:\s*([A-Za-zА-Яа-я0-9\-\s]+?)(?:,|$|\|)'
-            country_pattern = r'Страна:\s*([А-Яа-я]+)'
-            price_pattern = r'(\d[\d\s,\.]*)\s*RUB'
-
-            # Извлекаем артикул
-            article_match = re.search(article_pattern, body_text)
-            if article_match:
-                article = article_match.group(1).strip()
-                logger.info(f"[autotrade] Найден артикул: {article}")
-
-            # Извлекаем бренд
-            brand_match = re.search(brand_pattern, body_text)
-            if brand_match:
-                brand = brand_match.group(1).strip()
-                logger.info(f"[autotrade] Найден бренд: {brand}")
-
-            # НЕ извлекаем цены из всего body_text - там может быть баланс счёта!
-            # Цены извлекаем ТОЛЬКО из строк таблицы с "Артикул:"
-
-            # Ищем наличие и цены ТОЛЬКО в строках с товарами
-            stock_values = []
+            # Цены берём ТОЛЬКО из строк таблиц с "Артикул:" (не баланс счёта)
+            row_texts = []
             tables = self.page.locator('table')
             tables_count = await tables.count()
 
             for t_idx in range(tables_count):
-                table = tables.nth(t_idx)
-                rows = table.locator('tr')
+                rows = tables.nth(t_idx).locator('tr')
                 rows_count = await rows.count()
-
                 for r_idx in range(rows_count):
-                    row = rows.nth(r_idx)
-                    row_text = await row.inner_text()
-
-                    # ВАЖНО: Парсим цены ТОЛЬКО из строк с "Артикул:" (это строки товаров)
-                    # Это исключает парсинг баланса счёта из левой панели
-                    if 'Артикул:' not in row_text:
-                        continue
-                        # Извлекаем цену из этой строки
-                        row_price_match = re.search(r'(\d[\d\s,\.]*)\s*RUB', row_text)
-                        if row_price_match:
-                            try:
-                                price_str = row_price_match.group(1).replace(" ", "").replace("\xa0", "").replace(",", ".")
-                                price_val = float(price_str)
-                                if 10 < price_val < 500000 and price_val not in prices:
-                                    prices.append(price_val)
-                            except ValueError:
-                                pass
-
-                        # Извлекаем наличие (числа после описания товара)
-                        # Формат: "... | 11 | 22 | - | - |..."
-                        stock_matches = re.findall(r'\|\s*(\d+)\s*\|', row_text)
-                        for sm in stock_matches:
-                            try:
-                                stock = int(sm)
-                                if 0 < stock < 10000:
-                                    stock_values.append(stock)
-                            except ValueError:
-                                pass
-
-                        # Также ищем наличие в формате табуляции
-                        parts = row_text.split('\t')
-                        for part in parts:
-                            part = part.strip()
-                            if re.match(r'^\d+$', part):
-                                try:
-                                    stock = int(part)
-                                    if 0 < stock < 10000:
-                                        stock_values.append(stock)
-                                except ValueError:
-                                    pass
-
-            # Убираем дубликаты
-            prices = list(set(prices))
-            stock_values = list(set(stock_values))
+                    row_texts.append(await rows.nth(r_idx).inner_text())
 
-            if prices:
-                logger.info(f"[autotrade] Найдено {len(prices)} цен: {sorted(prices)[:5]}...")
+            data = parse_autotrade_rows(row_texts, body_text, brand_filter=brand_filter)
+            prices = data['prices']
+            brand = data['brand']
+            items = data['items']
+            offers = data['offers']
 
-            if stock_values:
-                logger.info(f"[autotrade] Наличие: {stock_values[:10]}")
+            if brand:
+                logger.info(f"[autotrade] Найден бренд: {brand}")
 
-            # Формируем items
             if prices:
-                items.append({
-                    'article': article_match.group(1).strip() if article_match else None,
-                    'brand': brand,
-                    'price': min(prices) if prices else None,
-                    'stock': sum(stock_values) if stock_values else None,
-                })
+                logger.info(f"[autotrade] Найдено {len(prices)} цен: {sorted(prices)[:5]}...")
+
+            if items and items[0].get('stock'):
+                logger.info(f"[autotrade] Наличие: {items[0]['stock']}")
 
         except Exception as e:
             logger.error(f"[autotrade] Ошибка извлечения данных: {e}")
 
-        return {'prices': prices, 'brand': brand, 'items': items}
+        return {'prices': prices, 'brand': brand, 'items': items, 'offers': offers}
 
     async def _extract_from_cards(self, brand_filter: str = None) -> Dict[str, Any]:
         """Извлечь данные из карточного формата (если не таблица)."""
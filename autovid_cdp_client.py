@@ -13,12 +13,12 @@ CDP клиент для auto-vid.com - подключается к уже зап
 
 import asyncio
 import logging
-import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from playwright.async_api import async_playwright
 from base_browser_client import BaseBrowserClient
 from config import AUTOVID_LOGIN, AUTOVID_PASSWORD, COOKIES_BACKUP_DIR
+from offline_parsers import autovid_is_logged_in, parse_autovid_html, parse_autovid_products
 
 logger = logging.getLogger(__name__)
 
@@ -44,17 +44,11 @@ class AutoVidCDPClient(BaseBrowserClient):
                 '--disable-blink-features=AutomationControlled',
                 '--no-first-run',
                 '--disable-infobars',
-                '--window-size=1920,1080',
             ]
 
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=launch_args
-            )
-
             # Создаём контекст с реалистичными настройками
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
+            await self._launch_context(
+                launch_args,
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 locale='ru-RU',
                 timezone_id='Europe/Moscow',
@@ -64,9 +58,6 @@ class AutoVidCDPClient(BaseBrowserClient):
                     'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
                 }
             )
-            # Блокируем изображения, CSS и шрифты для ускорения
-            await self.context.route("**/*.{png,jpg,jpeg,gif,webp,css,woff,woff2}", lambda route: route.abort())
-            logger.info(f"[{self.SITE_NAME}] Создан контекст браузера с блокировкой ресурсов")
 
             # Anti-detection
             await self.context.add_init_script("""
@@ -77,7 +68,7 @@ class AutoVidCDPClient(BaseBrowserClient):
             await self._load_cookies_from_backup()
 
             # Create page
-            self.page = await self.context.new_page()
+            self.page = self._track_page(await self._new_work_page())
 
             self.is_connected = True
             logger.info(f"[{self.SITE_NAME}] Подключение установлено (headless режим)")
@@ -108,8 +99,7 @@ class AutoVidCDPClient(BaseBrowserClient):
                 'text="Выйти"',
                 'text="Личный кабинет"',
                 'text="Мой аккаунт"',
-                '[href*="logout"]',
-                '[href*="my-account"]',
+                '[href*="logout"]',  # ссылка на my-account есть и у гостя - не признак
                 '.logged-in',
                 '.woocommerce-MyAccount-navigation',
             ]
@@ -317,21 +307,6 @@ class AutoVidCDPClient(BaseBrowserClient):
             logger.error(f"[{self.SITE_NAME}] Ошибка автологина: {e}")
             return False
 
-    async def keep_alive(self) -> None:
-        """Keep-alive для auto-vid.com."""
-        try:
-            logger.debug(f"[{self.SITE_NAME}] Keep-alive: проверка сессии...")
-
-            await self.page.evaluate('''
-                fetch("/", {method: "HEAD", credentials: "include"})
-                    .catch(() => {});
-            ''')
-
-            logger.debug(f"[{self.SITE_NAME}] Keep-alive OK")
-
-        except Exception as e:
-            logger.warning(f"[{self.SITE_NAME}] Keep-alive ошибка: {e}")
-
     # ========== Методы поиска ==========
 
     async def search_part(self, partnumber: str, brand_filter: str = None) -> Dict[str, Any]:
@@ -342,6 +317,12 @@ class AutoVidCDPClient(BaseBrowserClient):
             brand_filter: Фильтр по бренду (необязательно)
         """
         try:
+            # Быстрый путь: fetch() в уже открытой странице + offline парсер
+            if self.FETCH_SEARCH:
+                result = await self._search_via_fetch(partnumber, brand_filter)
+                if result:
+                    return result
+
             # Сначала переходим на главную страницу
             await self.page.goto(self.BASE_URL, wait_until='load', timeout=60000)
             await self.page.wait_for_timeout(3000)
@@ -403,6 +384,7 @@ class AutoVidCDPClient(BaseBrowserClient):
                     'status': 'not_found',
                     'prices': {'min': None, 'avg': None},
                     'brand': brand,
+                    'offers': data['offers'],
                     'url': self.page.url
                 }
 
@@ -414,6 +396,7 @@ class AutoVidCDPClient(BaseBrowserClient):
                     'avg': round(sum(prices) / len(prices), 2)
                 },
                 'brand': brand,
+                'offers': data['offers'],
                 'url': self.page.url
             }
 
@@ -426,6 +409,51 @@ class AutoVidCDPClient(BaseBrowserClient):
                 'error': str(e)
             }
 
+    async def _search_via_fetch(self, partnumber: str, brand_filter: str = None) -> Optional[Dict[str, Any]]:
+        """Поиск через fetch() без навигации. None - нужен обычный путь через page.goto."""
+        search_url = f"{self.BASE_URL}/?s={partnumber}&post_type=product"
+        response = await self.fetch_in_page(search_url)
+        if not response or response['status'] != 200:
+            return None
+
+        html = response['text']
+        # Без авторизации цены скрыты - пусть обычный путь перелогинится
+        if not autovid_is_logged_in(html):
+            logger.info(f"[{self.SITE_NAME}] fetch: нет признаков авторизации, переходим на обычный поиск")
+            return None
+
+        data = parse_autovid_html(html, brand_filter=brand_filter)
+        prices = data['prices']
+        logger.info(f"[{self.SITE_NAME}] Поиск (fetch): {partnumber}, товаров {data['filtered']}/{data['total']}, цен {len(prices)}")
+
+        # Нет карточек без сообщения "ничего не найдено" (редирект на карточку товара,
+        # другая вёрстка) или карточки без цен - не ответ "товара нет", а повод загрузить страницу
+        if not data['no_results'] and not data['offers']:
+            logger.info(f"[{self.SITE_NAME}] fetch: товары без цен или нет результатов, переходим на обычный поиск")
+            return None
+
+        if not prices:
+            return {
+                'partnumber': partnumber,
+                'status': 'not_found',
+                'prices': {'min': None, 'avg': None},
+                'brand': data['brand'],
+                'offers': data['offers'],
+                'url': response['url']
+            }
+
+        return {
+            'partnumber': partnumber,
+            'status': 'success',
+            'prices': {
+                'min': min(prices),
+                'avg': round(sum(prices) / len(prices), 2)
+            },
+            'brand': data['brand'],
+            'offers': data['offers'],
+            'url': response['url']
+        }
+
     async def search_part_with_retry(self, partnumber: str, brand_filter: str = None, max_retries: int = 3) -> Dict[str, Any]:
         """Поиск с повторными попытками."""
         for attempt in range(1, max_retries + 1):
@@ -444,6 +472,7 @@ class AutoVidCDPClient(BaseBrowserClient):
     async def _extract_prices_and_brand(self, brand_filter: str = None) -> Dict[str, Any]:
         """Извлечь цены и бренд из результатов поиска WooCommerce."""
         prices = []
+        offers = []
         brand = None
         total_count = 0
         filtered_count = 0
@@ -455,7 +484,7 @@ class AutoVidCDPClient(BaseBrowserClient):
             page_text = await self.page.inner_text('body')
             if 'ничего не найдено' in page_text.lower() or 'no products' in page_text.lower():
                 logger.info(f"[{self.SITE_NAME}] Товары не найдены")
-                return {'prices': [], 'brand': None}
+                return {'prices': [], 'brand': None, 'offers': []}
 
             # WooCommerce структура - различные селекторы для товаров
             product_selectors = [
@@ -480,67 +509,27 @@ class AutoVidCDPClient(BaseBrowserClient):
                 products = await self.page.locator('.product-layout, .product-thumb').all()
                 logger.info(f"[{self.SITE_NAME}] Найдено {len(products)} товаров (OpenCart)")
 
-            # Обрабатываем найденные товары
+            # Собираем тексты карточек, разбор - в offline_parsers (общий с fetch-путём)
+            product_data = []
             for product in products:
                 try:
                     product_text = await product.inner_text()
-                    total_count += 1
-
-                    # ФИЛЬТР: Проверяем наличие на складе
-                    # Пропускаем товары "Нет в наличии"
-                    out_of_stock_markers = ['нет в наличии', 'нет на складе', 'out of stock', 'недоступен']
-                    is_out_of_stock = any(marker in product_text.lower() for marker in out_of_stock_markers)
-                    if is_out_of_stock:
-                        logger.debug(f"[{self.SITE_NAME}] Товар пропущен (нет в наличии)")
-                        continue
-
-                    # ФИЛЬТР: Проверяем бренд
-                    if brand_filter:
-                        if brand_filter.lower() not in product_text.lower():
-                            logger.debug(f"[{self.SITE_NAME}] Товар пропущен (бренд не совпадает): {product_text[:50]}...")
-                            continue
-
-                    filtered_count += 1
-
-                    # Сохраняем бренд
-                    if not brand and brand_filter:
-                        brand = brand_filter
-
-                    # Извлекаем цену
+                    price_text = ''
                     price_el = product.locator('.price, .price-new, [class*="price"]').first
                     if await price_el.count() > 0:
                         price_text = await price_el.inner_text()
-
-                        # Берём все цены и выбираем минимальную (актуальную)
-                        price_matches = re.findall(r'([\d\s\xa0,.]+)\s*[₽руб]', price_text)
-                        for price_str in price_matches:
-                            try:
-                                price_clean = price_str.replace(" ", "").replace("\xa0", "").replace(",", ".").strip()
-                                if price_clean:
-                                    val = float(price_clean)
-                                    # Снизили минимум до 10₽ для дешёвых товаров
-                                    if 10 < val < 500000:
-                                        prices.append(val)
-                                        logger.debug(f"[{self.SITE_NAME}] Найдена цена: {val}₽")
-                            except ValueError:
-                                continue
-                    else:
-                        # Fallback: ищем цену в тексте товара
-                        price_matches = re.findall(r'([\d\s\xa0,.]+)\s*[₽руб]', product_text)
-                        for price_str in price_matches:
-                            try:
-                                price_clean = price_str.replace(" ", "").replace("\xa0", "").replace(",", ".").strip()
-                                if price_clean:
-                                    val = float(price_clean)
-                                    if 10 < val < 500000:
-                                        prices.append(val)
-                            except ValueError:
-                                continue
-
+                    product_data.append({'text': product_text, 'price_text': price_text})
                 except Exception as e:
                     logger.debug(f"[{self.SITE_NAME}] Ошибка парсинга товара: {e}")
                     continue
 
+            data = parse_autovid_products(product_data, brand_filter=brand_filter)
+            prices = data['prices']
+            brand = data['brand']
+            offers = data['offers']
+            total_count = data['total']
+            filtered_count = data['filtered']
+
         except Exception as e:
             logger.error(f"[{self.SITE_NAME}] Ошибка извлечения данных: {e}")
 
@@ -553,7 +542,7 @@ class AutoVidCDPClient(BaseBrowserClient):
         else:
             logger.warning(f"[{self.SITE_NAME}] Цены не найдены")
 
-        return {'prices': unique_prices, 'brand': brand}
+        return {'prices': unique_prices, 'brand': brand, 'offers': offers}
 
 
 # ========== Тест ==========
@@ -1,7 +1,9 @@
 """
 API для получения списка брендов с ZZAP.
 
-Использует глобальный ZZAP клиент для быстрого получения брендов по артикулу.
+Сначала - кэш брендов (brand_cache): полный список из модального окна ZZAP
+отдаётся сразу, частичный (бренды из результатов worker'а) - сразу с обновлением
+в фоне, пустой ответ ZZAP - сразу до истечения негативного TTL. Живой запрос через глобальный ZZAP клиент - только для новых артикулов.
 """
 
 from fastapi import APIRouter, HTTPException
@@ -14,6 +16,10 @@ import asyncio
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 from zzap_cdp_client import ZZapCDPClient
+from config import CACHE_DB_PATH
+from brand_cache import COMPLETE_SOURCE, load_brands, save_brands
+from partnumbers import normalize_partnumber
+from storage import run_db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -22,6 +28,9 @@ router = APIRouter()
 _zzap_client: ZZapCDPClient = None
 _client_lock = asyncio.Lock()
 
+# Артикулы (нормализованные), для которых идёт фоновое обновление списка брендов
+_refreshing = set()
+
 
 async def get_zzap_client() -> ZZapCDPClient:
     """Получить или создать глобальный ZZAP клиент."""
@@ -52,9 +61,16 @@ async def get_brands(partnumber: str) -> List[str]:
     if not partnumber or len(partnumber) < 2:
         raise HTTPException(status_code=400, detail="Артикул должен содержать минимум 2 символа")
 
+    # Чтение и запись brand_cache - в потоке БД (run_db), не в event loop
+    cached = await run_db(load_brands, partnumber, db_path=CACHE_DB_PATH)
+    if cached is not None:
+        if not cached['complete']:
+            schedule_brands_refresh(partnumber.strip())
+        logger.info(f"[brands_api] Из кэша ({'полный' if cached['complete'] else 'частичный'}): {partnumber} -> {cached['brands']}")
+        return cached['brands']
+
     try:
-        client = await get_zzap_client()
-        brands = await client.get_brands_for_partnumber(partnumber.strip())
+        brands = await fetch_brands(partnumber.strip())
 
         if not brands:
             logger.info(f"[brands_api] Бренды не найдены для: {partnumber}")
@@ -70,6 +86,38 @@ async def get_brands(partnumber: str) -> List[str]:
         raise HTTPException(status_code=500, detail=f"Ошибка: {str(e)}")
 
 
+async def fetch_brands(partnumber: str) -> List[str]:
+    """Живой запрос брендов через модальное окно ZZAP с записью в кэш."""
+    client = await get_zzap_client()
+    async with client.page_session():
+        brands = await client.get_brands_for_partnumber(partnumber)
+    if brands:
+        client.mark_activity()
+    # Пустой список - тоже в кэш (на BRAND_CACHE_NEGATIVE_TTL_MIN): без этого каждый
+    # запрос артикула без брендов снова открывает ZZAP
+    await run_db(save_brands, partnumber, brands, COMPLETE_SOURCE, db_path=CACHE_DB_PATH)
+    client.schedule_page_recycle()
+    return brands
+
+
+def schedule_brands_refresh(partnumber: str) -> None:
+    """Дополнить частичный список брендов из ZZAP в фоне (один раз на артикул)."""
+    norm = normalize_partnumber(partnumber)
+    if norm in _refreshing:
+        return
+    _refreshing.add(norm)
+
+    async def refresh():
+        try:
+            await fetch_brands(partnumber)
+        except Exception as e:
+            logger.warning(f"[brands_api] Фоновое обновление брендов {partnumber} не удалось: {e}")
+        finally:
+            _refreshing.discard(norm)
+
+    asyncio.create_task(refresh())
+
+
 @router.on_event("shutdown")
 async def shutdown_zzap_client():
     """Закрыть ZZAP клиент при завершении."""
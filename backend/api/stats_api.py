@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+from typing import Any, Dict
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import config
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from config import DB_PATH, CACHE_DB_PATH
+from cache_stats import load_cache_stats
+from task_results import load_source_stats
+from storage import run_db
+
+router = APIRouter()
+
+DBPATH = DB_PATH
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(hours: int = 24) -> Dict[str, Any]:
+    """
+    Статистика кэша цен за N часов по источникам и окнам.
+
+    Счётчики пишет worker (раз в CACHE_STATS_FLUSH_SEC): hits (включая stale и
+    негативные), misses, stale_hits, negative_hits, saved_sec, live_count, live_sec.
+    """
+    return await run_db(load_cache_stats, hours, db_path=CACHE_DB_PATH, row_factory=None)
+
+
+@router.get("/source-stats")
+async def get_source_stats() -> Dict[str, Any]:
+    """
+    Сводка по источникам из task_source_results за всё время.
+
+    tasks - сколько раз опрошен, found - с ценой, cheapest - сколько раз дал
+    минимальную цену задачи (cheapest_share - доля от found), p50_ms/p95_ms -
+    время живого поиска (без ответов из кэша).
+    """
+    return {'sources': await run_db(load_source_stats, db_path=DBPATH, row_factory=None)}
@@ -1,23 +1,31 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional, List
-import sqlite3
+from typing import Any, Dict, Optional, List
+import asyncio
 import sys
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 # Add parent directory to path to import config
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
-from config import DB_PATH
+from config import DB_PATH, TASK_ARCHIVE_DIR
+from partnumbers import normalize_brand_key, normalize_partnumber
+from storage import run_db
+from indexes import ACTIVE_TASK_SQL, TASKS_LIST_SQL
+from migrate import describe_pending, pending_store_migrations
+from task_archive import find_archived_tasks
 
 router = APIRouter()
 
 DBPATH = DB_PATH
 
 
-def get_db():
-    conn = sqlite3.connect(str(DBPATH))
-    conn.row_factory = sqlite3.Row
-    return conn
+@router.on_event("startup")
+async def check_schema():
+    """Схема БД актуальна (все файлы хранилищ)? API DDL не выполняет - миграции применяет python migrate.py."""
+    pending = await asyncio.to_thread(pending_store_migrations)
+    if pending:
+        raise RuntimeError(describe_pending(pending))
 
 
 class TaskCreate(BaseModel):
@@ -39,76 +47,117 @@ class TaskResponse(BaseModel):
     autotrade_min_price: Optional[float] = None
     brand: Optional[str] = None
     result_url: Optional[str] = None
+    stale_sources: Optional[str] = None
     error_message: Optional[str] = None
     created_at: str
 
 
-@router.post("/tasks", response_model=TaskResponse)
-async def create_task(task: TaskCreate):
-    """Создать новую задачу"""
-    conn = get_db()
+def insert_or_get_task(conn, partnumber: str, search_brand: Optional[str]) -> dict:
+    """Вставить задачу или вернуть ожидающую/выполняющуюся с тем же ключом."""
+    # BEGIN IMMEDIATE: проверка и вставка атомарны для параллельных запросов
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute(ACTIVE_TASK_SQL, (normalize_partnumber(partnumber), normalize_brand_key(search_brand)))
+        existing = cursor.fetchone()
+        if existing:
+            task_id = existing['id']
+        else:
+            cursor.execute(
+                "INSERT INTO tasks (partnumber, partnumber_norm, search_brand, search_brand_key, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (partnumber, normalize_partnumber(partnumber), search_brand, normalize_brand_key(search_brand), "PENDING")
+            )
+            task_id = cursor.lastrowid
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+
+    return select_task(conn, task_id)
+
+
+def select_tasks(conn) -> List[dict]:
+    return [dict(row) for row in conn.execute(TASKS_LIST_SQL)]
+
+
+def select_task(conn, task_id: int) -> Optional[dict]:
+    row = conn.execute("SELECT * FROM tasks_view WHERE id = ?", (task_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def cancel_task_row(conn, task_id: int) -> dict:
+    """Пометить PENDING/RUNNING задачу как ERROR (HTTPException - если нельзя)."""
     cursor = conn.cursor()
+    cursor.execute("SELECT status FROM tasks WHERE id = ?", (task_id,))
+    row = cursor.fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    if row['status'] not in ('PENDING', 'RUNNING'):
+        raise HTTPException(status_code=400, detail=f"Cannot cancel task with status {row['status']}")
+
     cursor.execute(
-        "INSERT INTO tasks (partnumber, search_brand, status) VALUES (?, ?, ?)",
-        (task.partnumber, task.search_brand, "PENDING")
+        "UPDATE tasks SET status = 'ERROR', error_message = 'Cancelled by user' WHERE id = ?",
+        (task_id,)
     )
-    task_id = cursor.lastrowid
     conn.commit()
+    return select_task(conn, task_id)
 
-    cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row)
+
+@router.post("/tasks", response_model=TaskResponse)
+async def create_task(task: TaskCreate):
+    """
+    Создать новую задачу (идемпотентно).
+
+    Если задача с тем же артикулом (в нормализованной форме) и брендом
+    (без учёта регистра и пробелов) уже ждёт или выполняется - возвращается она, новая строка не создаётся.
+    """
+    partnumber = task.partnumber.strip()
+    search_brand = (task.search_brand or "").strip() or None
+    return await run_db(insert_or_get_task, partnumber, search_brand, db_path=DBPATH)
 
 
 @router.get("/tasks", response_model=List[TaskResponse])
 async def get_tasks():
-    """Получить все задачи"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks ORDER BY created_at DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    """Получить задачи (старые DONE/ERROR - в архиве: /api/tasks/archive)"""
+    return await run_db(select_tasks, db_path=DBPATH)
+
+
+@router.get("/tasks/archive")
+async def get_archived_tasks(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    partnumber: Optional[str] = None,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """
+    Задачи из архива (DONE/ERROR старше TASK_ARCHIVE_AFTER_DAYS, task_archive.py) за дни создания
+    [date_from, date_to] (YYYY-MM-DD, UTC; по умолчанию - последние 30 дней), новые первыми.
+
+    Формат задачи - как в /api/tasks, плюс sources - результаты источников.
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=30)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from > date_to")
+    limit = max(1, min(limit, 1000))
+    tasks = await asyncio.to_thread(find_archived_tasks, TASK_ARCHIVE_DIR, date_from, date_to, partnumber, limit)
+    return {"date_from": date_from.isoformat(), "date_to": date_to.isoformat(), "tasks": tasks}
 
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task(task_id: int):
     """Получить задачу по ID"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-    row = cursor.fetchone()
-    conn.close()
-
-    if not row:
+    task = await run_db(select_task, task_id, db_path=DBPATH)
+    if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return dict(row)
+    return task
 
 
 @router.post("/tasks/{task_id}/cancel")
 async def cancel_task(task_id: int):
     """Отменить зависшую задачу (пометить как ERROR)"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT status FROM tasks WHERE id = ?", (task_id,))
-    row = cursor.fetchone()
-
-    if not row:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Task not found")
-
-    if row['status'] not in ('PENDING', 'RUNNING'):
-        conn.close()
-        raise HTTPException(status_code=400, detail=f"Cannot cancel task with status {row['status']}")
-
-    cursor.execute(
-        "UPDATE tasks SET status = 'ERROR', error_message = 'Cancelled by user' WHERE id = ?",
-        (task_id,)
-    )
-    conn.commit()
-
-    cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row)
+    return await run_db(cancel_task_row, task_id, db_path=DBPATH)
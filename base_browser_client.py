@@ -5,18 +5,22 @@
 - Подключение к уже запущенному Chrome через CDP (remote debugging port 9222)
 - Headless режим для Docker (запуск встроенного Chromium)
 - Проверка авторизации и автологин
-- Keep-alive для поддержания сессии
+- Keep-alive для поддержания сессии (общий планировщик, только для простаивающих сайтов)
 - Backup/restore cookies в файл
+- Recycling страницы по числу навигаций, возрасту и потреблению памяти
+- Профили рендеринга на каждый сайт (viewport, анимации, service workers, таймеры)
 """
 
 import asyncio
 import json
 import logging
 import os
+import time
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 
 from playwright.async_api import (
     async_playwright,
@@ -27,13 +31,132 @@ from playwright.async_api import (
     CDPSession,
 )
 
-from config import BASEDIR, CHROME_CDP_ENDPOINT, COOKIES_BACKUP_DIR, KEEP_ALIVE_INTERVAL
+from config import (
+    BASEDIR,
+    CHROME_CDP_ENDPOINT,
+    COOKIES_BACKUP_DIR,
+    KEEP_ALIVE_INTERVAL,
+    PAGE_MAX_NAVIGATIONS,
+    PAGE_MAX_AGE_SEC,
+    PAGE_MAX_JS_HEAP_MB,
+    BROWSER_MAX_RSS_MB,
+    BROWSER_PERSISTENT_PROFILES,
+    BROWSER_PROFILES_DIR,
+    BROWSER_DISK_CACHE_MB,
+    IN_PAGE_FETCH_SEARCH,
+)
+from browser_processes import find_browser_pid, process_tree_rss_mb
 
 # Browser mode: 'cdp' (connect to external Chrome) or 'headless' (launch built-in Chromium)
 BROWSER_MODE = os.getenv("BROWSER_MODE", "cdp")
 
 logger = logging.getLogger(__name__)
 
+# Ресурсы, которые блокируются через route() в обычных (не persistent) контекстах
+BLOCKED_RESOURCES_PATTERN = "**/*.{png,jpg,jpeg,gif,webp,css,woff,woff2}"
+
+# GET через fetch() в контексте страницы: куки сессии и анти-бот куки отправляются автоматически
+IN_PAGE_FETCH_JS = """
+async ({url, timeout}) => {
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), timeout);
+    try {
+        const response = await fetch(url, {credentials: 'include', signal: controller.signal});
+        return {status: response.status, url: response.url, text: await response.text()};
+    } finally {
+        clearTimeout(timer);
+    }
+}
+"""
+
+# Профиль рендеринга по умолчанию; клиенты переопределяют отдельные ключи в RENDER_PROFILE
+DEFAULT_RENDER_PROFILE: Dict[str, Any] = {
+    # Размер окна/viewport: меньше пикселей - меньше памяти на растр и layout
+    'viewport': {'width': 1280, 'height': 800},
+    # prefers-reduced-motion: сайты отключают CSS/JS анимации
+    'reduced_motion': 'reduce',
+    # 'block' - service workers не регистрируются (и не обходят route())
+    'service_workers': 'block',
+    # Разрешить Chromium троттлить таймеры фоновых страниц
+    'throttle_background_timers': True,
+    # Emulation.setCPUThrottlingRate: 1 - без эмуляции медленного CPU
+    'cpu_throttling_rate': 1,
+}
+
+# Флаги Playwright по умолчанию, отключающие троттлинг фоновых страниц
+BACKGROUND_THROTTLING_DISABLE_ARGS = [
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+]
+
+# Статусы поиска, при которых сайт реально ответил (сессия жива)
+LIVE_RESULT_STATUSES = {'success', 'DONE', 'not_found', 'NO_RESULTS'}
+
+
+class KeepAliveScheduler:
+    """
+    Общий планировщик keep-alive для всех клиентов процесса.
+
+    Хранит время последнего успешного реального запроса по каждому сайту
+    и пингует только те сессии, что простаивали дольше KEEP_ALIVE_INTERVAL_SEC.
+    Одна фоновая задача вместо отдельного цикла в каждом клиенте.
+    """
+
+    CHECK_INTERVAL_SEC: int = 60
+
+    def __init__(self) -> None:
+        self._clients: List["BaseBrowserClient"] = []
+        self._last_activity: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, client: "BaseBrowserClient") -> None:
+        """Добавить клиент и запустить фоновую задачу при необходимости."""
+        if client not in self._clients:
+            self._clients.append(client)
+        self._last_activity.setdefault(client.SITE_NAME, time.monotonic())
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def unregister(self, client: "BaseBrowserClient") -> bool:
+        """Убрать клиент; останавливает задачу, когда клиентов не осталось."""
+        if client not in self._clients:
+            return False
+        self._clients.remove(client)
+        if not self._clients and self._task and not self._task.done():
+            self._task.cancel()
+        return True
+
+    def mark_activity(self, site: str) -> None:
+        """Запомнить время успешного реального запроса к сайту."""
+        self._last_activity[site] = time.monotonic()
+
+    def idle_seconds(self, site: str) -> float:
+        """Сколько секунд сайт простаивает без реальных запросов."""
+        return time.monotonic() - self._last_activity.get(site, 0.0)
+
+    async def _loop(self) -> None:
+        """Раз в CHECK_INTERVAL_SEC пинговать только простаивающие сессии."""
+        while self._clients:
+            try:
+                await asyncio.sleep(self.CHECK_INTERVAL_SEC)
+
+                for client in list(self._clients):
+                    if not client.is_connected or not client.context:
+                        continue
+                    if self.idle_seconds(client.SITE_NAME) < client.KEEP_ALIVE_INTERVAL_SEC:
+                        continue
+                    if await client.keep_alive():
+                        self.mark_activity(client.SITE_NAME)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"[keep-alive] Ошибка планировщика: {e}")
+
+
+keep_alive_scheduler = KeepAliveScheduler()
+
 
 class BaseBrowserClient(ABC):
     """
@@ -52,6 +175,20 @@ class BaseBrowserClient(ABC):
     KEEP_ALIVE_INTERVAL_SEC: int = KEEP_ALIVE_INTERVAL
     COOKIES_DIR: Path = COOKIES_BACKUP_DIR
 
+    # Пороги recycling страницы (0 - порог отключён)
+    PAGE_MAX_NAVIGATIONS: int = PAGE_MAX_NAVIGATIONS
+    PAGE_MAX_AGE_SEC: int = PAGE_MAX_AGE_SEC
+    PAGE_MAX_JS_HEAP_MB: int = PAGE_MAX_JS_HEAP_MB
+    BROWSER_MAX_RSS_MB: int = BROWSER_MAX_RSS_MB
+    # RSS браузера проверяется не чаще раза в N секунд (обход /proc)
+    BROWSER_RSS_CHECK_SEC: int = 60
+
+    # Поиск через fetch() внутри страницы (поддерживают не все клиенты)
+    FETCH_SEARCH: bool = IN_PAGE_FETCH_SEARCH
+
+    # Переопределения DEFAULT_RENDER_PROFILE для сайта
+    RENDER_PROFILE: Dict[str, Any] = {}
+
     def __init__(self) -> None:
         self.playwright: Optional[Playwright] = None
         self.browser: Optional[Browser] = None
@@ -60,13 +197,34 @@ class BaseBrowserClient(ABC):
         self.cdp_session: Optional[CDPSession] = None
         self.is_connected: bool = False
         self.is_logged_in: bool = False
-        self._keep_alive_task: Optional[asyncio.Task] = None
+        self._persistent_profile: bool = False
+        # False - рабочая страница - чужая вкладка внешнего Chrome (CDP режим): её не закрываем
+        self._owns_page: bool = True
+        # PID Chromium этого клиента (headless) - корень дерева процессов для RSS
+        self._browser_pid: Optional[int] = None
+        self._rss_checked_at: float = 0.0
+
+        # Recycling: страница используется эксклюзивно (поиск / подмена)
+        self._page_lock = asyncio.Lock()
+        self._page_navigations: int = 0
+        self._page_created_at: float = time.monotonic()
+        self._recycle_task: Optional[asyncio.Task] = None
 
     @property
     def cookies_file(self) -> Path:
         """Путь к файлу с куками для этого сайта."""
         return self.COOKIES_DIR / f"{self.SITE_NAME}_cookies.json"
 
+    @property
+    def render_profile(self) -> Dict[str, Any]:
+        """Профиль рендеринга сайта: DEFAULT_RENDER_PROFILE + RENDER_PROFILE."""
+        return {**DEFAULT_RENDER_PROFILE, **self.RENDER_PROFILE}
+
+    @property
+    def profile_dir(self) -> Path:
+        """Каталог persistent профиля (user_data_dir) для этого сайта."""
+        return BROWSER_PROFILES_DIR / self.SITE_NAME
+
     # ========== Подключение к Chrome ==========
 
     async def connect(self) -> bool:
@@ -87,9 +245,8 @@ class BaseBrowserClient(ABC):
                 # Headless mode: запускаем встроенный Chromium
                 logger.info(f"[{self.SITE_NAME}] Запуск Chromium в headless режиме")
 
-                self.browser = await self.playwright.chromium.launch(
-                    headless=True,
-                    args=[
+                await self._launch_context(
+                    [
                         '--no-sandbox',
                         '--disable-setuid-sandbox',
                         '--disable-dev-shm-usage',
@@ -97,25 +254,17 @@ class BaseBrowserClient(ABC):
                         '--no-first-run',
                         '--no-zygote',
                         '--disable-gpu',
-                    ]
-                )
-
-                # Создаём новый контекст
-                self.context = await self.browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
+                    ],
                     user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                     bypass_csp=True,
                     java_script_enabled=True
                 )
-                # Блокируем изображения, CSS и шрифты для ускорения
-                await self.context.route("**/*.{png,jpg,jpeg,gif,webp,css,woff,woff2}", lambda route: route.abort())
-                logger.info(f"[{self.SITE_NAME}] Создан новый контекст (headless) с блокировкой ресурсов")
 
                 # Пробуем загрузить cookies из backup
                 await self._load_cookies_from_backup()
 
                 # Создаём новую страницу
-                self.page = await self.context.new_page()
+                self.page = self._track_page(await self._new_work_page())
 
             else:
                 # CDP mode: подключаемся к внешнему Chrome
@@ -133,20 +282,21 @@ class BaseBrowserClient(ABC):
                     logger.info(f"[{self.SITE_NAME}] Использую существующий контекст")
                 else:
                     self.context = await self.browser.new_context(
-                        viewport={'width': 1920, 'height': 1080},
                         user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                         bypass_csp=True,
-                        java_script_enabled=True
+                        java_script_enabled=True,
+                        **self._render_context_options()
                     )
                     # Блокируем изображения, CSS и шрифты для ускорения
-                    await self.context.route("**/*.{png,jpg,jpeg,gif,webp,css,woff,woff2}", lambda route: route.abort())
+                    await self.context.route(BLOCKED_RESOURCES_PATTERN, lambda route: route.abort())
                     logger.info(f"[{self.SITE_NAME}] Создан новый контекст с блокировкой ресурсов")
 
                     # Пробуем загрузить cookies из backup
                     await self._load_cookies_from_backup()
 
                 # Ищем существующую страницу с нашим сайтом или создаём новую
-                self.page = await self._find_or_create_page()
+                self.page = self._track_page(await self._find_or_create_page())
+                self.cdp_session = await self._apply_render_profile(self.page)
 
             self.is_connected = True
             logger.info(f"[{self.SITE_NAME}] Подключение установлено (режим: {BROWSER_MODE})")
@@ -165,16 +315,76 @@ class BaseBrowserClient(ABC):
                 logger.error(f"[{self.SITE_NAME}] Убедитесь, что Chrome запущен с флагом --remote-debugging-port=9222")
             return False
 
+    async def _launch_context(self, launch_args: List[str], **context_options: Any) -> None:
+        """
+        Запустить встроенный Chromium и создать контекст.
+
+        По умолчанию - обычный (эфемерный) контекст с блокировкой картинок/CSS/шрифтов
+        через route(). При BROWSER_PERSISTENT_PROFILES=1 - persistent контекст
+        (launch_persistent_context) с user_data_dir на каждый сайт: JS-бандлы и
+        прочие ресурсы после рестарта берутся из дискового кэша профиля.
+        Перехват route() отключает HTTP-кэш, поэтому в persistent режиме
+        картинки отключаются флагом blink, а CSS/шрифты кэшируются.
+
+        Viewport, reduced motion и service workers берутся из render_profile.
+        """
+        launch_args = launch_args + self._render_launch_args()
+        ignore_default_args = self._render_ignore_default_args()
+        context_options = {**context_options, **self._render_context_options()}
+
+        if BROWSER_PERSISTENT_PROFILES:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            args = launch_args + [
+                f'--disk-cache-size={BROWSER_DISK_CACHE_MB * 1024 * 1024}',
+                '--blink-settings=imagesEnabled=false',
+            ]
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                str(self.profile_dir),
+                headless=True,
+                args=args,
+                ignore_default_args=ignore_default_args,
+                **context_options
+            )
+            # У persistent контекста нет отдельного объекта Browser
+            self.browser = self.context.browser
+            self._persistent_profile = True
+            logger.info(f"[{self.SITE_NAME}] Persistent профиль: {self.profile_dir} (кэш до {BROWSER_DISK_CACHE_MB} MB)")
+        else:
+            self.browser = await self.playwright.chromium.launch(
+                headless=True,
+                args=launch_args,
+                ignore_default_args=ignore_default_args
+            )
+            self.context = await self.browser.new_context(**context_options)
+            # Блокируем изображения, CSS и шрифты для ускорения
+            await self.context.route(BLOCKED_RESOURCES_PATTERN, lambda route: route.abort())
+            logger.info(f"[{self.SITE_NAME}] Создан новый контекст с блокировкой ресурсов")
+
+    async def _new_work_page(self) -> Page:
+        """Рабочая страница: persistent контекст уже открывает пустую вкладку - используем её."""
+        page = None
+        if self._persistent_profile:
+            for existing in self.context.pages:
+                if existing.url == "about:blank":
+                    page = existing
+                    break
+        if page is None:
+            page = await self.context.new_page()
+        self.cdp_session = await self._apply_render_profile(page)
+        return page
+
     async def _find_or_create_page(self) -> Page:
         """Найти страницу с нашим сайтом или создать новую."""
         # Ищем страницу с нашим URL
         for page in self.context.pages:
             if self.BASE_URL in page.url:
                 logger.info(f"[{self.SITE_NAME}] Найдена страница: {page.url}")
+                self._owns_page = False
                 return page
 
         # Создаём новую страницу
         page = await self.context.new_page()
+        self._owns_page = True
         logger.info(f"[{self.SITE_NAME}] Создана новая страница")
         return page
 
@@ -182,8 +392,10 @@ class BaseBrowserClient(ABC):
         """Отключиться от браузера."""
         logger.info(f"[{self.SITE_NAME}] Отключение...")
 
-        # Останавливаем keep-alive
+        # Останавливаем keep-alive и фоновый recycling
         self._stop_keep_alive()
+        if self._recycle_task and not self._recycle_task.done():
+            self._recycle_task.cancel()
 
         # Сохраняем cookies перед отключением
         await self._save_cookies_to_backup()
@@ -191,6 +403,9 @@ class BaseBrowserClient(ABC):
         # В headless режиме закрываем браузер полностью
         if BROWSER_MODE == "headless" and self.browser:
             await self.browser.close()
+        elif self._persistent_profile and self.context:
+            # Persistent контекст закрываем явно, чтобы профиль и кэш записались на диск
+            await self.context.close()
 
         # Отключаемся (в CDP режиме не закрываем Chrome)
         if self.playwright:
@@ -200,7 +415,9 @@ class BaseBrowserClient(ABC):
         self.browser = None
         self.context = None
         self.page = None
+        self.cdp_session = None
         self.is_connected = False
+        self._browser_pid = None
 
         logger.info(f"[{self.SITE_NAME}] Отключено")
 
@@ -271,54 +488,260 @@ class BaseBrowserClient(ABC):
     # ========== Keep-Alive ==========
 
     def _start_keep_alive(self) -> None:
-        """Запустить фоновую задачу keep-alive."""
-        if self._keep_alive_task is None or self._keep_alive_task.done():
-            self._keep_alive_task = asyncio.create_task(self._keep_alive_loop())
-            logger.info(f"[{self.SITE_NAME}] Keep-alive запущен (интервал: {self.KEEP_ALIVE_INTERVAL_SEC}с)")
+        """Зарегистрировать клиент в общем планировщике keep-alive."""
+        keep_alive_scheduler.register(self)
+        logger.info(f"[{self.SITE_NAME}] Keep-alive запущен (интервал простоя: {self.KEEP_ALIVE_INTERVAL_SEC}с)")
 
     def _stop_keep_alive(self) -> None:
-        """Остановить фоновую задачу keep-alive."""
-        if self._keep_alive_task and not self._keep_alive_task.done():
-            self._keep_alive_task.cancel()
+        """Снять клиент с общего планировщика keep-alive."""
+        if keep_alive_scheduler.unregister(self):
             logger.info(f"[{self.SITE_NAME}] Keep-alive остановлен")
 
-    async def _keep_alive_loop(self) -> None:
-        """Цикл keep-alive: делает лёгкий запрос каждые N минут."""
-        while True:
-            try:
-                await asyncio.sleep(self.KEEP_ALIVE_INTERVAL_SEC)
-
-                if not self.is_connected or not self.page:
-                    break
+    def mark_activity(self) -> None:
+        """Отметить успешный реальный запрос к сайту (сессия жива, пинг не нужен)."""
+        keep_alive_scheduler.mark_activity(self.SITE_NAME)
 
-                await self.keep_alive()
-
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.warning(f"[{self.SITE_NAME}] Ошибка keep-alive: {e}")
+    def note_search_result(self, result: Dict[str, Any]) -> None:
+        """Отметить активность, если сайт реально ответил на поиск (в т.ч. 'не найдено')."""
+        if result and result.get('status') in LIVE_RESULT_STATUSES:
+            self.mark_activity()
 
-    async def keep_alive(self) -> None:
+    async def keep_alive(self) -> bool:
         """
         Выполнить лёгкий запрос для поддержания сессии.
 
-        По умолчанию делает HEAD-запрос к BASE_URL.
+        По умолчанию делает HEAD-запрос к BASE_URL через HTTP-клиент контекста
+        (context.request): куки общие с браузером, но рабочая страница не трогается,
+        поэтому пинг никогда не конкурирует с навигациями поиска.
         Переопределите для специфичной логики.
+
+        Returns:
+            True если сайт ответил
         """
         try:
             logger.debug(f"[{self.SITE_NAME}] Keep-alive ping...")
 
-            # Простой способ - обновить страницу или сделать лёгкий fetch
-            # Используем evaluate для минимального запроса
-            await self.page.evaluate(f'''
-                fetch("{self.BASE_URL}", {{method: "HEAD", credentials: "include"}})
-                    .catch(() => {{}});
-            ''')
+            response = await self.context.request.head(self.BASE_URL, timeout=15000)
 
-            logger.debug(f"[{self.SITE_NAME}] Keep-alive OK")
+            logger.debug(f"[{self.SITE_NAME}] Keep-alive OK (HTTP {response.status})")
+            return True
 
         except Exception as e:
             logger.warning(f"[{self.SITE_NAME}] Keep-alive ошибка: {e}")
+            return False
+
+    # ========== Профиль рендеринга ==========
+
+    def _render_context_options(self) -> Dict[str, Any]:
+        """Опции контекста из профиля рендеринга."""
+        profile = self.render_profile
+        return {
+            'viewport': profile['viewport'],
+            'reduced_motion': profile['reduced_motion'],
+            'service_workers': profile['service_workers'],
+        }
+
+    def _render_launch_args(self) -> List[str]:
+        """Аргументы запуска Chromium из профиля рендеринга."""
+        viewport = self.render_profile['viewport']
+        return [f"--window-size={viewport['width']},{viewport['height']}"]
+
+    def _render_ignore_default_args(self) -> List[str]:
+        """Флаги Playwright по умолчанию, которые нужно убрать для троттлинга фоновых страниц."""
+        if self.render_profile['throttle_background_timers']:
+            return BACKGROUND_THROTTLING_DISABLE_ARGS
+        return []
+
+    async def _apply_render_profile(self, page: Page) -> Optional[CDPSession]:
+        """
+        Применить CDP-настройки профиля к странице.
+
+        Эмуляция живёт, пока открыта CDP-сессия, поэтому сессия возвращается
+        и становится self.cdp_session рабочей страницы (её же использует
+        watchdog памяти).
+        """
+        try:
+            session = await self.context.new_cdp_session(page)
+            await session.send("Emulation.setCPUThrottlingRate", {"rate": self.render_profile['cpu_throttling_rate']})
+            await session.send("Performance.enable")
+            return session
+        except Exception as e:
+            logger.debug(f"[{self.SITE_NAME}] Не удалось применить профиль рендеринга: {e}")
+            return None
+
+    # ========== Recycling страницы ==========
+
+    def _track_page(self, page: Page) -> Page:
+        """Начать учёт навигаций и возраста для новой рабочей страницы."""
+        self._page_navigations = 0
+        self._page_created_at = time.monotonic()
+        page.on("framenavigated", lambda frame: self._on_frame_navigated(page, frame))
+        return page
+
+    def _on_frame_navigated(self, page: Page, frame) -> None:
+        """Считаем только навигации главного фрейма текущей рабочей страницы."""
+        if page is self.page and frame == page.main_frame:
+            self._page_navigations += 1
+
+    @asynccontextmanager
+    async def page_session(self) -> AsyncIterator[Page]:
+        """
+        Эксклюзивный доступ к self.page на время поиска.
+
+        Подмена страницы при recycling ждёт окончания текущей сессии,
+        поэтому поиск никогда не теряет страницу посреди работы.
+        """
+        async with self._page_lock:
+            yield self.page
+
+    async def _get_page_metrics(self) -> Dict[str, float]:
+        """Метрики рабочей страницы через CDP Performance.getMetrics."""
+        if self.cdp_session is None:
+            self.cdp_session = await self.context.new_cdp_session(self.page)
+            await self.cdp_session.send("Performance.enable")
+        response = await self.cdp_session.send("Performance.getMetrics")
+        return {m["name"]: m["value"] for m in response.get("metrics", [])}
+
+    async def _find_browser_pid(self) -> Optional[int]:
+        """
+        PID Chromium этого клиента: persistent профиль - по --user-data-dir,
+        обычный запуск - процесс 'browser' из SystemInfo.getProcessInfo.
+        """
+        if self._persistent_profile:
+            return await asyncio.to_thread(find_browser_pid, self.profile_dir)
+        if self.browser is None:
+            return None
+        session = await self.browser.new_browser_cdp_session()
+        try:
+            info = await session.send("SystemInfo.getProcessInfo")
+        finally:
+            await session.detach()
+        return next((p['id'] for p in info.get('processInfo', []) if p.get('type') == 'browser'), None)
+
+    async def _browser_rss_mb(self) -> Optional[float]:
+        """
+        RSS Chromium этого клиента с дочерними процессами (Linux /proc).
+
+        Считается только дерево своего браузера: остальные клиенты worker'а -
+        отдельные Chromium, их память порог этого клиента не задевает.
+        None - проверка не нужна сейчас (не чаще BROWSER_RSS_CHECK_SEC) или
+        невозможна: CDP режим (внешний Chrome), нет /proc, PID не найден.
+        """
+        if BROWSER_MODE != "headless":
+            return None
+        now = time.monotonic()
+        if now - self._rss_checked_at < self.BROWSER_RSS_CHECK_SEC:
+            return None
+        self._rss_checked_at = now
+
+        if self._browser_pid is None:
+            try:
+                self._browser_pid = await self._find_browser_pid()
+            except Exception as e:
+                logger.debug(f"[{self.SITE_NAME}] PID браузера не определён: {e}")
+            if self._browser_pid is None:
+                return None
+        # Обход /proc - в потоке, не в event loop
+        return await asyncio.to_thread(process_tree_rss_mb, self._browser_pid)
+
+    async def _page_recycle_reason(self) -> Optional[str]:
+        """Вернуть причину для recycling страницы или None, если страница в порядке."""
+        if self.PAGE_MAX_NAVIGATIONS and self._page_navigations >= self.PAGE_MAX_NAVIGATIONS:
+            return f"навигаций: {self._page_navigations}"
+
+        age = time.monotonic() - self._page_created_at
+        if self.PAGE_MAX_AGE_SEC and age >= self.PAGE_MAX_AGE_SEC:
+            return f"возраст: {age / 60:.0f} мин"
+
+        if self.PAGE_MAX_JS_HEAP_MB:
+            try:
+                metrics = await self._get_page_metrics()
+                heap_mb = metrics.get("JSHeapUsedSize", 0) / (1024 * 1024)
+                if heap_mb >= self.PAGE_MAX_JS_HEAP_MB:
+                    return f"JS heap: {heap_mb:.0f} MB"
+            except Exception as e:
+                logger.debug(f"[{self.SITE_NAME}] Не удалось получить метрики страницы: {e}")
+
+        if self.BROWSER_MAX_RSS_MB:
+            rss_mb = await self._browser_rss_mb()
+            if rss_mb is not None and rss_mb >= self.BROWSER_MAX_RSS_MB:
+                return f"RSS браузера: {rss_mb:.0f} MB"
+
+        return None
+
+    async def _warm_up_page(self, page: Page) -> None:
+        """
+        Прогреть страницу-замену до подмены.
+
+        По умолчанию открывает BASE_URL - куки контекста общие, авторизация сохраняется.
+        """
+        await page.goto(self.BASE_URL, wait_until='domcontentloaded', timeout=60000)
+
+    def schedule_page_recycle(self) -> None:
+        """
+        Проверить пороги recycling в фоне (вне критического пути поиска).
+
+        Вызывайте после завершения задачи: при превышении порогов будет прогрета
+        новая страница и подменена, как только текущий поиск освободит страницу.
+        """
+        if not self.is_connected or not self.context:
+            return
+        if self._recycle_task is None or self._recycle_task.done():
+            self._recycle_task = asyncio.create_task(self._recycle_page_if_needed())
+
+    async def _recycle_page_if_needed(self) -> None:
+        """Прогреть новую страницу и подменить ею текущую."""
+        new_page: Optional[Page] = None
+        new_cdp_session: Optional[CDPSession] = None
+        try:
+            reason = await self._page_recycle_reason()
+            if not reason:
+                return
+
+            logger.info(f"[{self.SITE_NAME}] Recycling страницы ({reason}), прогрев замены...")
+            new_page = await self.context.new_page()
+            new_cdp_session = await self._apply_render_profile(new_page)
+            await self._warm_up_page(new_page)
+
+            async with self._page_lock:
+                old_page = self.page
+                old_owned = self._owns_page
+                old_cdp_session = self.cdp_session
+                self.page = self._track_page(new_page)
+                self._owns_page = True
+                self.cdp_session = new_cdp_session
+                new_page = None
+                new_cdp_session = None
+
+            if old_cdp_session:
+                try:
+                    await old_cdp_session.detach()
+                except Exception:
+                    pass
+            if old_page and not old_page.is_closed():
+                if old_owned:
+                    await old_page.close()
+                else:
+                    # Вкладка пользователя во внешнем Chrome: не закрываем, только освобождаем память
+                    await old_page.goto("about:blank")
+
+            logger.info(f"[{self.SITE_NAME}] Страница пересоздана")
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[{self.SITE_NAME}] Ошибка recycling страницы: {e}")
+        finally:
+            if new_cdp_session:
+                try:
+                    await new_cdp_session.detach()
+                except Exception:
+                    pass
+            if new_page and not new_page.is_closed():
+                try:
+                    await new_page.close()
+                except Exception:
+                    pass
 
     # ========== Cookies Backup/Restore ==========
 
@@ -394,6 +817,25 @@ class BaseBrowserClient(ABC):
         """Перейти по URL."""
         await self.page.goto(url, wait_until=wait_until, timeout=timeout)
 
+    async def fetch_in_page(self, url: str, timeout_ms: int = 20000) -> Optional[Dict[str, Any]]:
+        """
+        Выполнить GET через fetch() внутри уже авторизованной страницы.
+
+        Без навигации: не строится layout, не выполняются скрипты и не грузятся
+        ресурсы страницы, но используются куки сессии и анти-бот защиты.
+
+        Returns:
+            {'status': int, 'url': str, 'text': str} или None, если страница
+            не на сайте (same-origin) или запрос не удался
+        """
+        if not self.page or self.BASE_URL not in self.page.url:
+            return None
+        try:
+            return await self.page.evaluate(IN_PAGE_FETCH_JS, {'url': url, 'timeout': timeout_ms})
+        except Exception as e:
+            logger.warning(f"[{self.SITE_NAME}] Ошибка fetch в странице: {e}")
+            return None
+
     async def wait(self, ms: int) -> None:
         """Подождать указанное время в миллисекундах."""
         await self.page.wait_for_timeout(ms)
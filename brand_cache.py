@@ -0,0 +1,168 @@
+"""
+Кэш списков брендов по артикулу (для /api/brands и подсказок в tasks.html).
+
+- Ключ - нормализованный артикул (partnumbers.normalize_partnumber)
+- Полный список - из модального окна ZZAP (source='zzap_modal'): его пишет
+  /api/brands после живого запроса и worker, когда модальное окно открылось при поиске
+- Частичный - бренды, которые worker видел в результатах (страница брендов STparts,
+  выбранный бренд ZZAP, "Бренд:" AutoTrade)
+- "Брендов нет" (модальное окно ZZAP пустое) - строка-маркер NOT_FOUND_SOURCE
+  с коротким TTL, как негативные записи price_cache: иначе пустой ответ - промах,
+  и каждый запрос снова идёт в ZZAP
+- Записи старше TTL не отдаются
+"""
+
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from config import BRAND_CACHE_NEGATIVE_TTL_MIN, BRAND_CACHE_TTL_HOURS
+from partnumbers import normalize_partnumber
+from storage import connect
+
+if TYPE_CHECKING:
+    from db_writer import DbWriter
+
+# Источник полного списка брендов артикула
+COMPLETE_SOURCE = 'zzap_modal'
+
+# Маркер "у артикула нет брендов" (brand_key = ''): список полный и пустой
+NOT_FOUND_SOURCE = 'not_found'
+
+# Источники, у которых result['brand'] - бренд самого артикула (без аналогов)
+RESULT_BRAND_SOURCES = ('zzap', 'stparts', 'autotrade')
+
+BRAND_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS brand_cache (
+        partnumber_norm TEXT NOT NULL,
+        brand_key TEXT NOT NULL,  -- UPPER(brand) для дедупликации
+        brand TEXT NOT NULL,
+        source TEXT NOT NULL,  -- zzap_modal (полный список) или источник результата
+        seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (partnumber_norm, brand_key)
+    )
+"""
+
+
+def upsert_brands(conn: sqlite3.Connection, rows: List[Tuple[str, str, str, str]]) -> None:
+    """(partnumber_norm, brand_key, brand, source): повторные обновляют seen_at, zzap_modal помечает список полным."""
+    conn.executemany(
+        f"""
+        INSERT INTO brand_cache (partnumber_norm, brand_key, brand, source) VALUES (?, ?, ?, ?)
+        ON CONFLICT (partnumber_norm, brand_key) DO UPDATE SET
+            seen_at = CURRENT_TIMESTAMP,
+            source = CASE WHEN excluded.source = '{COMPLETE_SOURCE}' THEN excluded.source ELSE source END
+        """,
+        rows,
+    )
+
+
+def brand_rows(partnumber: str, brands: Iterable[str], source: str) -> List[Tuple[str, str, str, str]]:
+    """
+    Строки upsert_brands: повторные обновляют seen_at, zzap_modal помечает список полным.
+
+    Пустой полный список (zzap_modal) - маркер "брендов нет".
+    """
+    norm = normalize_partnumber(partnumber)
+    if not norm:
+        return []
+    rows = [(norm, brand.strip().upper(), brand.strip(), source) for brand in brands if brand and brand.strip()]
+    if not rows and source == COMPLETE_SOURCE:
+        rows = [(norm, '', '', NOT_FOUND_SOURCE)]
+    return rows
+
+
+def load_brands(
+    conn: sqlite3.Connection,
+    partnumber: str,
+    ttl_sec: int = BRAND_CACHE_TTL_HOURS * 60 * 60,
+    negative_ttl_sec: int = BRAND_CACHE_NEGATIVE_TTL_MIN * 60,
+) -> Optional[Dict[str, Any]]:
+    """
+    Свежий список брендов артикула.
+
+    Returns:
+        {'brands': [...], 'complete': bool} или None, если артикул не встречался;
+        {'brands': [], 'complete': True} - недавно проверен, брендов нет
+    """
+    rows = conn.execute(
+        """
+        SELECT brand, source FROM brand_cache
+        WHERE partnumber_norm = ?
+          AND seen_at > datetime('now', CASE WHEN source = ? THEN ? ELSE ? END)
+        ORDER BY rowid
+        """,
+        (normalize_partnumber(partnumber), NOT_FOUND_SOURCE, f"-{negative_ttl_sec} seconds", f"-{ttl_sec} seconds"),
+    ).fetchall()
+    if not rows:
+        return None
+    return {
+        'brands': [row[0] for row in rows if row[1] != NOT_FOUND_SOURCE],
+        'complete': any(row[1] in (COMPLETE_SOURCE, NOT_FOUND_SOURCE) for row in rows),
+    }
+
+
+def save_brands(conn: sqlite3.Connection, partnumber: str, brands: Iterable[str], source: str) -> None:
+    """Записать бренды с commit() (для storage.run_db в API)."""
+    rows = brand_rows(partnumber, brands, source)
+    if rows:
+        upsert_brands(conn, rows)
+        conn.commit()
+
+
+class BrandCache:
+    """Таблица brand_cache с общим подключением."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl_sec: int = BRAND_CACHE_TTL_HOURS * 60 * 60,
+        negative_ttl_sec: int = BRAND_CACHE_NEGATIVE_TTL_MIN * 60,
+        writer: Optional["DbWriter"] = None,
+    ) -> None:
+        self.db_path = db_path
+        self.ttl_sec = ttl_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        # Если задан - запись через очередь писателя worker'а
+        self.writer = writer
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Общее подключение к БД (создаётся при первом обращении)."""
+        if self._conn is None:
+            self._conn = connect(self.db_path)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def get(self, partnumber: str) -> Optional[Dict[str, Any]]:
+        """Свежий список брендов артикула (load_brands)."""
+        return load_brands(self.conn, partnumber, self.ttl_sec, self.negative_ttl_sec)
+
+    def put(self, partnumber: str, brands: Iterable[str], source: str) -> None:
+        """Добавить бренды (brand_rows): через писателя или своим подключением."""
+        rows = brand_rows(partnumber, brands, source)
+        if not rows:
+            return
+        if self.writer is not None:
+            self.writer.submit(upsert_brands, rows)
+            return
+        upsert_brands(self.conn, rows)
+        self.conn.commit()
+
+    def store_result(self, partnumber: str, source: str, result: Dict[str, Any]) -> None:
+        """
+        Сохранить бренды из результата живого поиска worker'а.
+
+        result['brands'] - список со страницы выбора бренда (модальное окно ZZAP -
+        полный список, ссылки STparts), result['brand'] - бренд найденного товара.
+        """
+        listed = result.get('brands') or []
+        if listed:
+            self.put(partnumber, listed, COMPLETE_SOURCE if source == 'zzap' else source)
+        if source in RESULT_BRAND_SOURCES and result.get('brand'):
+            self.put(partnumber, [result['brand']], source)
@@ -0,0 +1,76 @@
+"""
+Память процессов Chromium по /proc (Linux) - для recycling страниц браузерных клиентов.
+
+У каждого клиента свой Chromium, а все они - потомки worker'а. Поэтому RSS
+считается по дереву процессов одного браузера (корень - его PID), а не по
+всем потомкам worker'а: иначе порог одного клиента срабатывает от памяти остальных.
+
+Функции синхронные (чтение /proc) - из async-кода вызывайте через asyncio.to_thread().
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+PROC_DIR = Path("/proc")
+
+
+def _read_processes(proc: Path) -> Tuple[Dict[int, List[int]], Dict[int, int]]:
+    """Дети по PID родителя и VmRSS (KB) по PID."""
+    children: Dict[int, List[int]] = {}
+    rss_kb: Dict[int, int] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            status = (entry / "status").read_text()
+        except OSError:
+            continue
+        pid = int(entry.name)
+        for line in status.splitlines():
+            if line.startswith("PPid:"):
+                children.setdefault(int(line.split()[1]), []).append(pid)
+            elif line.startswith("VmRSS:"):
+                rss_kb[pid] = int(line.split()[1])
+    return children, rss_kb
+
+
+def process_tree_rss_mb(root_pid: int, proc: Path = PROC_DIR) -> Optional[float]:
+    """RSS процесса root_pid и всех его потомков (MB); None - процесса нет или нет /proc."""
+    if not (proc / str(root_pid)).exists():
+        return None
+    children, rss_kb = _read_processes(proc)
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_kb += rss_kb.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total_kb / 1024
+
+
+def find_browser_pid(user_data_dir: Path, proc: Path = PROC_DIR) -> Optional[int]:
+    """
+    PID главного процесса Chromium с --user-data-dir=user_data_dir (persistent профиль).
+
+    Дочерние процессы браузера тоже могут нести этот флаг - берётся тот,
+    чей родитель его не несёт.
+    """
+    if not proc.exists():
+        return None
+    # Playwright передаёт путь как есть или абсолютным
+    flags = {f"--user-data-dir={path}".encode() for path in (user_data_dir, Path(user_data_dir).resolve())}
+    matching: Dict[int, int] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            args = (entry / "cmdline").read_bytes().split(b"\0")
+            status = (entry / "status").read_text()
+        except OSError:
+            continue
+        if flags.isdisjoint(args):
+            continue
+        ppid = next((int(line.split()[1]) for line in status.splitlines() if line.startswith("PPid:")), 0)
+        matching[int(entry.name)] = ppid
+    roots = [pid for pid, ppid in matching.items() if ppid not in matching]
+    return min(roots) if roots else None
@@ -0,0 +1,179 @@
+"""
+Статистика кэша цен по источникам и временным окнам.
+
+- record_lookup(): результат PriceCache.get_many() - попадания (в т.ч. устаревшие
+  и негативные) и промахи по каждому источнику
+- record_live(): длительность живого поиска - из средней оценивается, сколько
+  секунд парсинга сэкономило каждое попадание
+- flush(): накопленные счётчики периодически добавляются в таблицу cache_stats
+  (окно = CACHE_STATS_WINDOW_MIN минут, время UTC как у CURRENT_TIMESTAMP);
+  worker снимает их take_pending() в event loop и пишет write_cache_stats через
+  писателя - поток-писатель не трогает словари, которые пополняет event loop
+- load_cache_stats(): сводка за N часов для /api/cache-stats
+"""
+
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import CACHE_STATS_WINDOW_MIN, CACHE_STATS_FLUSH_SEC
+
+CACHE_STATS_COUNTERS = (
+    'hits', 'misses', 'stale_hits', 'negative_hits', 'saved_sec', 'live_count', 'live_sec',
+)
+
+CACHE_STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_stats (
+        window_start TIMESTAMP NOT NULL,  -- начало окна (UTC)
+        source TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 0,  -- все ответы из кэша, включая stale и негативные
+        misses INTEGER NOT NULL DEFAULT 0,
+        stale_hits INTEGER NOT NULL DEFAULT 0,
+        negative_hits INTEGER NOT NULL DEFAULT 0,
+        saved_sec REAL NOT NULL DEFAULT 0,  -- оценка сэкономленного времени парсинга
+        live_count INTEGER NOT NULL DEFAULT 0,  -- живые поиски (задачи, обновления, прогрев)
+        live_sec REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (window_start, source)
+    )
+"""
+
+
+class CacheStats:
+    """Счётчики кэша в памяти worker'а с периодической записью в БД."""
+
+    def __init__(
+        self,
+        window_sec: int = CACHE_STATS_WINDOW_MIN * 60,
+        flush_interval_sec: int = CACHE_STATS_FLUSH_SEC,
+    ) -> None:
+        self.window_sec = window_sec
+        self.flush_interval_sec = flush_interval_sec
+        self._pending: Dict[Tuple[str, str], Dict[str, float]] = {}
+        # Средняя длительность живого поиска по источнику: (count, total_sec)
+        self._latency: Dict[str, Tuple[int, float]] = {}
+        self._flushed_at = time.monotonic()
+
+    def window_start(self, now: Optional[float] = None) -> str:
+        """Начало текущего окна в формате CURRENT_TIMESTAMP."""
+        now = time.time() if now is None else now
+        start = now - now % self.window_sec
+        return datetime.fromtimestamp(start, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    def _bucket(self, source: str) -> Dict[str, float]:
+        key = (self.window_start(), source)
+        if key not in self._pending:
+            self._pending[key] = dict.fromkeys(CACHE_STATS_COUNTERS, 0)
+        return self._pending[key]
+
+    def avg_live_sec(self, source: str) -> float:
+        count, total = self._latency.get(source, (0, 0.0))
+        return total / count if count else 0.0
+
+    def record_lookup(self, entries: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Учесть результат PriceCache.get_many(): {source: запись или None}."""
+        for source, entry in entries.items():
+            bucket = self._bucket(source)
+            if entry is None:
+                bucket['misses'] += 1
+                continue
+            bucket['hits'] += 1
+            bucket['saved_sec'] += self.avg_live_sec(source)
+            if entry.get('stale'):
+                bucket['stale_hits'] += 1
+            if entry.get('price') is None:
+                bucket['negative_hits'] += 1
+
+    def record_live(self, source: str, elapsed_sec: float) -> None:
+        """Учесть живой поиск на сайте."""
+        bucket = self._bucket(source)
+        bucket['live_count'] += 1
+        bucket['live_sec'] += elapsed_sec
+        count, total = self._latency.get(source, (0, 0.0))
+        self._latency[source] = (count + 1, total + elapsed_sec)
+
+    def seed(self, conn: sqlite3.Connection, hours: int = 24) -> None:
+        """Средняя длительность живого поиска из сохранённой статистики (после рестарта)."""
+        rows = conn.execute(
+            """
+            SELECT source, SUM(live_count), SUM(live_sec) FROM cache_stats
+            WHERE window_start >= datetime('now', ?)
+            GROUP BY source
+            """,
+            (f"-{int(hours)} hours",),
+        ).fetchall()
+        for source, count, total in rows:
+            if count:
+                self._latency[source] = (count, total)
+
+    def flush_due(self) -> bool:
+        return bool(self._pending) and time.monotonic() - self._flushed_at >= self.flush_interval_sec
+
+    def take_pending(self) -> List[Tuple[Any, ...]]:
+        """Строки write_cache_stats из накопленных счётчиков; счётчики в памяти обнуляются."""
+        rows = [
+            (window_start, source, *(bucket[name] for name in CACHE_STATS_COUNTERS))
+            for (window_start, source), bucket in self._pending.items()
+        ]
+        self._pending.clear()
+        self._flushed_at = time.monotonic()
+        return rows
+
+    def flush(self, conn: sqlite3.Connection) -> None:
+        """Добавить накопленные счётчики в cache_stats своим подключением (commit()) и обнулить их в памяти."""
+        write_cache_stats(conn, self.take_pending())
+        conn.commit()
+
+
+def write_cache_stats(conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]) -> None:
+    """Добавить строки take_pending() к счётчикам окон; без commit() (запись для DbWriter)."""
+    if not rows:
+        return
+    columns = ", ".join(CACHE_STATS_COUNTERS)
+    conn.executemany(
+        f"""
+        INSERT INTO cache_stats (window_start, source, {columns})
+        VALUES (?, ?, {", ".join("?" for _ in CACHE_STATS_COUNTERS)})
+        ON CONFLICT (window_start, source) DO UPDATE SET
+        {", ".join(f"{name} = {name} + excluded.{name}" for name in CACHE_STATS_COUNTERS)}
+        """,
+        rows,
+    )
+
+
+def load_cache_stats(conn: sqlite3.Connection, hours: int = 24) -> Dict[str, Any]:
+    """
+    Сводка за последние hours часов.
+
+    Returns:
+        {'hours': N, 'sources': {source: {счётчики, 'hit_rate', 'avg_live_sec'}},
+         'windows': [{'window_start', 'source', счётчики...}, ...]}
+    """
+    columns = ", ".join(CACHE_STATS_COUNTERS)
+    rows = conn.execute(
+        f"""
+        SELECT window_start, source, {columns} FROM cache_stats
+        WHERE window_start >= datetime('now', ?)
+        ORDER BY window_start DESC, source
+        """,
+        (f"-{int(hours)} hours",),
+    ).fetchall()
+
+    windows = []
+    sources: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        window = {'window_start': row[0], 'source': row[1]}
+        window.update(zip(CACHE_STATS_COUNTERS, row[2:]))
+        windows.append(window)
+        totals = sources.setdefault(row[1], dict.fromkeys(CACHE_STATS_COUNTERS, 0))
+        for name in CACHE_STATS_COUNTERS:
+            totals[name] += window[name]
+
+    for totals in sources.values():
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = round(totals['hits'] / lookups, 3) if lookups else None
+        totals['avg_live_sec'] = round(totals['live_sec'] / totals['live_count'], 2) if totals['live_count'] else None
+        totals['saved_sec'] = round(totals['saved_sec'], 1)
+        totals['live_sec'] = round(totals['live_sec'], 1)
+
+    return {'hours': hours, 'sources': sources, 'windows': windows}
@@ -0,0 +1,163 @@
+"""
+Прогрев кэша цен для популярных артикулов.
+
+- rank_hot_partnumbers(): артикулы из tasks по частоте и давности запросов
+  (вес запроса затухает с периодом полураспада)
+- SiteBudget: не больше N фоновых поисков на сайт за скользящий час
+- CacheWarmer.next_refresh(): следующий (partnumber, brand, source), чья запись
+  в кэше истекает в ближайшие минуты или уже истекла - worker обновляет её в простое,
+  и задачи в часы пик получают цену из кэша, а не ждут живого поиска
+"""
+
+import logging
+import sqlite3
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import (
+    CACHE_WARM_TOP_N,
+    CACHE_WARM_DAYS,
+    CACHE_WARM_MIN_REQUESTS,
+    CACHE_WARM_HALF_LIFE_HOURS,
+    CACHE_WARM_LEAD_MIN,
+    CACHE_WARM_BUDGET_PER_HOUR,
+    CACHE_WARM_SOURCE_BUDGET_PER_HOUR,
+)
+from price_cache import CacheKey, PriceCache
+from storage import get_connection
+
+logger = logging.getLogger(__name__)
+
+# (partnumber, search_brand) в написании последнего запроса
+HotPartnumber = Tuple[str, Optional[str]]
+
+# Группы (артикул, бренд) задач за период: ('-N days', min_requests)
+HOT_PARTNUMBERS_SQL = """
+    SELECT partnumber_norm,
+           search_brand_key,
+           COUNT(*) AS requests,
+           MAX(id) AS last_id,
+           (julianday('now') - julianday(MAX(created_at))) * 24 AS hours_since_last
+    FROM tasks
+    WHERE created_at >= datetime('now', ?)
+      AND partnumber_norm IS NOT NULL AND partnumber_norm != ''
+    GROUP BY partnumber_norm, search_brand_key
+    HAVING COUNT(*) >= ?
+"""
+
+
+def hot_score(requests: int, hours_since_last: float, half_life_hours: float) -> float:
+    """Вес артикула: число запросов, затухающее с давностью последнего запроса."""
+    return requests * 0.5 ** (max(hours_since_last, 0.0) / half_life_hours)
+
+
+def rank_hot_partnumbers(
+    conn: sqlite3.Connection,
+    limit: int = CACHE_WARM_TOP_N,
+    days: int = CACHE_WARM_DAYS,
+    min_requests: int = CACHE_WARM_MIN_REQUESTS,
+    half_life_hours: float = CACHE_WARM_HALF_LIFE_HOURS,
+) -> List[HotPartnumber]:
+    """Популярные (partnumber, search_brand) по задачам за последние days дней."""
+    rows = conn.execute(HOT_PARTNUMBERS_SQL, (f"-{int(days)} days", min_requests)).fetchall()
+
+    ranked = sorted(
+        rows,
+        key=lambda row: hot_score(row[2], row[4], half_life_hours),
+        reverse=True,
+    )[:limit]
+
+    # Написание артикула и бренда - из последней задачи группы (им и ищем на сайтах)
+    result = []
+    for row in ranked:
+        partnumber, search_brand = conn.execute(
+            "SELECT partnumber, search_brand FROM tasks WHERE id = ?", (row[3],)
+        ).fetchone()
+        result.append((partnumber.strip(), (search_brand or '').strip() or None))
+    return result
+
+
+class SiteBudget:
+    """Лимит фоновых поисков на сайт за скользящий час."""
+
+    WINDOW_SEC = 60 * 60
+
+    def __init__(
+        self,
+        per_hour: int = CACHE_WARM_BUDGET_PER_HOUR,
+        source_per_hour: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.per_hour = per_hour
+        self.source_per_hour = dict(CACHE_WARM_SOURCE_BUDGET_PER_HOUR if source_per_hour is None else source_per_hour)
+        self._spent: Dict[str, Deque[float]] = {}
+
+    def limit(self, source: str) -> int:
+        return self.source_per_hour.get(source, self.per_hour)
+
+    def remaining(self, source: str, now: Optional[float] = None) -> int:
+        """Сколько поисков ещё можно сделать на сайте в текущем окне."""
+        now = time.monotonic() if now is None else now
+        spent = self._spent.setdefault(source, deque())
+        while spent and now - spent[0] >= self.WINDOW_SEC:
+            spent.popleft()
+        return self.limit(source) - len(spent)
+
+    def try_spend(self, source: str, now: Optional[float] = None) -> bool:
+        """Списать один поиск; False - бюджет сайта на этот час исчерпан."""
+        now = time.monotonic() if now is None else now
+        if self.remaining(source, now) <= 0:
+            return False
+        self._spent[source].append(now)
+        return True
+
+
+class CacheWarmer:
+    """Выбор следующей записи кэша для прогрева."""
+
+    def __init__(
+        self,
+        price_cache: PriceCache,
+        db_path: Path,
+        budget: Optional[SiteBudget] = None,
+        lead_sec: int = CACHE_WARM_LEAD_MIN * 60,
+        rank_interval_sec: int = 5 * 60,
+    ) -> None:
+        self.price_cache = price_cache
+        self.db_path = db_path
+        self.budget = budget or SiteBudget()
+        self.lead_sec = lead_sec
+        self.rank_interval_sec = rank_interval_sec
+        self._hot: List[HotPartnumber] = []
+        self._ranked_at: Optional[float] = None
+
+    def hot_partnumbers(self) -> List[HotPartnumber]:
+        """Рейтинг популярных артикулов (пересчитывается раз в rank_interval_sec)."""
+        now = time.monotonic()
+        if self._ranked_at is None or now - self._ranked_at >= self.rank_interval_sec:
+            conn = get_connection(self.db_path, row_factory=None)
+            try:
+                self._hot = rank_hot_partnumbers(conn)
+            finally:
+                conn.close()
+            self._ranked_at = now
+            logger.info(f"[warmer] Популярных артикулов: {len(self._hot)}")
+        return self._hot
+
+    def next_refresh(self) -> Optional[CacheKey]:
+        """
+        Следующий ключ (partnumber, brand, source) для прогрева или None.
+
+        Берётся запись, которой нет в кэше или у которой до конца TTL осталось
+        меньше lead_sec, - если у её сайта остался бюджет.
+        """
+        for partnumber, search_brand in self.hot_partnumbers():
+            entries = self.price_cache.get_many(partnumber, search_brand)
+            for source in self.price_cache.sources:
+                entry = entries[source]
+                if entry is not None and entry['expires_in'] > self.lead_sec:
+                    continue
+                if self.budget.try_spend(source):
+                    return (partnumber, search_brand, source)
+        return None
@@ -22,6 +22,20 @@ AUTOTRADE_PASSWORD = os.getenv("AUTOTRADE_PASSWORD", "")
 
 # Database - use env var for Docker, fallback to local for development
 DB_PATH = Path(os.getenv("DATABASE_PATH", str(BASEDIR / "tasks.db")))
+# Кэш (price_cache, cache_stats, brand_cache) и история цен (price_history + агрегаты) можно вынести
+# в отдельные файлы: у каждого свой WAL, checkpoint и блокировка записи (по умолчанию - DB_PATH)
+CACHE_DB_PATH = Path(os.getenv("CACHE_DATABASE_PATH", str(DB_PATH)))
+HISTORY_DB_PATH = Path(os.getenv("HISTORY_DATABASE_PATH", str(DB_PATH)))
+
+# SQLite (storage.py): WAL, ожидание блокировки, размер кэша страниц, пул подключений на процесс
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # NORMAL безопасен в WAL; FULL - fsync на каждый коммит
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))  # 16 МБ на подключение
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))  # потоки для запросов из async-эндпоинтов API
+# Писатель worker'а (db_writer.py): записи, накопленные за LINGER_MS, коммитятся одной транзакцией
+DB_WRITER_MAX_BATCH = int(os.getenv("DB_WRITER_MAX_BATCH", "200"))
+DB_WRITER_LINGER_MS = int(os.getenv("DB_WRITER_LINGER_MS", "50"))
 
 # Parser settings
 ZZAP_MIN_PRICE = 2000
@@ -39,3 +53,68 @@ COOKIES_BACKUP_DIR = BASEDIR / "cookies_backup"
 
 # Keep-alive interval (seconds)
 KEEP_ALIVE_INTERVAL = 20 * 60  # 20 minutes
+
+# Page recycling: пересоздавать долгоживущую страницу браузера
+PAGE_MAX_NAVIGATIONS = int(os.getenv("PAGE_MAX_NAVIGATIONS", "300"))
+PAGE_MAX_AGE_SEC = int(os.getenv("PAGE_MAX_AGE_SEC", str(2 * 60 * 60)))  # 2 часа
+PAGE_MAX_JS_HEAP_MB = int(os.getenv("PAGE_MAX_JS_HEAP_MB", "400"))
+BROWSER_MAX_RSS_MB = int(os.getenv("BROWSER_MAX_RSS_MB", "1500"))  # shm_size в Docker: 2 GB
+
+# Persistent browser profiles (headless): JS/CSS сайтов кэшируются на диске между рестартами
+BROWSER_PERSISTENT_PROFILES = os.getenv("BROWSER_PERSISTENT_PROFILES", "0") == "1"
+BROWSER_PROFILES_DIR = Path(os.getenv("BROWSER_PROFILES_DIR", str(BASEDIR / "browser_profiles")))
+BROWSER_DISK_CACHE_MB = int(os.getenv("BROWSER_DISK_CACHE_MB", "200"))  # лимит кэша на сайт
+
+# Поиск через fetch() внутри авторизованной страницы (без page.goto) для AutoVID, AutoTrade, Trast
+IN_PAGE_FETCH_SEARCH = os.getenv("IN_PAGE_FETCH_SEARCH", "0") == "1"
+
+# Кэш цен: in-memory LRU перед таблицей price_cache
+PRICE_CACHE_TTL_MIN = int(os.getenv("PRICE_CACHE_TTL_MIN", "30"))
+# TTL цены по источникам (PRICE_CACHE_TTL_MIN_ZZAP=60 и т.д.); не заданные - общий PRICE_CACHE_TTL_MIN
+PRICE_CACHE_SOURCE_TTL_MIN = {
+    source: int(os.environ[f"PRICE_CACHE_TTL_MIN_{source.upper()}"])
+    for source in ("zzap", "stparts", "trast", "autovid", "autotrade")
+    if os.getenv(f"PRICE_CACHE_TTL_MIN_{source.upper()}")
+}
+PRICE_CACHE_MEMORY_SIZE = int(os.getenv("PRICE_CACHE_MEMORY_SIZE", "5000"))  # записей (предложения источника + негативные по бренду)
+# Негативный кэш: "не найдено" (not_found / NO_RESULTS) и "заблокировано" сайтом
+PRICE_CACHE_NEGATIVE_TTL_MIN = int(os.getenv("PRICE_CACHE_NEGATIVE_TTL_MIN", "10"))
+PRICE_CACHE_BLOCKED_TTL_MIN = int(os.getenv("PRICE_CACHE_BLOCKED_TTL_MIN", "2"))
+# Stale-while-revalidate: сколько минут после TTL цена ещё отдаётся (с пометкой stale), 0 - выключено
+PRICE_CACHE_STALE_MIN = int(os.getenv("PRICE_CACHE_STALE_MIN", "0"))
+# Обслуживание price_cache: удаление устаревших и вытесненных строк, лимит размера, incremental vacuum
+PRICE_CACHE_MAX_ROWS = int(os.getenv("PRICE_CACHE_MAX_ROWS", "200000"))
+PRICE_CACHE_COMPACT_INTERVAL_MIN = int(os.getenv("PRICE_CACHE_COMPACT_INTERVAL_MIN", "60"))
+PRICE_CACHE_VACUUM_PAGES = int(os.getenv("PRICE_CACHE_VACUUM_PAGES", "2000"))  # страниц за один проход
+
+# Прогрев кэша: популярные артикулы (по задачам) обновляются в простое worker'а незадолго до истечения TTL
+CACHE_WARM_ENABLED = os.getenv("CACHE_WARM_ENABLED", "0") == "1"
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "50"))
+CACHE_WARM_DAYS = int(os.getenv("CACHE_WARM_DAYS", "14"))  # окно статистики запросов
+CACHE_WARM_MIN_REQUESTS = int(os.getenv("CACHE_WARM_MIN_REQUESTS", "2"))
+CACHE_WARM_HALF_LIFE_HOURS = int(os.getenv("CACHE_WARM_HALF_LIFE_HOURS", "72"))  # затухание веса старых запросов
+CACHE_WARM_LEAD_MIN = int(os.getenv("CACHE_WARM_LEAD_MIN", "5"))  # за сколько минут до истечения TTL обновлять
+CACHE_WARM_BUDGET_PER_HOUR = int(os.getenv("CACHE_WARM_BUDGET_PER_HOUR", "20"))  # поисков на сайт в час
+# Бюджет по источникам (CACHE_WARM_BUDGET_ZZAP=10 и т.д.); не заданные - CACHE_WARM_BUDGET_PER_HOUR
+CACHE_WARM_SOURCE_BUDGET_PER_HOUR = {
+    source: int(os.environ[f"CACHE_WARM_BUDGET_{source.upper()}"])
+    for source in ("zzap", "stparts", "trast", "autovid", "autotrade")
+    if os.getenv(f"CACHE_WARM_BUDGET_{source.upper()}")
+}
+
+# Статистика кэша (таблица cache_stats, /api/cache-stats): размер окна и период записи счётчиков worker'ом
+CACHE_STATS_WINDOW_MIN = int(os.getenv("CACHE_STATS_WINDOW_MIN", "60"))
+CACHE_STATS_FLUSH_SEC = int(os.getenv("CACHE_STATS_FLUSH_SEC", "60"))
+
+# История цен: сырые точки хранятся RAW дней, дневные агрегаты - DAILY дней, недельные - всегда (0 - хранить всё)
+PRICE_HISTORY_RAW_RETENTION_DAYS = int(os.getenv("PRICE_HISTORY_RAW_RETENTION_DAYS", "90"))
+PRICE_HISTORY_DAILY_RETENTION_DAYS = int(os.getenv("PRICE_HISTORY_DAILY_RETENTION_DAYS", "730"))
+
+# Архив задач: DONE/ERROR старше N дней переносятся из tasks в сжатые файлы по дням (0 - не архивировать)
+TASK_ARCHIVE_DIR = Path(os.getenv("TASK_ARCHIVE_DIR", str(DB_PATH.parent / "archive")))
+TASK_ARCHIVE_AFTER_DAYS = int(os.getenv("TASK_ARCHIVE_AFTER_DAYS", "30"))
+TASK_ARCHIVE_BATCH = int(os.getenv("TASK_ARCHIVE_BATCH", "1000"))
+
+# Кэш списков брендов по артикулу для /api/brands (модальное окно ZZAP + бренды из результатов worker'а)
+BRAND_CACHE_TTL_HOURS = int(os.getenv("BRAND_CACHE_TTL_HOURS", "168"))  # 7 дней
+BRAND_CACHE_NEGATIVE_TTL_MIN = int(os.getenv("BRAND_CACHE_NEGATIVE_TTL_MIN", "10"))  # "брендов нет"
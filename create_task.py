@@ -1,7 +1,11 @@
-import sqlite3
+from partnumbers import normalize_partnumber
+from storage import connect
 
-conn = sqlite3.connect('tasks.db')
-conn.execute('INSERT INTO tasks (partnumber, status) VALUES (?, ?)', ('1920QK', 'PENDING'))
+conn = connect()
+conn.execute(
+    'INSERT INTO tasks (partnumber, partnumber_norm, status) VALUES (?, ?, ?)',
+    ('1920QK', normalize_partnumber('1920QK'), 'PENDING'),
+)
 conn.commit()
 print('✅ Задача создана: 1920QK')
 conn.close()
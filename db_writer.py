@@ -0,0 +1,164 @@
+"""
+Единственный писатель в БД worker'а.
+
+Записи (кэш цен, бренды, история цен, итог задачи) ставятся в очередь как
+намерения fn(conn, *args); поток-писатель забирает всё, что накопилось за
+DB_WRITER_LINGER_MS (до DB_WRITER_MAX_BATCH), и коммитит одной транзакцией -
+один fsync на пачку вместо commit() на каждую запись.
+
+- Порядок: одна FIFO-очередь и один поток - записи задачи применяются в порядке
+  постановки (кэш -> история -> статус задачи)
+- Один писатель на файл БД (store_writers): хранилища в разных файлах
+  пишутся параллельно, порядок сохраняется внутри файла
+- Каждое намерение - в своём SAVEPOINT: ошибка одного не откатывает остальные
+- submit() не ждёт записи; write() - дождаться коммита из async-кода.
+  Запись, отменённая до начала пачки, пропускается; начатая - коммитится
+- fn не вызывает commit(): транзакцией управляет писатель
+
+Все записи worker'а идут через писателей: кэш цен и брендов, обслуживание
+price_cache (compact), счётчики cache_stats, захват задач
+(claim_duplicate_tasks), история цен, итог задачи, архив. Мимо писателя
+пишут только migrate.py (до старта worker'а) и API (свои запросы через run_db).
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import DB_WRITER_MAX_BATCH, DB_WRITER_LINGER_MS
+from storage import connect, store_files
+
+logger = logging.getLogger(__name__)
+
+WriteIntent = Tuple[Callable[..., Any], Tuple[Any, ...], Future]
+
+# Сигнал остановки потока-писателя
+_STOP = object()
+
+
+class DbWriter:
+    """Поток-писатель с очередью намерений и групповыми транзакциями."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_batch: int = DB_WRITER_MAX_BATCH,
+        linger_sec: float = DB_WRITER_LINGER_MS / 1000,
+    ) -> None:
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.linger_sec = linger_sec
+        self.batches = 0
+        self.writes = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Поставить запись fn(conn, *args) в очередь; Future завершится после коммита."""
+        future: Future = Future()
+        self._queue.put((fn, args, future))
+        self.start()
+        return future
+
+    async def write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Записать и дождаться коммита, не блокируя event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Дождаться коммита всего, что поставлено в очередь до вызова."""
+        self.submit(lambda conn: None).result(timeout)
+
+    def close(self) -> None:
+        """Записать оставшееся и остановить поток."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def _next_batch(self) -> Tuple[List[WriteIntent], bool]:
+        """Первое намерение (ожидание без таймаута) и всё, что пришло за linger_sec."""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.linger_sec
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        conn = connect(self.db_path)
+        conn.isolation_level = None  # BEGIN/COMMIT - вручную
+        try:
+            stop = False
+            while not stop:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch: List[WriteIntent]) -> None:
+        # Отменённые ожидающим (write() в отменённой задаче) не записываются; остальные
+        # переходят в RUNNING и отменить их уже нельзя - set_result() не упадёт
+        batch = [intent for intent in batch if intent[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                conn.execute("SAVEPOINT write_intent")
+                try:
+                    result = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write_intent")
+                    conn.execute("RELEASE write_intent")
+                    logger.error(f"[db_writer] Ошибка записи {getattr(fn, '__name__', fn)}: {e}")
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute("RELEASE write_intent")
+                    outcomes.append((future, result, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # BEGIN/COMMIT не прошли (БД занята дольше busy_timeout) - пачка не записана
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"[db_writer] Пачка из {len(batch)} записей не записана: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def store_writers() -> Dict[str, DbWriter]:
+    """Писатель на каждый файл хранилищ: {хранилище: DbWriter} (хранилища одного файла - один писатель)."""
+    writers: Dict[str, DbWriter] = {}
+    for path, stores in store_files().items():
+        writer = DbWriter(path)
+        for store in stores:
+            writers[store] = writer
+    return writers
@@ -130,54 +130,10 @@ else
     log_info ".env file already exists"
 fi
 
-# Step 7: Initialize database
-log_info "Initializing database..."
-if [ ! -f "$INSTALL_DIR/data/tasks.db" ]; then
-    # Create empty database with schema
-    cat > /tmp/init_db.py << 'EOF'
-import sqlite3
-import sys
-
-db_path = sys.argv[1] if len(sys.argv) > 1 else "tasks.db"
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tasks (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        partnumber TEXT NOT NULL,
-        search_brand TEXT,
-        status TEXT NOT NULL DEFAULT 'PENDING',
-        min_price REAL,
-        avg_price REAL,
-        zzap_min_price REAL,
-        stparts_min_price REAL,
-        trast_min_price REAL,
-        autovid_min_price REAL,
-        autotrade_min_price REAL,
-        brand TEXT,
-        result_url TEXT,
-        error_message TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        started_at TIMESTAMP,
-        completed_at TIMESTAMP
-    )
-""")
-
-# Add new columns if they don't exist (migration for existing databases)
-for column in ['trast_min_price', 'autovid_min_price', 'autotrade_min_price']:
-    try:
-        cursor.execute(f"ALTER TABLE tasks ADD COLUMN {column} REAL")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-conn.commit()
-conn.close()
-print(f"Database initialized: {db_path}")
-EOF
-    python3 /tmp/init_db.py "$INSTALL_DIR/data/tasks.db"
-    rm /tmp/init_db.py
-fi
+# Step 7: Database
+# Схему создаёт и обновляет сервис migrate (python migrate.py) перед запуском web и worker
+log_info "Database schema is applied by the migrate service on start"
+mkdir -p "$INSTALL_DIR/data"
 
 # Step 8: Build Docker images
 log_info "Building Docker images..."
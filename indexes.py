@@ -0,0 +1,73 @@
+"""
+Индексы tasks / price_history / price_cache / task_source_results и горячие запросы, под которые они подобраны.
+
+Запросы worker'а и API к этим таблицам берутся отсюда, поэтому тест
+tests/test_indexes.py проверяет EXPLAIN QUERY PLAN именно тех запросов, что
+выполняются в работе: ни один не должен откатиться к полному сканированию.
+
+- Частичный индекс PENDING-задач: выбор следующей задачи не читает DONE/ERROR
+- Ключ дубликатов задачи - (partnumber_norm, search_brand_key): оба считаются в Python
+  (partnumbers.py), UPPER() SQLite не меняет регистр кириллицы
+- Составные индексы (partnumber_norm, ...) вместо одиночных: фильтр и сортировка одним индексом
+- Индексы создаются миграциями (migrate.py): новый индекс - новая миграция
+"""
+
+from typing import Dict
+
+# ========== Горячие запросы ==========
+
+# Следующая задача worker'а
+PENDING_TASK_SQL = "SELECT id, partnumber, search_brand FROM tasks WHERE status = 'PENDING' ORDER BY created_at ASC LIMIT 1"
+
+# Ключ задачи для объединения дубликатов: normalize_partnumber(), normalize_brand_key()
+SAME_TASK_KEY_SQL = "partnumber_norm = ? AND search_brand_key = ?"
+
+# Дубликаты задачи, которые worker забирает вместе с ней (task_id, partnumber_norm, search_brand_key)
+DUPLICATE_TASKS_SQL = f"SELECT id FROM tasks WHERE status = 'PENDING' AND id != ? AND {SAME_TASK_KEY_SQL}"
+
+# Ожидающая/выполняющаяся задача с тем же ключом (POST /api/tasks: partnumber_norm, search_brand_key)
+ACTIVE_TASK_SQL = f"""
+    SELECT id FROM tasks
+    WHERE status IN ('PENDING', 'RUNNING') AND {SAME_TASK_KEY_SQL}
+    ORDER BY created_at ASC
+    LIMIT 1
+"""
+
+# GET /api/tasks (tasks_view - tasks с ценами источников, task_results.py)
+TASKS_LIST_SQL = "SELECT * FROM tasks_view ORDER BY created_at DESC"
+
+# /api/article-brands (partnumber_norm)
+ARTICLE_BRANDS_SQL = """
+    SELECT DISTINCT brand FROM tasks
+    WHERE partnumber_norm = ?
+      AND brand IS NOT NULL
+      AND brand != ''
+"""
+
+
+# ========== Индексы ==========
+
+# Индексы, которые дают миграции (migrate.py, версии 6, 8 и 9): имя -> таблица.
+# DDL - в самих миграциях: применённая миграция не меняется, новый индекс - новая версия
+INDEXES: Dict[str, str] = {
+    'idx_tasks_pending': 'tasks',
+    'idx_tasks_search_key': 'tasks',
+    'idx_tasks_brand': 'tasks',
+    'idx_tasks_created_at': 'tasks',
+    # Срок хранения (prune_price_history); выборки по артикулу идут из агрегатов price_history_*
+    'idx_price_history_recorded_at': 'price_history',
+    'idx_price_cache_norm_source': 'price_cache',
+    # p95 времени источника (task_results.SOURCE_LATENCY_SQL): порядок elapsed_ms - из индекса
+    'idx_task_source_results_latency': 'task_source_results',
+}
+
+# Заменены индексами выше и удаляются миграциями 8 и 9
+OBSOLETE_INDEXES = (
+    'idx_tasks_partnumber_norm',
+    'idx_tasks_key',
+    'idx_price_history_partnumber',
+    'idx_price_history_partnumber_norm',
+    'idx_price_history_norm_recorded',
+    'idx_price_cache_lookup',
+    'idx_price_cache_partnumber_norm',
+)
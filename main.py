@@ -9,13 +9,18 @@ import sqlite3
 import httpx
 import os
 
-from config import DB_PATH
+from config import DB_PATH, HISTORY_DB_PATH
+from partnumbers import normalize_partnumber
+from storage import close_pools, run_db
+from indexes import ARTICLE_BRANDS_SQL
+from price_history import ROLLUPS, load_rollups, summarize_rollups
 
 # Perplexity API
 PERPLEXITY_API_KEY = os.getenv("PERPLEXITY_API_KEY", "")
 PERPLEXITY_MODEL = "sonar-pro"
 from backend.api.tasks_api import router as tasks_router
 from backend.api.brands_api import router as brands_router
+from backend.api.stats_api import router as stats_router
 
 BASEDIR = Path(__file__).resolve().parent
 
@@ -33,6 +38,7 @@ app.add_middleware(
 # API роутеры
 app.include_router(tasks_router, prefix="/api", tags=["tasks"])
 app.include_router(brands_router, prefix="/api", tags=["brands"])
+app.include_router(stats_router, prefix="/api", tags=["stats"])
 
 # НОВОЕ: Редирект с корня на tasks.html
 @app.get("/")
@@ -40,68 +46,54 @@ async def root():
     return RedirectResponse(url="/tasks.html")
 
 
+def select_article_brands(conn: sqlite3.Connection, partnumber_norm: str) -> List[tuple]:
+    return conn.execute(ARTICLE_BRANDS_SQL, (partnumber_norm,)).fetchall()
+
+
 @app.get("/api/article-brands")
 async def get_article_brands(partnumber: Optional[str] = None) -> Dict[str, Any]:
     """Возвращает бренды, найденные ранее для этого артикула"""
     if not partnumber:
         return {"brands": []}
 
-    conn = sqlite3.connect(str(DB_PATH))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            SELECT DISTINCT brand FROM tasks
-            WHERE LOWER(partnumber) = LOWER(?)
-              AND brand IS NOT NULL
-              AND brand != ''
-            """,
-            (partnumber,),
-        )
-        brands = [row[0] for row in cursor.fetchall()]
-    finally:
-        conn.close()
-
-    return {"brands": brands}
+    rows = await run_db(select_article_brands, normalize_partnumber(partnumber), db_path=DB_PATH, row_factory=None)
+    return {"brands": [row[0] for row in rows]}
 
 
 # === Price history API ===
 @app.get("/api/price-history/{partnumber}")
-async def get_price_history(partnumber: str, days: int = 30) -> Dict[str, Any]:
+async def get_price_history(partnumber: str, days: int = 30, period: str = "day") -> Dict[str, Any]:
     """
-    История цен по артикулу за N дней по всем источникам.
-    Формат: { partnumber, history: [{source, price, recorded_at, brand}, ...] }
+    История цен по артикулу за N дней по всем источникам - агрегаты по дням или неделям
+    (period: day или week), а не сырые точки.
+    Формат: { partnumber, period, history: [{source, brand, period_start, first_price,
+              last_price, min_price, max_price, first_at, last_at, points}, ...] }
+    Сырые точки с полями price/recorded_at больше не отдаются: они удаляются через
+    PRICE_HISTORY_RAW_RETENTION_DAYS, цена периода - first_price/last_price.
     """
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            SELECT partnumber, brand, source, price, recorded_at
-            FROM price_history
-            WHERE partnumber = ?
-              AND recorded_at >= datetime('now', ?)
-            ORDER BY recorded_at DESC
-            """,
-            (partnumber, f"-{int(days)} days"),
-        )
-        rows = cursor.fetchall()
-    finally:
-        conn.close()
+    if period not in ROLLUPS:
+        raise HTTPException(status_code=400, detail=f"period: {', '.join(ROLLUPS)}")
+
+    rollups = await run_db(load_rollups, normalize_partnumber(partnumber), days, period, db_path=HISTORY_DB_PATH)
 
     history: List[Dict[str, Any]] = [
         {
-            "partnumber": row["partnumber"],
-            "brand": row["brand"],
-            "source": row["source"],
-            "price": row["price"],
-            "recorded_at": row["recorded_at"],
+            "partnumber": partnumber,
+            "brand": rollup["brand"],
+            "source": rollup["source"],
+            "period_start": rollup["period"],
+            "first_price": rollup["first_price"],
+            "last_price": rollup["last_price"],
+            "min_price": rollup["min_price"],
+            "max_price": rollup["max_price"],
+            "first_at": rollup["first_at"],
+            "last_at": rollup["last_at"],
+            "points": rollup["points"],
         }
-        for row in rows
+        for rollup in rollups
     ]
 
-    return {"partnumber": partnumber, "history": history}
+    return {"partnumber": partnumber, "period": period, "history": history}
 
 
 # === Perplexity AI ===
@@ -136,47 +128,21 @@ async def ask_ai(request: AskAIRequest):
     # История цен за 30 дней по всем источникам (только если есть partnumber)
     history_summary = ""
     if request.partnumber:
-        try:
-            conn = sqlite3.connect(str(DB_PATH))
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT source, price, recorded_at
-                FROM price_history
-                WHERE partnumber = ?
-                  AND recorded_at >= datetime('now', '-30 days')
-                ORDER BY recorded_at ASC
-                """,
-                (request.partnumber,),
-            )
-            rows = cursor.fetchall()
-        finally:
-            if 'conn' in locals():
-                conn.close()
-    else:
-        rows = []
-
-    if rows:
-        # Группируем по источникам и собираем краткое описание динамики
-        by_source: Dict[str, List[sqlite3.Row]] = {}
-        for row in rows:
-            by_source.setdefault(row["source"], []).append(row)
+        # Краткое описание динамики по источникам - из дневных агрегатов
+        rollups = await run_db(load_rollups, normalize_partnumber(request.partnumber), 30, db_path=HISTORY_DB_PATH)
+        summary = summarize_rollups(rollups)
 
         lines: List[str] = []
-        for source, items in by_source.items():
-            prices = [it["price"] for it in items]
-            if not prices:
-                continue
-            first_price = prices[0]
-            last_price = prices[-1]
-            if len(prices) == 1:
+        for source, stats in summary.items():
+            first_price = stats["first_price"]
+            last_price = stats["last_price"]
+            if stats["points"] == 1:
                 desc = f"{source}: около {last_price}₽ (одна точка за период)"
             else:
                 trend = "стабильно" if abs(last_price - first_price) < 1e-6 else (
                     "выросла" if last_price > first_price else "снизилась"
                 )
-                desc = f"{source}: {first_price}→{last_price}₽, {trend} за период (всего {len(prices)} точек)"
+                desc = f"{source}: {first_price}→{last_price}₽, {trend} за период (всего {stats['points']} точек)"
             lines.append(desc)
 
         if lines:
@@ -264,6 +230,12 @@ async def ask_ai(request: AskAIRequest):
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+@app.on_event("shutdown")
+async def shutdown_db_pools():
+    """Закрыть подключения к БД из пула."""
+    close_pools()
+
+
 # Статические файлы (фронтенд) - ВАЖНО: должно быть в конце, после всех API эндпоинтов!
 app.mount("/", StaticFiles(directory=BASEDIR / "sites", html=True), name="static")
 
@@ -1,15 +1,325 @@
+"""
+Миграции схемы БД с номером версии.
+
+Запуск: python migrate.py [--db PATH] [--status]
+(в Docker - сервис migrate перед web и worker).
+
+- Применённые версии хранятся в schema_migrations; каждая миграция
+  применяется один раз, в своей транзакции (BEGIN IMMEDIATE ... COMMIT)
+- Хранилища (storage.STORES) могут жить в разных файлах: у каждого файла
+  своя schema_migrations. Шаг {хранилище: шаг} выполняется только в файле
+  этого хранилища, шаг-функция - в каждом файле
+- API и worker при старте DDL не выполняют и блокировку записи не берут:
+  pending_store_migrations() только читает schema_migrations (mode=ro), при
+  отставании схемы процесс не стартует
+- Шаги миграций не вызывают commit(): транзакцией управляет migrate().
+  Исключение - OUTSIDE_TRANSACTION (VACUUM в транзакции невозможен): такой
+  шаг выполняется перед транзакцией миграции и должен быть идемпотентен
+- Новое изменение схемы - новая запись в конец MIGRATIONS; применённые не
+  редактируются. Первые миграции идемпотентны: БД, созданная до
+  schema_migrations, проходит их без ошибок
+"""
+
+import argparse
 import sqlite3
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from brand_cache import BRAND_CACHE_SCHEMA
+from cache_stats import CACHE_STATS_SCHEMA
+from partnumbers import ensure_partnumber_norm, normalize_brand_key
+from price_cache import ensure_incremental_vacuum
+from price_history import ensure_recorded_day, ensure_rollups
+from storage import STORES, connect, connect_readonly, store_files
+from task_results import ensure_task_source_results
+
+MigrationStep = Callable[[sqlite3.Connection], None]
+
+# (версия, имя, шаг для всего файла или {хранилище: шаг} - только в файле хранилища)
+Migration = Tuple[int, str, Union[MigrationStep, Dict[str, MigrationStep]]]
+
+SCHEMA_MIGRATIONS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def add_column(conn: sqlite3.Connection, table: str, col_def: str) -> None:
+    """ALTER TABLE ADD COLUMN, если колонки ещё нет."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if col_def.split()[0] not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {col_def}")
+
+
+def initial_schema(conn: sqlite3.Connection) -> None:
+    """tasks, price_history, price_cache; колонки, которых нет в БД ранних версий."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,  -- каноническая форма (partnumbers.normalize_partnumber)
+            search_brand TEXT,
+            status TEXT NOT NULL DEFAULT 'PENDING',
+            min_price REAL,
+            avg_price REAL,
+            brand TEXT,
+            result_url TEXT,
+            stale_sources TEXT,  -- источники с устаревшей ценой из кэша (через запятую)
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP
+        )
+        """
+    )
+
+    # История цен по источникам
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,
+            brand TEXT,
+            source TEXT NOT NULL,  -- zzap, stparts, autovid, trast, autotrade
+            price REAL NOT NULL,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+    # Кэш цен
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS price_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,
+            brand TEXT,
+            source TEXT NOT NULL,  -- zzap, stparts, autovid, trast, autotrade
+            price REAL,
+            url TEXT,
+            status TEXT DEFAULT 'success',  -- success или негативный: not_found, NO_RESULTS, blocked
+            offers TEXT,  -- JSON [[brand, price, stock, title], ...]: все предложения без фильтра бренда
+            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+    for col_def in ('search_brand TEXT', 'brand TEXT', 'stale_sources TEXT'):
+        add_column(conn, 'tasks', col_def)
+    for col_def in ("status TEXT DEFAULT 'success'", 'offers TEXT'):
+        add_column(conn, 'price_cache', col_def)
+
+
+def partnumber_norm(conn: sqlite3.Connection) -> None:
+    """Нормализованный артикул: колонка с индексом, заполнение старых строк."""
+    for table in ('tasks', 'price_history', 'price_cache'):
+        ensure_partnumber_norm(conn, table)
+
+
+def cache_tables(conn: sqlite3.Connection) -> None:
+    """Статистика кэша цен по окнам (/api/cache-stats) и бренды артикулов (/api/brands)."""
+    conn.execute(CACHE_STATS_SCHEMA)
+    conn.execute(BRAND_CACHE_SCHEMA)
+
+
+def hot_query_indexes_tasks(conn: sqlite3.Connection) -> None:
+    """Индексы горячих запросов к tasks (indexes.py) вместо одиночного по partnumber_norm."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_pending ON tasks(created_at) WHERE status = 'PENDING'")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_key "
+        "ON tasks(partnumber_norm, COALESCE(UPPER(TRIM(search_brand)), ''), status)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_brand ON tasks(partnumber_norm, brand)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_partnumber_norm")
+
+
+def hot_query_indexes_history(conn: sqlite3.Connection) -> None:
+    """Срок хранения price_history - по recorded_at; выборки по артикулу - из агрегатов."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_price_history_recorded_at ON price_history(recorded_at)")
+    for name in ('idx_price_history_partnumber', 'idx_price_history_partnumber_norm', 'idx_price_history_norm_recorded'):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def hot_query_indexes_cache(conn: sqlite3.Connection) -> None:
+    """Поиск в price_cache (price_cache.lookup_sql) одним составным индексом."""
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_price_cache_norm_source ON price_cache(partnumber_norm, source, cached_at)"
+    )
+    for name in ('idx_price_cache_lookup', 'idx_price_cache_partnumber_norm'):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def tasks_search_brand_key(conn: sqlite3.Connection) -> None:
+    """Ключ бренда задачи (partnumbers.normalize_brand_key) колонкой с индексом вместо UPPER() SQLite."""
+    try:
+        conn.execute("ALTER TABLE tasks ADD COLUMN search_brand_key TEXT NOT NULL DEFAULT ''")
+    except sqlite3.OperationalError:
+        pass  # Колонка уже существует
+    rows = conn.execute("SELECT id, search_brand FROM tasks WHERE search_brand IS NOT NULL").fetchall()
+    conn.executemany(
+        "UPDATE tasks SET search_brand_key = ? WHERE id = ?",
+        [(normalize_brand_key(row[1]), row[0]) for row in rows],
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_tasks_search_key ON tasks(partnumber_norm, search_brand_key, status)"
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_tasks_key")
+
+
+# По возрастанию версии; применённые версии не редактируются.
+# 1-6 - шаги для всего файла (до разделения хранилищ): в каждом файле хранилищ
+# создают полную схему, таблицы хранилищ из других файлов в нём остаются пустыми.
+# Новые версии - шаги по хранилищам {хранилище: шаг}
+MIGRATIONS: List[Migration] = [
+    (1, 'initial_schema', initial_schema),
+    (2, 'partnumber_norm', partnumber_norm),
+    (3, 'cache_tables', cache_tables),
+    (4, 'price_history_recorded_day', ensure_recorded_day),
+    (5, 'price_history_rollups', ensure_rollups),
+    (6, 'task_source_results', ensure_task_source_results),
+    (7, 'price_cache_incremental_vacuum', {'cache': ensure_incremental_vacuum}),
+    (8, 'hot_query_indexes', {
+        'tasks': hot_query_indexes_tasks,
+        'history': hot_query_indexes_history,
+        'cache': hot_query_indexes_cache,
+    }),
+    (9, 'tasks_search_brand_key', {'tasks': tasks_search_brand_key}),
+]
+
+
+# Шаги, которые SQLite не выполняет внутри транзакции
+OUTSIDE_TRANSACTION: Set[MigrationStep] = {ensure_incremental_vacuum}
+
+
+def migration_steps(step: Union[MigrationStep, Dict[str, MigrationStep]], stores: List[str]) -> List[MigrationStep]:
+    """Шаги миграции для файла с хранилищами stores."""
+    if isinstance(step, dict):
+        return [step[store] for store in stores if store in step]
+    return [step]
+
+
+def applied_versions(conn: sqlite3.Connection) -> List[int]:
+    """Применённые версии (без DDL: нет schema_migrations - нет версий)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+    ).fetchone()
+    if not exists:
+        return []
+    return [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+
+
+def pending_migrations(conn: sqlite3.Connection) -> List[Migration]:
+    """Неприменённые миграции - проверка схемы при старте API и worker'а."""
+    applied = set(applied_versions(conn))
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def migrate(conn: sqlite3.Connection, stores: Iterable[str] = tuple(STORES)) -> List[Migration]:
+    """
+    Применить неприменённые миграции по порядку - шаги хранилищ stores, которые живут в файле conn.
+
+    Ошибка миграции откатывает только её; следующие не применяются.
+
+    Returns:
+        Применённые сейчас миграции
+    """
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # BEGIN/COMMIT - вручную: DDL тоже внутри транзакции
+    stores = [store for store in STORES if store in set(stores)]
+    applied: List[Migration] = []
+    try:
+        conn.execute(SCHEMA_MIGRATIONS_SCHEMA)
+        for migration in pending_migrations(conn):
+            version, name, step = migration
+            steps = migration_steps(step, stores)
+            for fn in steps:
+                if fn in OUTSIDE_TRANSACTION:
+                    fn(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Параллельный migrate.py мог применить её, пока мы ждали блокировку
+                if version not in applied_versions(conn):
+                    for fn in steps:
+                        if fn not in OUTSIDE_TRANSACTION:
+                            fn(conn)
+                    conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+                    applied.append(migration)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
+
+
+def pending_store_migrations() -> Dict[Path, List[Migration]]:
+    """
+    Неприменённые миграции по файлам хранилищ - только файлы, где они есть.
+
+    Только чтение (mode=ro): файл не создаётся и не переводится в WAL.
+    """
+    pending = {}
+    for path in store_files():
+        if not path.exists():
+            pending[path] = list(MIGRATIONS)
+            continue
+        conn = connect_readonly(path)
+        try:
+            file_pending = pending_migrations(conn)
+        finally:
+            conn.close()
+        if file_pending:
+            pending[path] = file_pending
+    return pending
+
+
+def describe_pending(pending: Dict[Path, List[Migration]]) -> str:
+    """Текст ошибки старта API/worker'а при отставании схемы."""
+    files = "; ".join(
+        f"{path.name}: " + ", ".join(f"{version:03d} {name}" for version, name, _ in migrations)
+        for path, migrations in pending.items()
+    )
+    return f"Схема БД устарела (не применены: {files}). Выполните: python migrate.py"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--db", type=Path, help="все хранилища в одном файле (по умолчанию - пути из config)")
+    parser.add_argument("--status", action="store_true", help="только показать неприменённые миграции")
+    args = parser.parse_args(argv)
+
+    files = {args.db: tuple(STORES)} if args.db else store_files()
+    for path, stores in files.items():
+        conn = connect(path)
+        try:
+            if args.status:
+                pending = pending_migrations(conn)
+                print(f"📁 {path} ({', '.join(stores)}): применено {len(MIGRATIONS) - len(pending)}/{len(MIGRATIONS)}")
+                for version, name, _ in pending:
+                    print(f"   ⏳ {version:03d} {name}")
+                continue
+
+            try:
+                applied = migrate(conn, stores)
+            except Exception as e:
+                print(f"❌ Ошибка миграции {path}: {e}")
+                return 1
+            for version, name, _ in applied:
+                print(f"✅ {version:03d} {name}")
+            print(f"✅ Схема актуальна: версия {MIGRATIONS[-1][0]} ({path}: {', '.join(stores)})")
+        finally:
+            conn.close()
+    return 0
+
 
-conn = sqlite3.connect('tasks.db')
-cursor = conn.cursor()
-
-try:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN zzap_min_price REAL")
-    cursor.execute("ALTER TABLE tasks ADD COLUMN stparts_min_price REAL")
-    conn.commit()
-    print("✅ Миграция выполнена успешно!")
-except Exception as e:
-    print(f"❌ Ошибка: {e}")
-    print("💡 Возможно, поля уже существуют - это нормально")
-finally:
-    conn.close()
+if __name__ == "__main__":
+    sys.exit(main())
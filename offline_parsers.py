@@ -0,0 +1,581 @@
+"""
+Offline парсеры результатов поиска (без браузера).
+
+Разбирают HTML/текст, полученный через fetch() внутри авторизованной страницы,
+без навигации, layout и выполнения скриптов. Используются также live-путём
+клиентов, чтобы оба пути давали одинаковый результат.
+
+Зависят только от стандартной библиотеки - тестируются без Playwright.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import unquote
+
+from partnumbers import normalize_partnumber
+
+# Элементы без закрывающего тега
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+}
+
+# Содержимое этих тегов не является текстом страницы
+SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template', 'head'}
+
+# Блочные теги - перенос строки, как в innerText
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'section', 'table',
+    'tbody', 'thead', 'tfoot', 'tr', 'ul',
+}
+
+# Ячейки таблицы разделяются табуляцией, как в innerText
+CELL_TAGS = {'td', 'th'}
+
+
+class HtmlNode:
+    """Минимальный DOM-узел: тег, атрибуты, дети (узлы или строки)."""
+
+    def __init__(self, tag: str, attrs: Optional[Dict[str, str]] = None, parent: Optional["HtmlNode"] = None) -> None:
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.parent = parent
+        self.children: List[Any] = []
+
+    @property
+    def classes(self) -> List[str]:
+        return (self.attrs.get('class') or '').split()
+
+    def find_all(self, tag: Optional[str] = None, class_contains: Optional[str] = None) -> List["HtmlNode"]:
+        """Все потомки с тегом tag и/или классом, содержащим подстроку class_contains."""
+        found = []
+        for child in self.children:
+            if not isinstance(child, HtmlNode):
+                continue
+            tag_ok = tag is None or child.tag == tag
+            class_ok = class_contains is None or any(class_contains in c for c in child.classes)
+            if tag_ok and class_ok:
+                found.append(child)
+            found.extend(child.find_all(tag, class_contains))
+        return found
+
+    def text(self) -> str:
+        """Текст узла в стиле innerText: блоки с новой строки, ячейки через таб."""
+        parts: List[str] = []
+        self._collect_text(parts)
+        text = ''.join(parts)
+        text = re.sub(r'[ \t\r\f\v]*\n[ \t\r\f\v]*', '\n', text)
+        text = re.sub(r'\n{2,}', '\n', text)
+        return text.strip()
+
+    def _collect_text(self, parts: List[str]) -> None:
+        if self.tag in SKIP_TEXT_TAGS:
+            return
+        if self.tag in BLOCK_TAGS:
+            parts.append('\n')
+        for child in self.children:
+            if isinstance(child, HtmlNode):
+                child._collect_text(parts)
+            else:
+                parts.append(re.sub(r'[ \t\r\n\f\v]+', ' ', child))
+        if self.tag in CELL_TAGS:
+            parts.append('\t')
+        elif self.tag in BLOCK_TAGS:
+            parts.append('\n')
+
+
+class _TreeBuilder(HTMLParser):
+    """Строит дерево HtmlNode, терпимо к незакрытым тегам."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.root = HtmlNode('#document')
+        self._current = self.root
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        node = HtmlNode(tag, {k: (v or '') for k, v in attrs}, self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self._current.children.append(HtmlNode(tag, {k: (v or '') for k, v in attrs}, self._current))
+
+    def handle_endtag(self, tag: str) -> None:
+        # Поднимаемся до ближайшего открытого тега с таким именем
+        node = self._current
+        while node is not None and node.tag != tag:
+            node = node.parent
+        if node is not None and node.parent is not None:
+            self._current = node.parent
+
+    def handle_data(self, data: str) -> None:
+        self._current.children.append(data)
+
+
+def parse_html(html: str) -> HtmlNode:
+    """Разобрать HTML в дерево HtmlNode."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def html_to_text(html: str) -> str:
+    """Текст страницы (аналог inner_text('body'))."""
+    root = parse_html(html)
+    bodies = root.find_all('body')
+    return (bodies[0] if bodies else root).text()
+
+
+# ========== ZZAP / STparts: списки брендов ==========
+
+def _unique_brands(brands: List[str]) -> List[str]:
+    """Бренды без пустых и повторов (без учёта регистра), в исходном порядке."""
+    result: List[str] = []
+    seen = set()
+    for brand in brands:
+        brand = brand.strip()
+        if brand and brand.upper() not in seen:
+            seen.add(brand.upper())
+            result.append(brand)
+    return result
+
+
+def parse_zzap_modal_rows(row_texts: List[str]) -> List[str]:
+    """Бренды из строк модального окна ZZAP (бренд, артикул, описание через табуляцию)."""
+    return _unique_brands([row_text.strip().split('\t')[0] for row_text in row_texts])
+
+
+def parse_stparts_brand_links(hrefs: List[str], partnumber: Optional[str] = None) -> List[str]:
+    """Бренды из ссылок "Цены и аналоги" STparts: /search/{Brand}/{partnumber}.
+
+    В URL пробелы бренда заменены дефисами (Peugeot-Citroen). Если указан
+    partnumber - ссылки на другие артикулы (аналоги) пропускаются.
+    """
+    brands: List[str] = []
+    for href in hrefs or []:
+        match = re.search(r'/search/([^/?#]+)/([^/?#]+)', href or '')
+        if not match:
+            continue
+        if partnumber and normalize_partnumber(unquote(match.group(2))) != normalize_partnumber(partnumber):
+            continue
+        brands.append(unquote(match.group(1)).replace('-', ' '))
+    return _unique_brands(brands)
+
+
+# ========== ZZAP / STparts: фильтр бренда ==========
+
+def zzap_matches_brand_filter(row_brand: Optional[str], brand_filter: Optional[str]) -> bool:
+    """Бренд строки ZZAP содержит фильтр; строка без бренда не подходит."""
+    if not brand_filter:
+        return True
+    return bool(row_brand) and brand_filter.lower() in row_brand.lower()
+
+
+def stparts_matches_brand_filter(row_brand: Optional[str], brand_filter: Optional[str]) -> bool:
+    """Бренд строки STparts содержит фильтр; строка без бренда подходит."""
+    if not brand_filter or not row_brand:
+        return True
+    return brand_filter.lower() in row_brand.lower()
+
+
+# ========== Trast ==========
+
+# Маппинг брендов: что ищем -> что должно быть в производителе
+TRAST_BRAND_MAPPING = {
+    'peugeot': ['peugeot-citroen', 'peugeot', 'citroen', 'psa'],
+    'citroen': ['peugeot-citroen', 'citroen', 'peugeot', 'psa'],
+    'toyota': ['toyota'],
+    'honda': ['honda'],
+    'nissan': ['nissan'],
+    'ford': ['ford'],
+    'vw': ['volkswagen', 'vw', 'vag'],
+    'volkswagen': ['volkswagen', 'vw', 'vag'],
+    'bmw': ['bmw'],
+    'mercedes': ['mercedes', 'mercedes-benz', 'daimler'],
+    'opel': ['opel', 'gm'],
+    'renault': ['renault'],
+    'hyundai': ['hyundai', 'kia', 'mobis'],
+    'kia': ['kia', 'hyundai', 'mobis'],
+}
+
+
+def trast_matches_brand_filter(manufacturer: str, brand_filter: str) -> bool:
+    """Проверить, соответствует ли производитель фильтру по бренду."""
+    if not brand_filter or not manufacturer:
+        return True
+
+    brand_lower = brand_filter.lower().strip()
+    manuf_lower = manufacturer.lower().strip()
+
+    # Получаем список допустимых производителей для этого бренда
+    allowed_manufacturers = TRAST_BRAND_MAPPING.get(brand_lower, [brand_lower])
+
+    # Проверяем, содержит ли производитель любой из допустимых вариантов
+    return any(allowed in manuf_lower for allowed in allowed_manufacturers)
+
+
+def parse_trast_text(
+    plain_text: str,
+    brand_filter: Optional[str] = None,
+    matches_brand: Callable[[str, str], bool] = trast_matches_brand_filter,
+) -> Dict[str, Any]:
+    """Извлечь цены и бренд из текста страницы поиска Trast.
+
+    Returns:
+        {'prices': [...], 'brand': str|None, 'total': N, 'filtered': M,
+         'offers': [{'brand', 'price', 'stock', 'title'}] - все товары без фильтра бренда}
+    """
+    prices: List[float] = []
+    offers: List[Dict[str, Any]] = []
+    brand = None
+    total_count = 0
+    filtered_count = 0
+
+    # Разбиваем на блоки товаров по паттерну "Производитель:"
+    product_blocks = re.split(r'(?=Производитель:)', plain_text)
+
+    for block in product_blocks:
+        if 'Производитель:' not in block:
+            continue
+
+        total_count += 1
+
+        manuf_match = re.search(r'Производитель:\s*([^\n₽]+)', block)
+        if not manuf_match:
+            continue
+
+        manufacturer = manuf_match.group(1).strip()
+
+        val = None
+        price_match = re.search(r'([\d\s\xa0]{1,15})\s*₽', block)
+        if price_match:
+            price_str = price_match.group(1).replace(" ", "").replace("\xa0", "").strip()
+            try:
+                if price_str and 100 < float(price_str) < 500000:
+                    val = float(price_str)
+            except ValueError:
+                pass
+
+        if val is not None:
+            offers.append({'brand': manufacturer, 'price': val, 'stock': None, 'title': None})
+
+        if brand_filter and not matches_brand(manufacturer, brand_filter):
+            continue
+
+        filtered_count += 1
+
+        # Сохраняем бренд первого подходящего товара
+        if not brand:
+            brand = manufacturer
+
+        if val is not None:
+            prices.append(val)
+
+    # Если не нашли блоки с производителем, пробуем простой поиск цен
+    if not prices and not brand_filter:
+        for price_str in re.findall(r'([\d\s\xa0]{1,15})\s*₽', plain_text):
+            price_str = price_str.replace(" ", "").replace("\xa0", "").strip()
+            try:
+                if price_str:
+                    val = float(price_str)
+                    if 100 < val < 500000:
+                        prices.append(val)
+            except ValueError:
+                pass
+
+    return {
+        'prices': list(set(prices)),
+        'brand': brand,
+        'total': total_count,
+        'filtered': filtered_count,
+        'offers': offers,
+    }
+
+
+# Сообщение поиска (WooCommerce) об отсутствии товаров
+TRAST_NO_RESULTS_MARKERS = [
+    'ничего не найдено',
+    'не обнаружено',  # "Товаров, соответствующих вашему запросу, не обнаружено"
+    'no products were found',
+    'nothing found',
+]
+
+
+def trast_has_no_results(plain_text: str) -> bool:
+    """Явное сообщение Trast об отсутствии результатов поиска."""
+    text_lower = plain_text.lower()
+    return any(marker in text_lower for marker in TRAST_NO_RESULTS_MARKERS)
+
+
+def is_trast_challenge(html: str) -> bool:
+    """Страница JS-challenge вместо результатов поиска."""
+    return 'js-challenge' in html.lower() or 'jsch._jsChallenge' in html
+
+
+# ========== AutoTrade ==========
+
+AUTOTRADE_NO_RESULTS_INDICATORS = [
+    'по вашему запросу ничего не найдено',
+    'ничего не найдено',
+    'нет результатов',
+    'ничего',  # Простой маркер
+    'no results',
+]
+
+
+def autotrade_no_results_message(page_text: str) -> bool:
+    """Явное сообщение сайта об отсутствии результатов."""
+    page_text_lower = page_text.lower()
+    return any(indicator in page_text_lower for indicator in AUTOTRADE_NO_RESULTS_INDICATORS)
+
+
+def autotrade_has_no_results(page_text: str) -> bool:
+    """Сообщение об отсутствии результатов или нет ни одной строки с 'Артикул:'."""
+    if autotrade_no_results_message(page_text):
+        return True
+    return 'артикул:' not in page_text.lower()
+
+
+def autotrade_matches_brand_filter(row_brand: Optional[str], brand_filter: Optional[str]) -> bool:
+    """Бренд строки AutoTrade содержит фильтр; строка без бренда подходит."""
+    if not brand_filter or not row_brand:
+        return True
+    return brand_filter.lower() in row_brand.lower()
+
+
+def parse_autotrade_rows(row_texts: List[str], body_text: str, brand_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Извлечь цены, бренд и наличие из строк таблицы sklad.autotrade.su.
+
+    Цены берутся ТОЛЬКО из строк с "Артикул:" - иначе в цены попадает баланс счёта.
+    С brand_filter цены и наличие - только строк этого бренда; в 'offers' - все строки.
+    """
+    prices: List[float] = []
+    stock_values: List[int] = []
+    brand = None
+    items = []
+    offers: List[Dict[str, Any]] = []
+
+    article_match = re.search(r'Артикул:\s*([A-Za-z0-9\-\.]+)', body_text)
+    brand_match = re.search(r'Бренд:\s*([A-Za-zА-Яа-я0-9\-\s]+?)(?:,|$|\|)', body_text)
+    page_brand = brand_match.group(1).strip() if brand_match else None
+    if not brand_filter:
+        brand = page_brand
+
+    for row_text in row_texts:
+        if 'Артикул:' not in row_text:
+            continue
+
+        row_brand_match = re.search(r'Бренд:\s*([A-Za-zА-Яа-я0-9\-\s]+?)(?:,|$|\|)', row_text)
+        row_brand = row_brand_match.group(1).strip() if row_brand_match else page_brand
+        row_matches = autotrade_matches_brand_filter(row_brand, brand_filter)
+        if row_matches and not brand:
+            brand = row_brand
+
+        row_price = None
+        row_price_match = re.search(r'(\d[\d\s,\.]*)\s*RUB', row_text)
+        if row_price_match:
+            try:
+                price_str = row_price_match.group(1).replace(" ", "").replace("\xa0", "").replace(",", ".")
+                price_val = float(price_str)
+                if 10 < price_val < 500000:
+                    row_price = price_val
+                    if row_matches and price_val not in prices:
+                        prices.append(price_val)
+            except ValueError:
+                pass
+
+        # Наличие: "... | 11 | 22 | - | - |..." или через табуляцию
+        row_stock = set()
+        for sm in re.findall(r'\|\s*(\d+)\s*\|', row_text):
+            stock = int(sm)
+            if 0 < stock < 10000:
+                row_stock.add(stock)
+        for part in row_text.split('\t'):
+            part = part.strip()
+            if re.match(r'^\d+$', part):
+                stock = int(part)
+                if 0 < stock < 10000:
+                    row_stock.add(stock)
+        if row_matches:
+            stock_values.extend(row_stock)
+
+        if row_price is not None:
+            offers.append({
+                'brand': row_brand,
+                'price': row_price,
+                'stock': sum(row_stock) if row_stock else None,
+                'title': None,
+            })
+
+    prices = list(set(prices))
+    stock_values = list(set(stock_values))
+
+    if prices:
+        items.append({
+            'article': article_match.group(1).strip() if article_match else None,
+            'brand': brand,
+            'price': min(prices),
+            'stock': sum(stock_values) if stock_values else None,
+        })
+
+    return {'prices': prices, 'brand': brand, 'items': items, 'offers': offers}
+
+
+def parse_autotrade_html(html: str, brand_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Разобрать HTML страницы поиска AutoTrade.
+
+    'no_results' - явное сообщение сайта "ничего не найдено"; 'has_results' -
+    есть строки результатов ("Артикул:"). Нет ни того, ни другого - страница
+    не та, что ожидалась (не догрузилась, другая вёрстка), а не "товара нет".
+
+    Returns:
+        {'no_results': bool, 'has_results': bool, 'prices': [...], 'brand': ..., 'items': [...], 'offers': [...]}
+    """
+    root = parse_html(html)
+    bodies = root.find_all('body')
+    body_text = (bodies[0] if bodies else root).text()
+
+    if autotrade_has_no_results(body_text):
+        return {
+            'no_results': autotrade_no_results_message(body_text),
+            'has_results': False,
+            'prices': [], 'brand': None, 'items': [], 'offers': [],
+        }
+
+    row_texts = [row.text() for row in root.find_all('tr')]
+    data = parse_autotrade_rows(row_texts, body_text, brand_filter=brand_filter)
+    data['no_results'] = False
+    data['has_results'] = any('Артикул:' in row_text for row_text in row_texts)
+    return data
+
+
+# ========== AutoVID (WooCommerce) ==========
+
+AUTOVID_OUT_OF_STOCK_MARKERS = ['нет в наличии', 'нет на складе', 'out of stock', 'недоступен']
+
+# Только у авторизованного: ссылка "Выйти" (WooCommerce /my-account/customer-logout/,
+# WordPress wp-login.php?action=logout). Ссылка на my-account есть и у гостя
+AUTOVID_LOGGED_IN_MARKERS = ['customer-logout', 'action=logout']
+
+# (тег, подстрока класса) - в порядке приоритета, как селекторы live-парсера
+AUTOVID_PRODUCT_SELECTORS = [
+    ('li', 'product'),
+    (None, 'product-item'),
+    ('article', 'product'),
+    (None, 'product-layout'),
+    (None, 'product-thumb'),
+]
+
+
+def extract_autovid_prices(text: str) -> List[float]:
+    """Все цены из текста товара AutoVID ('4 500 руб', '3 200₽')."""
+    prices = []
+    for price_str in re.findall(r'([\d\s\xa0,.]+)\s*[₽руб]', text):
+        price_clean = price_str.replace(" ", "").replace("\xa0", "").replace(",", ".").strip()
+        try:
+            if price_clean:
+                val = float(price_clean)
+                if 10 < val < 500000:
+                    prices.append(val)
+        except ValueError:
+            continue
+    return prices
+
+
+def autovid_matches_brand_filter(product_text: Optional[str], brand_filter: Optional[str]) -> bool:
+    """Бренда у AutoVID нет: фильтр ищется в тексте карточки товара."""
+    if not brand_filter:
+        return True
+    return brand_filter.lower() in (product_text or '').lower()
+
+
+def parse_autovid_products(products: List[Dict[str, str]], brand_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Цены и бренд из карточек товаров AutoVID.
+
+    Args:
+        products: [{'text': полный текст карточки, 'price_text': текст блока цены или ''}]
+        brand_filter: Учитывать только карточки, где встречается бренд (CONTAINS)
+
+    В 'offers' попадают все карточки в наличии (без фильтра бренда); бренда
+    у AutoVID нет - фильтр по нему применяется к title (текст карточки).
+    """
+    prices: List[float] = []
+    offers: List[Dict[str, Any]] = []
+    brand = None
+    filtered_count = 0
+
+    for product in products:
+        product_text = product.get('text') or ''
+        product_text_lower = product_text.lower()
+
+        # Пропускаем товары "Нет в наличии"
+        if any(marker in product_text_lower for marker in AUTOVID_OUT_OF_STOCK_MARKERS):
+            continue
+
+        product_prices = extract_autovid_prices(product.get('price_text') or product_text)
+        if product_prices:
+            offers.append({
+                'brand': None,
+                'price': min(product_prices),
+                'stock': None,
+                'title': ' '.join(product_text.split())[:200],
+            })
+
+        if not autovid_matches_brand_filter(product_text, brand_filter):
+            continue
+
+        filtered_count += 1
+
+        if not brand and brand_filter:
+            brand = brand_filter
+
+        prices.extend(product_prices)
+
+    return {
+        'prices': list(set(prices)),
+        'brand': brand,
+        'total': len(products),
+        'filtered': filtered_count,
+        'offers': offers,
+    }
+
+
+def autovid_is_logged_in(html: str) -> bool:
+    """Страница AutoVID открыта авторизованным пользователем."""
+    html_lower = html.lower()
+    return any(marker in html_lower for marker in AUTOVID_LOGGED_IN_MARKERS)
+
+
+def parse_autovid_html(html: str, brand_filter: Optional[str] = None) -> Dict[str, Any]:
+    """Разобрать HTML страницы поиска WooCommerce AutoVID.
+
+    'no_results' - явное сообщение "ничего не найдено" (а не просто нет карточек).
+    """
+    root = parse_html(html)
+    bodies = root.find_all('body')
+    page_text = (bodies[0] if bodies else root).text().lower()
+    if 'ничего не найдено' in page_text or 'no products' in page_text:
+        return {'prices': [], 'brand': None, 'total': 0, 'filtered': 0, 'offers': [], 'no_results': True}
+
+    nodes: List[HtmlNode] = []
+    for tag, class_part in AUTOVID_PRODUCT_SELECTORS:
+        nodes = [n for n in root.find_all(tag, class_part) if class_part in n.classes or tag is None]
+        if nodes:
+            break
+
+    products = []
+    for node in nodes:
+        price_nodes = node.find_all(class_contains='price')
+        products.append({
+            'text': node.text(),
+            'price_text': price_nodes[0].text() if price_nodes else '',
+        })
+
+    data = parse_autovid_products(products, brand_filter=brand_filter)
+    data['no_results'] = False
+    return data
@@ -0,0 +1,61 @@
+"""
+Каноническая форма артикула - общий ключ для кэша цен, очереди задач и истории.
+
+"1920 QK", "1920-qk", "1920.QK" и "1920QК" (К кириллицей) - один и тот же артикул:
+регистр, пробелы, дефисы, точки и кириллические буквы-двойники не различаются.
+Исходное написание хранится в partnumber (для поиска на сайтах и отображения),
+нормализованное - в partnumber_norm (для сравнения, с индексом).
+"""
+
+import sqlite3
+from typing import Optional
+
+# Кириллические буквы, которые выглядят как латинские (после upper())
+CYRILLIC_LOOKALIKES = str.maketrans({
+    'А': 'A', 'В': 'B', 'Е': 'E', 'Ё': 'E', 'К': 'K', 'М': 'M', 'Н': 'H',
+    'О': 'O', 'Р': 'P', 'С': 'C', 'Т': 'T', 'У': 'Y', 'Х': 'X',
+})
+
+# Разделители, которые не входят в ключ: пробелы, дефисы (включая типографские), точки
+SEPARATORS = str.maketrans('', '', ' \t\n\r\xa0-‐‑‒–—.')
+
+
+def normalize_partnumber(partnumber: Optional[str]) -> str:
+    """Каноническая форма артикула для сравнения ('1920-qk ' -> '1920QK')."""
+    if not partnumber:
+        return ''
+    return partnumber.upper().translate(CYRILLIC_LOOKALIKES).translate(SEPARATORS)
+
+
+def normalize_brand_key(search_brand: Optional[str]) -> str:
+    """
+    Ключ бренда задачи для сравнения (' Бош ' -> 'БОШ', None -> '').
+
+    Считается в Python: UPPER() SQLite меняет регистр только у ASCII,
+    и 'Бош' с 'БОШ' были бы разными задачами.
+    """
+    return (search_brand or '').strip().upper()
+
+
+def ensure_partnumber_norm(conn: sqlite3.Connection, table: str) -> None:
+    """
+    Миграция: колонка partnumber_norm с индексом, заполнение старых строк.
+
+    Шаг миграции (migrate.py), без commit(); повторный вызов дешёвый:
+    заполняются только строки с partnumber_norm IS NULL.
+    """
+    try:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN partnumber_norm TEXT")
+    except sqlite3.OperationalError:
+        pass  # Колонка уже существует
+
+    rows = conn.execute(
+        f"SELECT id, partnumber FROM {table} WHERE partnumber_norm IS NULL"
+    ).fetchall()
+    if rows:
+        conn.executemany(
+            f"UPDATE {table} SET partnumber_norm = ? WHERE id = ?",
+            [(normalize_partnumber(row[1]), row[0]) for row in rows],
+        )
+    # DDL шага миграции 2 не меняется; составные индексы горячих запросов - миграция 8
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_partnumber_norm ON {table}(partnumber_norm)")
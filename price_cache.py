@@ -0,0 +1,642 @@
+"""
+Двухуровневый кэш цен: in-memory LRU перед таблицей price_cache в SQLite.
+
+- get_many(): все источники по артикулу одним запросом (память -> диск)
+- put_offers() / put(): write-through - запись сразу в память и в БД (через общее
+  подключение или очередь DbWriter worker'а)
+- Повторные артикулы в пределах CSV-пакета обслуживаются из памяти без обращения к диску
+- Хранится полный список предложений страницы (бренд, цена, наличие); фильтр
+  бренда применяется при чтении. AutoTrade и AutoVID показывают все бренды -
+  их запись на (partnumber, source) отвечает на запрос с любым брендом.
+  ZZAP, STparts и Trast до разбора сужают страницу до одного бренда (без
+  бренда - первая строка модального окна ZZAP), поэтому их запись - на
+  (partnumber, source, бренд поиска) и отвечает только на тот же бренд
+- Негативное кэширование: "не найдено" / "заблокировано" хранится с коротким TTL,
+  ошибки и таймауты не кэшируются
+- Stale-while-revalidate: цена старше TTL, но в пределах окна устаревания, отдаётся
+  с пометкой stale, а обновление (partnumber, brand, source) ставится в RefreshQueue
+- compact(): обслуживание таблицы - просроченные (TTL по источнику) и вытесненные
+  строки удаляются, размер ограничен, место возвращается incremental vacuum
+"""
+
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from config import (
+    PRICE_CACHE_TTL_MIN,
+    PRICE_CACHE_SOURCE_TTL_MIN,
+    PRICE_CACHE_MEMORY_SIZE,
+    PRICE_CACHE_NEGATIVE_TTL_MIN,
+    PRICE_CACHE_BLOCKED_TTL_MIN,
+    PRICE_CACHE_STALE_MIN,
+    PRICE_CACHE_MAX_ROWS,
+    PRICE_CACHE_VACUUM_PAGES,
+)
+from offline_parsers import (
+    autotrade_matches_brand_filter,
+    autovid_matches_brand_filter,
+    stparts_matches_brand_filter,
+    trast_matches_brand_filter,
+    zzap_matches_brand_filter,
+)
+from partnumbers import normalize_partnumber
+from storage import connect
+
+if TYPE_CHECKING:
+    from db_writer import DbWriter
+
+logger = logging.getLogger(__name__)
+
+# Источники цен в порядке опроса worker'ом
+PRICE_SOURCES = ("zzap", "stparts", "trast", "autovid", "autotrade")
+
+# Статус записи с ценой
+POSITIVE_STATUS = 'success'
+
+# Статусы клиентов "сайт ответил, но товара нет" (stparts/trast/autovid и zzap/autotrade)
+NOT_FOUND_STATUSES = ('not_found', 'NO_RESULTS')
+
+# Сайт отказал в выдаче (антибот) - кэшируется ещё короче
+BLOCKED_STATUS = 'blocked'
+
+NEGATIVE_STATUSES = NOT_FOUND_STATUSES + (BLOCKED_STATUS,)
+
+# Клиенты, которые до разбора сужают страницу до бренда поиска: предложения
+# других брендов на ней - аналоги, а не полный список (BRAND_SCOPED_SOURCES)
+BRAND_SCOPED_SOURCES = ("zzap", "stparts", "trast")
+
+# discard_source(): все бренды
+ALL_BRANDS = object()
+
+# Фильтр бренда live-парсера: источник -> (поля предложения, проверка).
+# Проверяется первое непустое поле: title - только у AutoVID (бренда у него нет),
+# у ZZAP в title - поставщик, и бренд в нём не ищется
+OFFER_BRAND_MATCHERS: Dict[str, Tuple[Tuple[str, ...], Callable[[Optional[str], Optional[str]], bool]]] = {
+    'zzap': (('brand',), zzap_matches_brand_filter),
+    'stparts': (('brand',), stparts_matches_brand_filter),
+    'trast': (('brand',), trast_matches_brand_filter),
+    'autovid': (('brand', 'title'), autovid_matches_brand_filter),
+    'autotrade': (('brand',), autotrade_matches_brand_filter),
+}
+
+# Ключ запроса: (partnumber, brand, source)
+CacheKey = Tuple[str, Optional[str], str]
+
+# Поля предложения в компактной записи на диске: [brand, price, stock, title]
+OFFER_FIELDS = ('brand', 'price', 'stock', 'title')
+
+
+def encode_offers(offers: List[Dict[str, Any]]) -> str:
+    """Компактный JSON: список массивов вместо списка словарей."""
+    return json.dumps(
+        [[offer.get(field) for field in OFFER_FIELDS] for offer in offers],
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+
+
+def decode_offers(data: str) -> List[Dict[str, Any]]:
+    """Обратное преобразование encode_offers()."""
+    return [dict(zip(OFFER_FIELDS, values)) for values in json.loads(data)]
+
+
+def offer_matches_brand(offer: Dict[str, Any], brand_filter: Optional[str], source: str) -> bool:
+    """Подходит ли предложение под фильтр бренда - той же проверкой, что у live-парсера источника."""
+    if not brand_filter:
+        return True
+    fields, matches = OFFER_BRAND_MATCHERS[source]
+    value = next((offer[field] for field in fields if offer.get(field)), None)
+    return matches(value, brand_filter)
+
+
+def filter_offers(offers: List[Dict[str, Any]], brand_filter: Optional[str], source: str) -> List[Dict[str, Any]]:
+    """Предложения с ценой, подходящие под фильтр бренда."""
+    return [
+        offer for offer in offers
+        if offer.get('price') and offer_matches_brand(offer, brand_filter, source)
+    ]
+
+
+def cached_search_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Результат поиска в формате клиентов из записи кэша."""
+    if entry['status'] == POSITIVE_STATUS:
+        return {
+            'status': 'success',
+            'prices': {'min': entry['price'], 'avg': entry['avg']},
+            'brand': entry.get('brand'),
+            'url': entry['url'],
+            'from_cache': True,
+            'stale': entry.get('stale', False),
+        }
+    return {
+        'status': entry['status'],
+        'prices': None,
+        'url': entry['url'],
+        'from_cache': True,
+    }
+
+
+def describe_cache_entry(entry: Dict[str, Any]) -> str:
+    """Краткое описание записи кэша для логов."""
+    if entry['status'] == POSITIVE_STATUS:
+        return f"цена: {entry['price']}₽" + (", устарела - обновление в очереди" if entry.get('stale') else "")
+    return f"негативный кэш: {entry['status']}"
+
+
+class RefreshQueue:
+    """Очередь фоновых обновлений устаревших цен без дубликатов (FIFO)."""
+
+    def __init__(self) -> None:
+        self._keys: "OrderedDict[CacheKey, None]" = OrderedDict()
+
+    def add(self, key: CacheKey) -> bool:
+        """Поставить ключ в очередь; False - уже ожидает обновления."""
+        if key in self._keys:
+            return False
+        self._keys[key] = None
+        return True
+
+    def pop(self) -> Optional[CacheKey]:
+        """Следующий ключ для обновления или None."""
+        if not self._keys:
+            return None
+        key, _ = self._keys.popitem(last=False)
+        return key
+
+    def discard(self, key: CacheKey) -> None:
+        """Убрать ключ (цена уже обновлена живым поиском)."""
+        self._keys.pop(key, None)
+
+    def discard_source(self, partnumber: str, source: str, brand: Any = ALL_BRANDS) -> None:
+        """Убрать ключи артикула в источнике: с этим брендом или все (свежие предложения подходят любому бренду)."""
+        norm = normalize_partnumber(partnumber)
+        for key in [
+            key for key in self._keys
+            if key[2] == source and normalize_partnumber(key[0]) == norm and (brand is ALL_BRANDS or key[1] == brand)
+        ]:
+            del self._keys[key]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def lookup_sql(source_count: int) -> str:
+    """
+    Последние позитивная и негативная записи по каждому источнику артикула.
+
+    Позитивная запись источника из BRAND_SCOPED_SOURCES и негативная - только
+    с тем же брендом поиска. Параметры: partnumber_norm, source x source_count,
+    brand, brand, '-N seconds'.
+    """
+    scoped = ", ".join(f"'{source}'" for source in BRAND_SCOPED_SOURCES)
+    return f"""
+        SELECT id, source, brand, price, url, status, offers, age_sec FROM (
+            SELECT id, source, brand, price, url, offers,
+                   COALESCE(status, '{POSITIVE_STATUS}') AS status,
+                   (julianday('now') - julianday(cached_at)) * 86400 AS age_sec,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY source, COALESCE(status, '{POSITIVE_STATUS}') = '{POSITIVE_STATUS}'
+                       ORDER BY cached_at DESC, id DESC
+                   ) AS rn
+            FROM price_cache
+            WHERE partnumber_norm = ? AND source IN ({", ".join("?" for _ in range(source_count))})
+              AND (CASE WHEN COALESCE(status, '{POSITIVE_STATUS}') = '{POSITIVE_STATUS}'
+                        THEN source NOT IN ({scoped}) OR brand IS ?
+                        ELSE brand IS ? END)
+              AND cached_at > datetime('now', ?)
+        ) WHERE rn = 1
+    """
+
+
+def insert_price_cache_row(conn: sqlite3.Connection, row: Tuple[Any, ...]) -> None:
+    conn.execute(
+        """INSERT INTO price_cache (id, partnumber, partnumber_norm, brand, source, price, url, status, offers)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        row,
+    )
+
+
+def ensure_incremental_vacuum(conn: sqlite3.Connection) -> None:
+    """
+    Перевести файл кэша в auto_vacuum=INCREMENTAL (миграция, один раз за жизнь БД).
+
+    Режим меняется только полным VACUUM - вне транзакции, до старта web и worker.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        logger.info("[cache] Перевод БД в auto_vacuum=INCREMENTAL (однократный VACUUM)")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int) -> int:
+    """
+    Вернуть ОС до pages свободных страниц; работает и внутри транзакции писателя.
+
+    Один шаг PRAGMA incremental_vacuum освобождает одну страницу, а sqlite3
+    выполняет только первый шаг - поэтому по странице за вызов.
+    БД не в режиме INCREMENTAL (не применена миграция) - ничего не делает.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    for _ in range(min(int(pages), free_before)):
+        conn.execute("PRAGMA incremental_vacuum(1)")
+    return free_before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+class PriceCache:
+    """
+    LRU в памяти (ограничен по размеру и TTL) + таблица price_cache.
+
+    Артикул сравнивается в канонической форме (partnumber_norm).
+    На источник хранятся две записи:
+    - позитивная ('p', partnumber, source, brand): все предложения страницы без
+      фильтра бренда; brand - бренд поиска для BRAND_SCOPED_SOURCES, иначе None
+    - негативная ('n', partnumber, source, brand): "не найдено" для конкретного бренда
+    Если ни одно предложение не подходит под бренд и негативной записи нет -
+    это промах, нужен живой поиск.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl_sec: int = PRICE_CACHE_TTL_MIN * 60,
+        max_entries: int = PRICE_CACHE_MEMORY_SIZE,
+        sources: Iterable[str] = PRICE_SOURCES,
+        negative_ttl_sec: int = PRICE_CACHE_NEGATIVE_TTL_MIN * 60,
+        blocked_ttl_sec: int = PRICE_CACHE_BLOCKED_TTL_MIN * 60,
+        stale_sec: int = PRICE_CACHE_STALE_MIN * 60,
+        source_ttl_sec: Optional[Dict[str, int]] = None,
+        writer: Optional["DbWriter"] = None,
+    ) -> None:
+        self.db_path = db_path
+        # Если задан - INSERT'ы уходят в очередь писателя (групповые транзакции)
+        self.writer = writer
+        self.ttl_sec = ttl_sec
+        # TTL цены по источнику; не указанные источники - ttl_sec
+        self.source_ttl_sec = dict(
+            source_ttl_sec if source_ttl_sec is not None
+            else {source: minutes * 60 for source, minutes in PRICE_CACHE_SOURCE_TTL_MIN.items()}
+        )
+        self.negative_ttl_sec = negative_ttl_sec
+        self.blocked_ttl_sec = blocked_ttl_sec
+        self.stale_sec = stale_sec
+        self.refresh_queue = RefreshQueue()
+        self.max_entries = max_entries
+        self.sources = tuple(sources)
+        self._memory: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_id: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Общее подключение к БД (создаётся при первом обращении)."""
+        if self._conn is None:
+            self._conn = connect(self.db_path, row_factory=sqlite3.Row)
+        return self._conn
+
+    def ttl_for_status(self, status: str, source: Optional[str] = None) -> int:
+        """TTL записи в секундах по её статусу (цена - с учётом TTL источника)."""
+        if status == POSITIVE_STATUS:
+            return self.source_ttl_sec.get(source, self.ttl_sec)
+        if status == BLOCKED_STATUS:
+            return self.blocked_ttl_sec
+        return self.negative_ttl_sec
+
+    def max_positive_ttl(self) -> int:
+        """Наибольший TTL цены среди источников."""
+        return max([self.ttl_sec, *self.source_ttl_sec.values()])
+
+    def stale_for_status(self, status: str) -> int:
+        """Окно stale-while-revalidate: только для записей с ценой."""
+        return self.stale_sec if status == POSITIVE_STATUS else 0
+
+    def close(self) -> None:
+        """Закрыть подключение к БД."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ========== Память ==========
+
+    @staticmethod
+    def _positive_key(partnumber: str, source: str, brand: Optional[str]) -> Hashable:
+        return ('p', partnumber, source, brand if source in BRAND_SCOPED_SOURCES else None)
+
+    @staticmethod
+    def _negative_key(partnumber: str, source: str, brand: Optional[str]) -> Hashable:
+        return ('n', partnumber, source, brand)
+
+    def _memory_lookup(self, key: Hashable) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Запись из LRU (просроченная удаляется).
+
+        Returns:
+            (известно, запись): (False, None) - нужно идти на диск,
+            (True, None) - на диске записи нет
+        """
+        entry = self._memory.get(key)
+        if entry is None:
+            return False, None
+        now = time.monotonic()
+        if now >= entry['stale_until']:
+            del self._memory[key]
+            return False, None
+        self._memory.move_to_end(key)
+        if entry.get('absent'):
+            return True, None
+        entry['stale'] = now >= entry['expires_at']
+        return True, entry
+
+    def _memory_set(self, key: Hashable, entry: Dict[str, Any], age_sec: float = 0.0) -> None:
+        """Положить запись (или маркер отсутствия) в LRU с учётом уже прошедшего возраста."""
+        status = entry.get('status', POSITIVE_STATUS)
+        expires_at = time.monotonic() + self.ttl_for_status(status, key[2]) - age_sec
+        entry['expires_at'] = expires_at
+        entry['stale_until'] = expires_at + self.stale_for_status(status)
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # ========== Чтение / запись ==========
+
+    def get_many(self, partnumber: str, brand: Optional[str] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Свежие записи по всем источникам.
+
+        Предложения фильтруются по бренду при чтении. Негативная запись (не найдено)
+        учитывается только для точно того же бренда: "нет товара бренда X" ничего
+        не говорит о поиске без бренда. Устаревшая цена (в окне stale) возвращается
+        с 'stale': True и ставится в refresh_queue.
+
+        Returns:
+            {source: {'price', 'avg', 'brand', 'url', 'status', 'stale', 'expires_in', 'offers'} или None}
+            (expires_in - секунд до конца TTL, у устаревшей цены отрицательное)
+        """
+        result: Dict[str, Optional[Dict[str, Any]]] = {}
+        found: Dict[Hashable, Optional[Dict[str, Any]]] = {}
+        missing_keys = []
+        norm = normalize_partnumber(partnumber)
+        for source in self.sources:
+            for key in (self._positive_key(norm, source, brand), self._negative_key(norm, source, brand)):
+                known, entry = self._memory_lookup(key)
+                if known:
+                    found[key] = entry
+                else:
+                    missing_keys.append(key)
+
+        missing = sorted({key[2] for key in missing_keys}, key=self.sources.index)
+        if missing:
+            max_ttl = max(self.max_positive_ttl() + self.stale_sec, self.negative_ttl_sec, self.blocked_ttl_sec)
+            rows = self.conn.execute(
+                lookup_sql(len(missing)),
+                (norm, *missing, brand, brand, f"-{max_ttl} seconds"),
+            ).fetchall()
+
+            loaded: Dict[Hashable, Tuple[Dict[str, Any], float]] = {}
+            for row in rows:
+                # Самая свежая запись, но её собственный TTL (негативный короче) истёк
+                status = row['status']
+                if row['age_sec'] >= self.ttl_for_status(status, row['source']) + self.stale_for_status(status):
+                    continue
+                entry = {'row_id': row['id'], 'status': status, 'url': row['url']}
+                if status == POSITIVE_STATUS:
+                    # Старые записи без offers: одно предложение с брендом поиска
+                    entry['offers'] = decode_offers(row['offers']) if row['offers'] else [
+                        {'brand': row['brand'], 'price': row['price']}
+                    ]
+                    key = self._positive_key(norm, row['source'], brand)
+                else:
+                    key = self._negative_key(norm, row['source'], brand)
+                loaded[key] = (entry, row['age_sec'])
+
+            for key in missing_keys:
+                if key in loaded:
+                    entry, age_sec = loaded[key]
+                    self._memory_set(key, entry, age_sec)
+                else:
+                    # Пишет в price_cache только этот процесс (через put) - отсутствие тоже кэшируется
+                    self._memory_set(key, {'absent': True})
+                found[key] = self._memory_lookup(key)[1]
+
+        for source in self.sources:
+            result[source] = self._resolve(
+                (partnumber, brand, source),
+                found[self._positive_key(norm, source, brand)],
+                found[self._negative_key(norm, source, brand)],
+            )
+        return result
+
+    def _resolve(
+        self,
+        key: CacheKey,
+        positive: Optional[Dict[str, Any]],
+        negative: Optional[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Ответ для (partnumber, brand, source) из позитивной и негативной записей."""
+        partnumber, brand, source = key
+        matched = filter_offers(positive['offers'], brand, source) if positive else []
+        now = time.monotonic()
+
+        if matched and not (negative and negative['row_id'] > positive['row_id']):
+            if positive['stale'] and self.refresh_queue.add(key):
+                logger.info(f"[cache] Устаревшая цена {source}: {partnumber} - обновление поставлено в очередь")
+            prices = [offer['price'] for offer in matched]
+            return {
+                'price': min(prices),
+                'avg': round(sum(prices) / len(prices), 2),
+                'brand': matched[0].get('brand'),
+                'url': positive['url'],
+                'status': POSITIVE_STATUS,
+                'stale': positive['stale'],
+                'expires_in': positive['expires_at'] - now,
+                'offers': matched,
+            }
+
+        if negative:
+            return {
+                'price': None,
+                'avg': None,
+                'brand': None,
+                'url': negative['url'],
+                'status': negative['status'],
+                'stale': False,
+                'expires_in': negative['expires_at'] - now,
+            }
+        return None
+
+    def _insert(
+        self,
+        partnumber: str,
+        brand: Optional[str],
+        source: str,
+        price: Optional[float],
+        url: Optional[str],
+        status: str,
+        offers: Optional[str] = None,
+    ) -> int:
+        """
+        INSERT в price_cache; возвращает id строки (порядок свежести записей).
+
+        id выдаётся здесь, а не AUTOINCREMENT'ом: при записи через DbWriter строка
+        появится в БД позже, а порядок позитивной и негативной записей нужен сразу.
+        """
+        if self._last_id is None:
+            self._last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM price_cache").fetchone()[0]
+            try:
+                # AUTOINCREMENT: id удалённых compact() строк не переиспользуются
+                seq = self.conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'price_cache'").fetchone()
+                if seq:
+                    self._last_id = max(self._last_id, seq[0])
+            except sqlite3.OperationalError:
+                pass  # Таблица без AUTOINCREMENT
+        self._last_id += 1
+        row = (self._last_id, partnumber, normalize_partnumber(partnumber), brand, source, price, url, status, offers)
+        if self.writer is not None:
+            self.writer.submit(insert_price_cache_row, row)
+        else:
+            insert_price_cache_row(self.conn, row)
+            self.conn.commit()
+        return self._last_id
+
+    def put_offers(
+        self,
+        partnumber: str,
+        brand: Optional[str],
+        source: str,
+        offers: List[Dict[str, Any]],
+        url: Optional[str],
+    ) -> None:
+        """Write-through: полный список предложений страницы (без фильтра бренда); brand - бренд поиска."""
+        offers = [offer for offer in offers if offer.get('price')]
+        if not offers:
+            return
+        min_price = min(offer['price'] for offer in offers)
+        row_id = self._insert(partnumber, brand, source, min_price, url, POSITIVE_STATUS, encode_offers(offers))
+        self._memory_set(
+            self._positive_key(normalize_partnumber(partnumber), source, brand),
+            {'row_id': row_id, 'status': POSITIVE_STATUS, 'url': url, 'offers': offers},
+        )
+        if source in BRAND_SCOPED_SOURCES:
+            self.refresh_queue.discard_source(partnumber, source, brand)
+        else:
+            self.refresh_queue.discard_source(partnumber, source)
+
+    def put(
+        self,
+        partnumber: str,
+        brand: Optional[str],
+        source: str,
+        price: Optional[float],
+        url: Optional[str],
+        status: str = POSITIVE_STATUS,
+    ) -> None:
+        """Write-through: одна цена (предложение с брендом поиска) или негативная запись."""
+        if status == POSITIVE_STATUS:
+            self.put_offers(partnumber, brand, source, [{'brand': brand, 'price': price}], url)
+            return
+
+        row_id = self._insert(partnumber, brand, source, None, url, status)
+        self._memory_set(
+            self._negative_key(normalize_partnumber(partnumber), source, brand),
+            {'row_id': row_id, 'status': status, 'url': url},
+        )
+        self.refresh_queue.discard((partnumber, brand, source))
+
+    def store_result(self, partnumber: str, brand: Optional[str], source: str, result: Dict[str, Any]) -> None:
+        """
+        Сохранить результат живого поиска.
+
+        Все предложения страницы (result['offers']) - позитивная запись. Если под
+        фильтр бренда ничего не подошло ("не найдено"/"заблокировано") - ещё и
+        негативная запись для этого бренда с коротким TTL.
+        Ошибки и таймауты не кэшируются: следующий запрос должен сходить на сайт.
+        """
+        prices = result.get('prices') or {}
+        if result.get('offers'):
+            self.put_offers(partnumber, brand, source, result['offers'], result.get('url'))
+        elif prices.get('min'):
+            # Клиент без списка предложений: одно предложение с найденным брендом
+            offer = {'brand': brand or result.get('brand'), 'price': prices['min']}
+            self.put_offers(partnumber, brand, source, [offer], result.get('url'))
+
+        if not prices.get('min') and result.get('status') in NEGATIVE_STATUSES:
+            self.put(partnumber, brand, source, None, result.get('url'), status=result['status'])
+
+    # ========== Обслуживание ==========
+
+    def compact(
+        self,
+        conn: Optional[sqlite3.Connection] = None,
+        max_rows: int = PRICE_CACHE_MAX_ROWS,
+        vacuum_pages: int = PRICE_CACHE_VACUUM_PAGES,
+    ) -> Dict[str, int]:
+        """
+        Обслуживание price_cache (worker вызывает периодически, когда нет задач).
+
+        1. Просроченные строки: TTL по источнику + окно stale, негативные - свой TTL
+        2. Вытесненные: остаётся только последняя строка на ключ - предложения на
+           (partnumber_norm, source) или (partnumber_norm, source, brand) для
+           BRAND_SCOPED_SOURCES, "не найдено" на (partnumber_norm, source, brand)
+        3. Лимит размера: сверх max_rows удаляются самые старые
+        4. Incremental vacuum: свободные страницы возвращаются ОС порциями
+
+        conn - подключение писателя: worker выполняет обслуживание намерением
+        DbWriter (await cache_writer.write(price_cache.compact)), commit() - у
+        писателя. Без conn - общее подключение и commit().
+
+        Returns:
+            {'expired': N, 'superseded': N, 'capped': N, 'vacuumed_pages': N}
+        """
+        own_transaction = conn is None
+        if conn is None:
+            conn = self.conn
+        is_positive = f"COALESCE(status, '{POSITIVE_STATUS}') = '{POSITIVE_STATUS}'"
+        scoped = ", ".join(f"'{source}'" for source in BRAND_SCOPED_SOURCES)
+        stats = {'expired': 0, 'superseded': 0, 'capped': 0, 'vacuumed_pages': 0}
+
+        overrides = list(self.source_ttl_sec)
+        for source in overrides:
+            stats['expired'] += conn.execute(
+                f"DELETE FROM price_cache WHERE source = ? AND {is_positive} AND cached_at <= datetime('now', ?)",
+                (source, f"-{self.source_ttl_sec[source] + self.stale_sec} seconds"),
+            ).rowcount
+        stats['expired'] += conn.execute(
+            f"""DELETE FROM price_cache WHERE source NOT IN ({", ".join("?" for _ in overrides)})
+                AND {is_positive} AND cached_at <= datetime('now', ?)""",
+            (*overrides, f"-{self.ttl_sec + self.stale_sec} seconds"),
+        ).rowcount
+        stats['expired'] += conn.execute(
+            "DELETE FROM price_cache WHERE status = ? AND cached_at <= datetime('now', ?)",
+            (BLOCKED_STATUS, f"-{self.blocked_ttl_sec} seconds"),
+        ).rowcount
+        stats['expired'] += conn.execute(
+            f"DELETE FROM price_cache WHERE NOT {is_positive} AND status != ? AND cached_at <= datetime('now', ?)",
+            (BLOCKED_STATUS, f"-{self.negative_ttl_sec} seconds"),
+        ).rowcount
+
+        stats['superseded'] = conn.execute(
+            f"""
+            DELETE FROM price_cache WHERE id NOT IN (
+                SELECT MAX(id) FROM price_cache
+                GROUP BY partnumber_norm, source, {is_positive},
+                         CASE WHEN {is_positive} AND source NOT IN ({scoped}) THEN NULL ELSE brand END
+            )
+            """
+        ).rowcount
+
+        if max_rows:
+            stats['capped'] = conn.execute(
+                "DELETE FROM price_cache WHERE id <= (SELECT id FROM price_cache ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (max_rows,),
+            ).rowcount
+        stats['vacuumed_pages'] = incremental_vacuum(conn, vacuum_pages)
+        if own_transaction:
+            conn.commit()
+        return stats
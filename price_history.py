@@ -0,0 +1,235 @@
+"""
+История цен по источникам (таблица price_history) и её агрегаты.
+
+- Одна точка на (артикул, бренд, источник, цена, день): повтор отсекает
+  UNIQUE-индекс на recorded_day, а не SELECT перед каждой вставкой - все
+  источники задачи пишутся одним executemany с INSERT OR IGNORE
+- price_history_daily / price_history_weekly: min/max/first/last/points на
+  (артикул, день|неделя, источник); ведутся триггером на INSERT, поэтому
+  /api/price-history и ask-ai читают несколько готовых строк, а не все точки
+- prune_price_history(): сырые точки старше PRICE_HISTORY_RAW_RETENTION_DAYS
+  удаляются (агрегаты остаются), дневные агрегаты - по своему сроку
+"""
+
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import PRICE_HISTORY_RAW_RETENTION_DAYS, PRICE_HISTORY_DAILY_RETENTION_DAYS
+from partnumbers import normalize_partnumber
+
+# NULL-бренд в UNIQUE не равен другому NULL - поэтому выражение COALESCE(brand, '')
+PRICE_HISTORY_UNIQUE_INDEX = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_price_history_daily_point "
+    "ON price_history(partnumber_norm, COALESCE(brand, ''), source, price, recorded_day)"
+)
+
+INSERT_PRICE_HISTORY_SQL = """
+    INSERT OR IGNORE INTO price_history (partnumber, partnumber_norm, brand, source, price, recorded_day)
+    VALUES (?, ?, ?, ?, ?, date('now'))
+"""
+
+
+def ensure_recorded_day(conn: sqlite3.Connection) -> None:
+    """
+    Миграция: колонка recorded_day (UTC-день recorded_at) и UNIQUE-индекс точки за день.
+
+    Старые дубликаты за день (от SELECT-then-INSERT под гонкой) удаляются,
+    остаётся первая запись. Шаг migrate.py, без commit().
+    """
+    try:
+        conn.execute("ALTER TABLE price_history ADD COLUMN recorded_day TEXT")
+    except sqlite3.OperationalError:
+        pass  # Колонка уже существует
+
+    conn.execute("UPDATE price_history SET recorded_day = date(recorded_at) WHERE recorded_day IS NULL")
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_price_history_daily_point'"
+    ).fetchone()
+    if not exists:
+        conn.execute(
+            """
+            DELETE FROM price_history WHERE id NOT IN (
+                SELECT MIN(id) FROM price_history
+                GROUP BY partnumber_norm, COALESCE(brand, ''), source, price, recorded_day
+            )
+            """
+        )
+        conn.execute(PRICE_HISTORY_UNIQUE_INDEX)
+
+
+def history_rows(
+    partnumber: str,
+    brand: Optional[str],
+    prices: Dict[str, Optional[float]],
+) -> List[Tuple[str, str, Optional[str], str, float]]:
+    """Строки для INSERT_PRICE_HISTORY_SQL: источники с ценой."""
+    norm = normalize_partnumber(partnumber)
+    return [(partnumber, norm, brand, source, price) for source, price in prices.items() if price]
+
+
+def save_price_history(
+    conn: sqlite3.Connection,
+    partnumber: str,
+    brand: Optional[str],
+    prices: Dict[str, Optional[float]],
+) -> int:
+    """
+    Сохранить минимальные цены источников ({source: price}); без commit().
+
+    Returns:
+        Сколько точек добавлено (повторы за сегодня пропущены)
+    """
+    rows = history_rows(partnumber, brand, prices)
+    if not rows:
+        return 0
+    before = conn.total_changes
+    conn.executemany(INSERT_PRICE_HISTORY_SQL, rows)
+    return conn.total_changes - before
+
+
+# ========== Агрегаты ==========
+
+# Период -> (таблица, колонка периода, выражение периода от строки NEW)
+ROLLUPS: Dict[str, Tuple[str, str, str]] = {
+    'day': ('price_history_daily', 'day', "COALESCE(NEW.recorded_day, date(NEW.recorded_at))"),
+    'week': ('price_history_weekly', 'week_start', "date(NEW.recorded_at, '-6 days', 'weekday 1')"),  # понедельник
+}
+
+ROLLUP_COLUMNS = "partnumber_norm, {period}, source, brand, min_price, max_price, first_price, last_price, first_at, last_at, points"
+
+
+def _rollup_schema(table: str, period: str) -> str:
+    # Ключ (артикул, период, источник): выборка за N дней идёт по индексу в порядке периода
+    return f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            partnumber_norm TEXT NOT NULL,
+            {period} TEXT NOT NULL,
+            source TEXT NOT NULL,
+            brand TEXT,  -- бренд последней точки
+            min_price REAL NOT NULL,
+            max_price REAL NOT NULL,
+            first_price REAL NOT NULL,
+            last_price REAL NOT NULL,
+            first_at TIMESTAMP NOT NULL,
+            last_at TIMESTAMP NOT NULL,
+            points INTEGER NOT NULL,
+            PRIMARY KEY (partnumber_norm, {period}, source)
+        )
+    """
+
+
+def _rollup_upsert(table: str, period: str, select: str) -> str:
+    """INSERT ... SELECT с накоплением: точки применяются в порядке SELECT'а."""
+    return f"""
+        INSERT INTO {table} ({ROLLUP_COLUMNS.format(period=period)})
+        {select}
+        ON CONFLICT (partnumber_norm, {period}, source) DO UPDATE SET
+            min_price = MIN(min_price, excluded.min_price),
+            max_price = MAX(max_price, excluded.max_price),
+            first_price = CASE WHEN excluded.first_at < first_at THEN excluded.first_price ELSE first_price END,
+            first_at = MIN(first_at, excluded.first_at),
+            last_price = CASE WHEN excluded.last_at >= last_at THEN excluded.last_price ELSE last_price END,
+            brand = CASE WHEN excluded.last_at >= last_at THEN excluded.brand ELSE brand END,
+            last_at = MAX(last_at, excluded.last_at),
+            points = points + excluded.points
+    """
+
+
+def ensure_rollups(conn: sqlite3.Connection) -> None:
+    """
+    Миграция: таблицы агрегатов и триггеры на INSERT в price_history.
+
+    Новая таблица агрегатов заполняется из уже накопленных точек. Шаг migrate.py, без commit().
+    """
+    for table, period, new_period in ROLLUPS.values():
+        created = not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        conn.execute(_rollup_schema(table, period))
+        if created:
+            raw_period = new_period.replace('NEW.', '')
+            # WHERE true: иначе ON CONFLICT читается как часть JOIN
+            conn.execute(_rollup_upsert(table, period, f"""
+                SELECT partnumber_norm, {raw_period}, source, brand,
+                       price, price, price, price, recorded_at, recorded_at, 1
+                FROM price_history WHERE true
+                ORDER BY recorded_at, id
+            """))
+        upsert_new = _rollup_upsert(table, period, f"""
+            SELECT NEW.partnumber_norm, {new_period}, NEW.source, NEW.brand,
+                   NEW.price, NEW.price, NEW.price, NEW.price, NEW.recorded_at, NEW.recorded_at, 1
+        """)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table} AFTER INSERT ON price_history BEGIN {upsert_new}; END")
+
+
+# Первый период окна '-N days': неделя, в которую попадает начало окна, - целиком
+# (её week_start раньше date('now', '-N days'))
+ROLLUP_WINDOW_START: Dict[str, str] = {
+    'day': "date('now', ?)",
+    'week': "date('now', ?, '-6 days', 'weekday 1')",
+}
+
+
+def load_rollups_sql(period: str) -> str:
+    """Агрегаты периода (partnumber_norm, '-N days'); порядок - обратный ключу, без сортировки."""
+    table, column, _ = ROLLUPS[period]
+    return f"""
+        SELECT {ROLLUP_COLUMNS.format(period=column)} FROM {table}
+        WHERE partnumber_norm = ? AND {column} >= {ROLLUP_WINDOW_START[period]}
+        ORDER BY {column} DESC, source DESC
+    """
+
+
+def load_rollups(conn: sqlite3.Connection, partnumber_norm: str, days: int, period: str = 'day') -> List[Dict[str, Any]]:
+    """Агрегаты артикула за последние days дней (с периодом, где начинается окно), новые периоды первыми."""
+    rows = conn.execute(load_rollups_sql(period), (partnumber_norm, f"-{int(days)} days")).fetchall()
+    names = ROLLUP_COLUMNS.format(period='period').split(', ')
+    return [dict(zip(names, row)) for row in rows]
+
+
+def summarize_rollups(rollups: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Динамика по источникам за весь период из агрегатов load_rollups().
+
+    Returns:
+        {source: {'first_price', 'last_price', 'min_price', 'max_price', 'points'}}
+    """
+    summary: Dict[str, Dict[str, Any]] = {}
+    for rollup in sorted(rollups, key=lambda r: r['period']):
+        source = summary.get(rollup['source'])
+        if source is None:
+            summary[rollup['source']] = {
+                'first_price': rollup['first_price'],
+                'last_price': rollup['last_price'],
+                'min_price': rollup['min_price'],
+                'max_price': rollup['max_price'],
+                'points': rollup['points'],
+            }
+            continue
+        source['last_price'] = rollup['last_price']
+        source['min_price'] = min(source['min_price'], rollup['min_price'])
+        source['max_price'] = max(source['max_price'], rollup['max_price'])
+        source['points'] += rollup['points']
+    return summary
+
+
+def prune_price_history(
+    conn: sqlite3.Connection,
+    raw_days: int = PRICE_HISTORY_RAW_RETENTION_DAYS,
+    daily_days: int = PRICE_HISTORY_DAILY_RETENTION_DAYS,
+) -> Dict[str, int]:
+    """
+    Удалить сырые точки и дневные агрегаты старше срока хранения (0 - хранить всё); без commit().
+
+    Недельные агрегаты не удаляются. Returns: {'raw': N, 'daily': N}
+    """
+    deleted = {'raw': 0, 'daily': 0}
+    if raw_days:
+        deleted['raw'] = conn.execute(
+            "DELETE FROM price_history WHERE recorded_at < datetime('now', ?)", (f"-{int(raw_days)} days",)
+        ).rowcount
+    if daily_days:
+        deleted['daily'] = conn.execute(
+            "DELETE FROM price_history_daily WHERE day < date('now', ?)", (f"-{int(daily_days)} days",)
+        ).rowcount
+    return deleted
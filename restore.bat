@@ -131,6 +131,7 @@ goto end
 echo.
 echo ========================================
 echo Запустите:
+echo   python migrate.py
 echo   python main.py
 echo   python worker.py
 echo ========================================
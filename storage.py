@@ -0,0 +1,226 @@
+"""
+Подключения к SQLite - одна фабрика для API, worker'а и кэшей.
+
+- journal_mode=WAL: чтение (API, поллер tasks.html) не ждёт записи worker'а и наоборот
+- busy_timeout: при блокировке писатель ждёт, а не падает с "database is locked"
+- synchronous=NORMAL: в WAL не теряет целостность, fsync - только на checkpoint
+- cache_size, temp_store=MEMORY: страницы и временные таблицы в памяти
+- ConnectionPool: подключения переиспользуются внутри процесса, close()
+  возвращает подключение в пул (старые call site'ы с conn.close() не меняются)
+- run_db(): запрос из async-эндпоинта выполняется в пуле потоков БД, а не
+  в event loop - медленный SELECT не замораживает остальные запросы API
+- Хранилища tasks / cache / history: каждое может жить в своём файле
+  (store_path) - запись кэша и истории не ждёт блокировку записи очереди задач
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from config import (
+    DB_PATH,
+    CACHE_DB_PATH,
+    HISTORY_DB_PATH,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_SYNCHRONOUS,
+    DB_POOL_SIZE,
+    DB_EXECUTOR_WORKERS,
+)
+
+T = TypeVar("T")
+
+RowFactory = Optional[Callable[[sqlite3.Cursor, Tuple[Any, ...]], Any]]
+
+# Хранилище -> его таблицы (запросы не соединяют таблицы разных хранилищ)
+STORES: Dict[str, Tuple[str, ...]] = {
+    'tasks': ('tasks', 'task_source_results'),
+    'cache': ('price_cache', 'cache_stats', 'brand_cache'),
+    'history': ('price_history', 'price_history_daily', 'price_history_weekly'),
+}
+
+
+def store_path(store: str) -> Path:
+    """Файл БД хранилища (CACHE_DB_PATH / HISTORY_DB_PATH по умолчанию совпадают с DB_PATH)."""
+    return {'tasks': DB_PATH, 'cache': CACHE_DB_PATH, 'history': HISTORY_DB_PATH}[store]
+
+
+def store_files() -> Dict[Path, Tuple[str, ...]]:
+    """Файлы БД и хранилища в каждом (в порядке STORES)."""
+    files: Dict[Path, Tuple[str, ...]] = {}
+    for store in STORES:
+        path = Path(store_path(store)).resolve()
+        files[path] = files.get(path, ()) + (store,)
+    return files
+
+
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    """WAL и настройки подключения (journal_mode сохраняется в файле БД)."""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+
+def connect(
+    db_path: Optional[Path] = None,
+    row_factory: RowFactory = None,
+    factory: type = sqlite3.Connection,
+    check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    """Новое подключение с настройками (для долгоживущих подключений кэшей и скриптов)."""
+    conn = sqlite3.connect(
+        str(db_path or DB_PATH),
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        factory=factory,
+        check_same_thread=check_same_thread,
+    )
+    apply_pragmas(conn)
+    conn.row_factory = row_factory
+    return conn
+
+
+def connect_readonly(db_path: Path) -> sqlite3.Connection:
+    """
+    Подключение только для чтения (URI mode=ro) - проверка схемы при старте.
+
+    Без apply_pragmas(): journal_mode хранится в файле, проверка не должна
+    переводить БД в WAL или создавать отсутствующий файл.
+    """
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=DB_BUSY_TIMEOUT_MS / 1000)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Подключение из пула: close() возвращает его в пул вместо закрытия."""
+
+    pool: Optional["ConnectionPool"] = None
+
+    def close(self) -> None:
+        if self.pool is None or not self.pool.release(self):
+            super().close()
+
+
+class ConnectionPool:
+    """Пул подключений к одному файлу БД (до size простаивающих подключений)."""
+
+    def __init__(self, db_path: Path, size: int = DB_POOL_SIZE) -> None:
+        self.db_path = Path(db_path)
+        self.size = size
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, row_factory: RowFactory = sqlite3.Row) -> sqlite3.Connection:
+        """Подключение из пула или новое; вернуть - conn.close()."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            # Подключение может вернуться в пул из одного потока и уйти в другой
+            conn = connect(self.db_path, factory=PooledConnection, check_same_thread=False)
+            conn.pool = self
+        conn.row_factory = row_factory
+        conn.isolation_level = ""  # Предыдущий владелец мог включить autocommit
+        return conn
+
+    def release(self, conn: PooledConnection) -> bool:
+        """Вернуть подключение в пул; False - пул полон или закрыт, подключение нужно закрыть."""
+        if conn.in_transaction:
+            conn.rollback()  # Незакоммиченное не должно достаться следующему владельцу
+        with self._lock:
+            if any(idle is conn for idle in self._idle):
+                return True  # Повторный close()
+            if self._closed or len(self._idle) >= self.size:
+                return False
+            self._idle.append(conn)
+            return True
+
+    @contextmanager
+    def connection(self, row_factory: RowFactory = sqlite3.Row) -> Iterator[sqlite3.Connection]:
+        conn = self.acquire(row_factory)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        """Закрыть простаивающие подключения; выданные закроются при возврате."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+
+# Пулы процесса по пути к БД (после fork - новые: подключения SQLite не переживают fork)
+_pools: Dict[str, ConnectionPool] = {}
+_pools_pid = os.getpid()
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: Optional[Path] = None) -> ConnectionPool:
+    global _pools, _pools_pid
+    key = str(Path(db_path or DB_PATH).resolve())
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools, _pools_pid = {}, os.getpid()
+        if key not in _pools:
+            _pools[key] = ConnectionPool(Path(key))
+        return _pools[key]
+
+
+def get_connection(db_path: Optional[Path] = None, row_factory: RowFactory = sqlite3.Row) -> sqlite3.Connection:
+    """Подключение из пула процесса (по умолчанию - DB_PATH, строки sqlite3.Row)."""
+    return get_pool(db_path).acquire(row_factory)
+
+
+def close_pools() -> None:
+    """Закрыть все пулы процесса и потоки run_db() (при завершении API/worker'а)."""
+    global _executor
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    for pool in pools:
+        pool.close()
+
+
+# Потоки для запросов из async-кода: каждый вызов берёт подключение из пула
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _pools_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="sqlite")
+        return _executor
+
+
+async def run_db(
+    fn: Callable[..., T],
+    *args: Any,
+    db_path: Optional[Path] = None,
+    row_factory: RowFactory = sqlite3.Row,
+) -> T:
+    """
+    Выполнить fn(conn, *args) в потоке БД и дождаться результата, не блокируя event loop.
+
+    fn получает подключение из пула и не закрывает его; незакоммиченное
+    после fn откатывается. Исключения fn (в т.ч. HTTPException) пробрасываются.
+    """
+    pool = get_pool(db_path)
+
+    def call() -> T:
+        with pool.connection(row_factory) as conn:
+            return fn(conn, *args)
+
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
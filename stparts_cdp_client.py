@@ -15,6 +15,7 @@ from typing import Dict, Any, List
 
 from playwright.async_api import async_playwright
 from base_browser_client import BaseBrowserClient
+from offline_parsers import parse_stparts_brand_links, stparts_matches_brand_filter
 from config import STPARTS_LOGIN, STPARTS_PASSWORD, STPARTS_PROXY, COOKIES_BACKUP_DIR
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,9 @@ class STPartsCDPClient(BaseBrowserClient):
     SITE_NAME = "stparts"
     BASE_URL = "https://stparts.ru"
 
+    # Частое реальное разрешение: меньше поверхность рендеринга, не выделяется по fingerprint
+    RENDER_PROFILE = {'viewport': {'width': 1366, 'height': 768}}
+
     async def connect(self) -> bool:
         """Подключиться к браузеру со stealth настройками для обхода защиты."""
         try:
@@ -44,15 +48,8 @@ class STPartsCDPClient(BaseBrowserClient):
                 '--disable-blink-features=AutomationControlled',  # Hide automation
                 '--no-first-run',
                 '--disable-infobars',
-                '--window-size=1920,1080',
-                '--start-maximized',
             ]
 
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=launch_args
-            )
-
             # Proxy settings
             proxy_config = None
             if STPARTS_PROXY:
@@ -60,15 +57,14 @@ class STPartsCDPClient(BaseBrowserClient):
                 proxy_config = {"server": STPARTS_PROXY}
 
             # Stealth context with realistic fingerprint
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
+            await self._launch_context(
+                launch_args,
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 locale='ru-RU',
                 timezone_id='Europe/Moscow',
                 proxy=proxy_config,
                 java_script_enabled=True,
                 bypass_csp=True,
-                permissions=['geolocation'],
                 color_scheme='light',
                 extra_http_headers={
                     'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -79,10 +75,6 @@ class STPartsCDPClient(BaseBrowserClient):
                 }
             )
 
-            # Блокируем изображения, CSS и шрифты для ускорения
-            await self.context.route("**/*.{png,jpg,jpeg,gif,webp,css,woff,woff2}", lambda route: route.abort())
-            logger.info(f"[{self.SITE_NAME}] Создан stealth контекст с блокировкой ресурсов")
-
             # Anti-detection scripts
             await self.context.add_init_script("""
                 // Remove webdriver property
@@ -111,7 +103,7 @@ class STPartsCDPClient(BaseBrowserClient):
             await self._load_cookies_from_backup()
 
             # Create page
-            self.page = await self.context.new_page()
+            self.page = self._track_page(await self._new_work_page())
 
             self.is_connected = True
             logger.info(f"[{self.SITE_NAME}] Подключение установлено (stealth режим)")
@@ -302,22 +294,23 @@ class STPartsCDPClient(BaseBrowserClient):
             logger.error(f"[stparts] Ошибка автологина: {e}")
             return False
 
-    async def keep_alive(self) -> None:
-        """Специфичный keep-alive для stparts.ru."""
+    async def keep_alive(self) -> bool:
+        """Специфичный keep-alive для stparts.ru (HTTP-клиент контекста, без страницы)."""
         try:
             logger.debug("[stparts] Keep-alive: проверка сессии...")
 
             # Делаем лёгкий запрос к API или главной
-            await self.page.evaluate('''
-                fetch("/api/user/current", {method: "GET", credentials: "include"})
-                    .catch(() => fetch("/", {method: "HEAD", credentials: "include"}))
-                    .catch(() => {});
-            ''')
+            try:
+                response = await self.context.request.get(f"{self.BASE_URL}/api/user/current", timeout=15000)
+            except Exception:
+                response = await self.context.request.head(self.BASE_URL, timeout=15000)
 
-            logger.debug("[stparts] Keep-alive OK")
+            logger.debug(f"[stparts] Keep-alive OK (HTTP {response.status})")
+            return True
 
         except Exception as e:
             logger.warning(f"[stparts] Keep-alive ошибка: {e}")
+            return False
 
     # ========== Методы поиска ==========
 
@@ -328,6 +321,7 @@ class STPartsCDPClient(BaseBrowserClient):
             partnumber: Артикул для поиска
             brand_filter: Фильтр по бренду (необязательно)
         """
+        brand_links = []  # бренды артикула со страницы выбора бренда (для кэша брендов)
         try:
             # Если указан brand_filter - сразу переходим на URL результатов
             if brand_filter:
@@ -358,6 +352,14 @@ class STPartsCDPClient(BaseBrowserClient):
                 logger.info(f"[stparts] Поиск: {partnumber}")
                 await self.page.wait_for_timeout(5000)
 
+                # Страница выбора бренда: ссылки "Цены и аналоги" -> /search/{Brand}/{partnumber}
+                try:
+                    brand_links = parse_stparts_brand_links(await self.page.eval_on_selector_all(
+                        "a[href*='/search/']", "links => links.map(a => a.getAttribute('href'))"
+                    ), partnumber)
+                except Exception:
+                    pass
+
                 # Пробуем нажать "Цены и аналоги"
                 try:
                     link = self.page.get_by_role("link", name="Цены и аналоги").first
@@ -379,6 +381,8 @@ class STPartsCDPClient(BaseBrowserClient):
                     'status': 'not_found',
                     'prices': {'min': None, 'avg': None},
                     'brand': brand,
+                    'brands': brand_links,
+                    'offers': data['offers'],
                     'url': self.page.url
                 }
 
@@ -390,6 +394,8 @@ class STPartsCDPClient(BaseBrowserClient):
                     'avg': round(sum(prices) / len(prices), 2)
                 },
                 'brand': brand,
+                'brands': brand_links,
+                'offers': data['offers'],
                 'url': self.page.url
             }
 
@@ -476,6 +482,7 @@ class STPartsCDPClient(BaseBrowserClient):
         - Цены в формате "1 234,56 ₽"
         """
         prices = []
+        offers = []  # все строки с ценой, без фильтра бренда (для кэша)
         brand = None
         filtered_count = 0
         total_count = 0
@@ -527,24 +534,30 @@ class STPartsCDPClient(BaseBrowserClient):
                             brand = row_brand
                             logger.info(f"[stparts] Найден бренд (fallback): {brand}")
 
-                # Если указан фильтр по бренду - пропускаем строки с другим брендом
-                if brand_filter and row_brand:
-                    total_count += 1
-                    if brand_filter.lower() not in row_brand.lower():
-                        continue
-                    filtered_count += 1
-
                 # Ищем цену в формате "141,40 ₽" или "1 234,56 ₽"
+                val = None
                 match = re.search(r"([\d\s]+[,.]?\d*)\s*₽", row_text)
                 if match:
                     try:
                         price_str = match.group(1).replace(" ", "").replace("\xa0", "").replace(",", ".")
-                        val = float(price_str)
-                        if 10 < val < 500000:
-                            prices.append(val)
+                        if 10 < float(price_str) < 500000:
+                            val = float(price_str)
                     except ValueError:
                         pass
 
+                if val is not None:
+                    offers.append({'brand': row_brand, 'price': val, 'stock': None, 'title': None})
+
+                # Если указан фильтр по бренду - пропускаем строки с другим брендом
+                if brand_filter and row_brand:
+                    total_count += 1
+                    if not stparts_matches_brand_filter(row_brand, brand_filter):
+                        continue
+                    filtered_count += 1
+
+                if val is not None:
+                    prices.append(val)
+
         except Exception as e:
             logger.debug(f"[stparts] Ошибка извлечения данных: {e}")
 
@@ -554,7 +567,7 @@ class STPartsCDPClient(BaseBrowserClient):
         unique_prices = list(set(prices))
         if unique_prices:
             logger.info(f"[stparts] Найдено {len(unique_prices)} уникальных цен: {sorted(unique_prices)[:5]}...")
-        return {'prices': unique_prices, 'brand': brand}
+        return {'prices': unique_prices, 'brand': brand, 'offers': offers}
 
 
 # ========== Тест ==========
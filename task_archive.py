@@ -0,0 +1,148 @@
+"""
+Архив завершённых задач: сжатые файлы по дням вместо строк tasks.
+
+GET /api/tasks отдаёт все строки tasks, а UI опрашивает его каждые 3 сек -
+без архива ответ и запрос растут вечно. Задачи DONE/ERROR старше
+TASK_ARCHIVE_AFTER_DAYS переносятся в TASK_ARCHIVE_DIR:
+
+- tasks-YYYY-MM-DD.jsonl.gz - задачи, созданные в этот день (UTC): строка
+  tasks_view (как в /api/tasks) + 'sources' - строки task_source_results
+- Файл дня перезаписывается целиком (временный файл + os.replace) с
+  объединением по id: повторный экспорт тех же задач не даёт дублей,
+  оборванная запись не портит уже записанный архив
+- Строки удаляются из tasks только после записи файла: export_tasks() читает
+  без блокировки записи, delete_tasks() - запись для DbWriter
+- find_archived_tasks() - чтение архива за диапазон дней (GET /api/tasks/archive)
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from partnumbers import normalize_partnumber
+from storage import get_connection
+
+# Кандидаты в архив - диапазон по idx_tasks_created_at, самые старые первыми
+ARCHIVABLE_TASKS_SQL = """
+    SELECT * FROM tasks_view
+    WHERE created_at < datetime('now', ?) AND status IN ('DONE', 'ERROR')
+    ORDER BY created_at
+    LIMIT ?
+"""
+
+
+def partition_path(archive_dir: Path, day: str) -> Path:
+    """Файл архива за день (YYYY-MM-DD)."""
+    return Path(archive_dir) / f"tasks-{day}.jsonl.gz"
+
+
+def read_partition(path: Path) -> List[Dict[str, Any]]:
+    """Задачи из файла архива ([] - файла нет)."""
+    if not path.exists():
+        return []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_partition(path: Path, tasks: Iterable[Dict[str, Any]]) -> int:
+    """
+    Дописать задачи в файл дня: объединение по id, запись во временный файл, fsync, os.replace.
+
+    Returns:
+        Число задач в файле
+    """
+    merged = {task['id']: task for task in read_partition(path)}
+    merged.update((task['id'], task) for task in tasks)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as raw:
+        with gzip.open(raw, 'wt', encoding='utf-8') as f:
+            for task_id in sorted(merged):
+                f.write(json.dumps(merged[task_id], ensure_ascii=False) + "\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    return len(merged)
+
+
+def select_archivable_tasks(conn: sqlite3.Connection, days: int, limit: int) -> List[Dict[str, Any]]:
+    """DONE/ERROR задачи старше days дней (не больше limit) с результатами источников; conn - с sqlite3.Row."""
+    tasks = [dict(row) for row in conn.execute(ARCHIVABLE_TASKS_SQL, (f"-{int(days)} days", limit))]
+    if not tasks:
+        return tasks
+
+    by_id = {task['id']: task for task in tasks}
+    for task in tasks:
+        task['sources'] = []
+    placeholders = ", ".join("?" for _ in by_id)
+    rows = conn.execute(
+        f"SELECT * FROM task_source_results WHERE task_id IN ({placeholders}) ORDER BY task_id, source",
+        list(by_id),
+    )
+    for row in rows:
+        source = dict(row)
+        by_id[source.pop('task_id')]['sources'].append(source)
+    return tasks
+
+
+def export_tasks(db_path: Path, archive_dir: Path, days: int, limit: int) -> List[int]:
+    """
+    Записать в архив DONE/ERROR задачи старше days дней (не больше limit).
+
+    Из tasks не удаляет - это делает delete_tasks() после успешной записи.
+
+    Returns:
+        id заархивированных задач
+    """
+    conn = get_connection(db_path)
+    try:
+        tasks = select_archivable_tasks(conn, days, limit)
+    finally:
+        conn.close()
+
+    partitions: Dict[str, List[Dict[str, Any]]] = {}
+    for task in tasks:
+        partitions.setdefault(str(task['created_at'])[:10], []).append(task)
+    for day, day_tasks in partitions.items():
+        write_partition(partition_path(archive_dir, day), day_tasks)
+    return [task['id'] for task in tasks]
+
+
+def delete_tasks(conn: sqlite3.Connection, task_ids: List[int]) -> int:
+    """Удалить заархивированные задачи и их результаты источников; без commit() (запись для DbWriter)."""
+    if not task_ids:
+        return 0
+    placeholders = ", ".join("?" for _ in task_ids)
+    conn.execute(f"DELETE FROM task_source_results WHERE task_id IN ({placeholders})", task_ids)
+    return conn.execute(f"DELETE FROM tasks WHERE id IN ({placeholders})", task_ids).rowcount
+
+
+def find_archived_tasks(
+    archive_dir: Path,
+    date_from: date,
+    date_to: date,
+    partnumber: Optional[str] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """
+    Задачи из архива за дни [date_from, date_to], новые первыми.
+
+    partnumber сравнивается в нормализованной форме; читаются только файлы
+    дней диапазона, чтение останавливается на limit задач.
+    """
+    partnumber_norm = normalize_partnumber(partnumber) if partnumber else None
+    found: List[Dict[str, Any]] = []
+    day = date_to
+    while day >= date_from and len(found) < limit:
+        tasks = read_partition(partition_path(archive_dir, day.isoformat()))
+        if partnumber_norm:
+            tasks = [task for task in tasks if task.get('partnumber_norm') == partnumber_norm]
+        tasks.sort(key=lambda task: (task['created_at'], task['id']), reverse=True)
+        found.extend(tasks[:limit - len(found)])
+        day -= timedelta(days=1)
+    return found
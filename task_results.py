@@ -0,0 +1,191 @@
+"""
+Результаты задачи по источникам (таблица task_source_results).
+
+Раньше цена каждого источника хранилась в своей колонке tasks.<source>_min_price.
+Теперь одна строка на (задача, источник): статус, min/avg, число предложений,
+время ответа, из кэша ли, URL.
+
+- tasks_view - tasks с колонками <source>_min_price из task_source_results:
+  /api/tasks и TaskResponse не меняются
+- Аналитика по источникам ("как часто Trast дешевле всех", p95 времени STparts) -
+  запросы по индексам task_source_results, а не разбор пяти колонок
+- Новый источник - новая строка, а не ALTER TABLE tasks
+"""
+
+import math
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from price_cache import PRICE_SOURCES
+
+TASK_SOURCE_RESULTS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS task_source_results (
+        task_id INTEGER NOT NULL,
+        source TEXT NOT NULL,  -- zzap, stparts, trast, autovid, autotrade
+        status TEXT NOT NULL,  -- статус клиента: success/DONE, NO_RESULTS, timeout, error, ...
+        min_price REAL,
+        avg_price REAL,
+        offer_count INTEGER,  -- все предложения без фильтра бренда (NULL - результат из кэша)
+        elapsed_ms INTEGER,
+        from_cache INTEGER NOT NULL DEFAULT 0,
+        url TEXT,
+        PRIMARY KEY (task_id, source)
+    ) WITHOUT ROWID
+"""
+
+INSERT_SOURCE_RESULT_SQL = """
+    INSERT OR REPLACE INTO task_source_results
+        (task_id, source, status, min_price, avg_price, offer_count, elapsed_ms, from_cache, url)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Колонки tasks, которые заменила task_source_results
+LEGACY_PRICE_COLUMNS = {f"{source}_min_price": source for source in PRICE_SOURCES}
+
+# Время живого поиска источника по возрастанию (source): p95 - строка с OFFSET
+SOURCE_LATENCY_SQL = """
+    SELECT elapsed_ms FROM task_source_results
+    WHERE source = ? AND from_cache = 0 AND elapsed_ms IS NOT NULL
+    ORDER BY elapsed_ms
+    LIMIT 1 OFFSET ?
+"""
+
+SOURCE_LATENCY_COUNT_SQL = """
+    SELECT COUNT(*) FROM task_source_results
+    WHERE source = ? AND from_cache = 0 AND elapsed_ms IS NOT NULL
+"""
+
+# Сколько раз источник дал минимальную цену задачи (при равенстве - все равные)
+CHEAPEST_SOURCE_SQL = """
+    SELECT r.source, COUNT(*) FROM task_source_results r
+    WHERE r.min_price IS NOT NULL
+      AND r.min_price = (SELECT MIN(m.min_price) FROM task_source_results m WHERE m.task_id = r.task_id)
+    GROUP BY r.source
+"""
+
+
+def _tasks_view_sql(conn: sqlite3.Connection) -> str:
+    # Колонки tasks перечисляются явно: в старой БД без DROP COLUMN (SQLite < 3.35)
+    # колонки <source>_min_price остаются, но в представление не попадают
+    columns = [
+        row[1] for row in conn.execute("PRAGMA table_info(tasks)")
+        if row[1] not in LEGACY_PRICE_COLUMNS
+    ]
+    prices = [
+        f"(SELECT r.min_price FROM task_source_results r WHERE r.task_id = t.id AND r.source = '{source}') "
+        f"AS {column}"
+        for column, source in LEGACY_PRICE_COLUMNS.items()
+    ]
+    return "CREATE VIEW tasks_view AS SELECT {} FROM tasks t".format(
+        ", ".join([f"t.{column}" for column in columns] + prices)
+    )
+
+
+def create_tasks_view(conn: sqlite3.Connection) -> None:
+    """(Пере)создать tasks_view по текущим колонкам tasks."""
+    conn.execute("DROP VIEW IF EXISTS tasks_view")
+    conn.execute(_tasks_view_sql(conn))
+
+
+def ensure_task_source_results(conn: sqlite3.Connection) -> None:
+    """
+    Миграция: task_source_results с индексами и представление tasks_view.
+
+    Цены из колонок tasks.<source>_min_price переносятся в task_source_results,
+    колонки удаляются. Шаг migrate.py, без commit(); миграция, меняющая
+    колонки tasks, вызывает create_tasks_view().
+    """
+    conn.execute(TASK_SOURCE_RESULTS_SCHEMA)
+    conn.execute("DROP VIEW IF EXISTS tasks_view")  # Ссылается на удаляемые колонки
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+    for column in [column for column in LEGACY_PRICE_COLUMNS if column in existing]:
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO task_source_results (task_id, source, status, min_price)
+            SELECT id, ?, 'success', {column} FROM tasks WHERE {column} IS NOT NULL
+            """,
+            (LEGACY_PRICE_COLUMNS[column],),
+        )
+        try:
+            conn.execute(f"ALTER TABLE tasks DROP COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass  # SQLite < 3.35: колонка остаётся, но больше не пишется и не читается
+    create_tasks_view(conn)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_task_source_results_latency "
+        "ON task_source_results(source, from_cache, elapsed_ms)"
+    )
+
+
+def source_result_rows(
+    task_ids: Iterable[int],
+    results: Dict[str, Dict[str, Any]],
+) -> List[Tuple[Any, ...]]:
+    """
+    Строки для INSERT_SOURCE_RESULT_SQL: каждый источник для каждой задачи.
+
+    results - {source: результат клиента} ({'status', 'prices', 'offers',
+    'elapsed_time', 'from_cache', 'url'}); задачи-дубликаты получают те же строки.
+    """
+    per_source = []
+    for source, result in results.items():
+        prices = result.get('prices') or {}
+        offers = result.get('offers')
+        elapsed = result.get('elapsed_time')
+        per_source.append((
+            source,
+            result.get('status') or 'error',
+            prices.get('min') or None,
+            prices.get('avg') or None,
+            len(offers) if offers is not None else None,
+            round(elapsed * 1000) if elapsed is not None else None,
+            1 if result.get('from_cache') else 0,
+            result.get('url'),
+        ))
+    return [(task_id, *row) for task_id in task_ids for row in per_source]
+
+
+def save_source_results(
+    conn: sqlite3.Connection,
+    task_ids: Iterable[int],
+    results: Dict[str, Dict[str, Any]],
+) -> None:
+    """Сохранить результаты источников задач; без commit()."""
+    conn.executemany(INSERT_SOURCE_RESULT_SQL, source_result_rows(task_ids, results))
+
+
+def source_latency_percentile(conn: sqlite3.Connection, source: str, percentile: float = 0.95) -> Optional[int]:
+    """Перцентиль времени живого поиска источника, мс (None - нет данных)."""
+    count = conn.execute(SOURCE_LATENCY_COUNT_SQL, (source,)).fetchone()[0]
+    if not count:
+        return None
+    offset = max(math.ceil(percentile * count) - 1, 0)
+    return conn.execute(SOURCE_LATENCY_SQL, (source, offset)).fetchone()[0]
+
+
+def load_source_stats(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    """
+    Сводка по источникам за всё время.
+
+    Returns:
+        {source: {'tasks', 'found', 'from_cache', 'cheapest', 'cheapest_share', 'p50_ms', 'p95_ms'}}
+    """
+    cheapest = dict(conn.execute(CHEAPEST_SOURCE_SQL).fetchall())
+    stats: Dict[str, Dict[str, Any]] = {}
+    rows = conn.execute(
+        """
+        SELECT source, COUNT(*), COUNT(min_price), SUM(from_cache)
+        FROM task_source_results GROUP BY source
+        """
+    ).fetchall()
+    for source, tasks, found, from_cache in rows:
+        stats[source] = {
+            'tasks': tasks,
+            'found': found,
+            'from_cache': from_cache,
+            'cheapest': cheapest.get(source, 0),
+            'cheapest_share': round(cheapest.get(source, 0) / found, 3) if found else None,
+            'p50_ms': source_latency_percentile(conn, source, 0.5),
+            'p95_ms': source_latency_percentile(conn, source, 0.95),
+        }
+    return stats
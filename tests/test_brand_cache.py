@@ -0,0 +1,96 @@
+"""Unit-тесты для кэша списков брендов по артикулу."""
+import asyncio
+import sqlite3
+
+import pytest
+
+from brand_cache import BrandCache, COMPLETE_SOURCE, NOT_FOUND_SOURCE, load_brands, save_brands
+from migrate import migrate
+from storage import run_db
+
+
+@pytest.fixture
+def cache(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "brands.db"))
+    migrate(conn)
+    conn.close()
+    cache = BrandCache(tmp_path / "brands.db", ttl_sec=3600, negative_ttl_sec=60)
+    yield cache
+    cache.close()
+
+
+class TestBrandCache:
+    def test_miss(self, cache):
+        assert cache.get("1920QK") is None
+
+    def test_partial_then_complete(self, cache):
+        cache.put("1920QK", ["TYC"], "stparts")
+        assert cache.get("1920QK") == {'brands': ["TYC"], 'complete': False}
+
+        cache.put("1920QK", ["tyc", "SAT"], COMPLETE_SOURCE)
+        assert cache.get("1920QK") == {'brands': ["TYC", "SAT"], 'complete': True}
+
+    def test_partial_does_not_downgrade_complete(self, cache):
+        cache.put("1920QK", ["TYC"], COMPLETE_SOURCE)
+        cache.put("1920QK", ["TYC"], "zzap")
+        assert cache.get("1920QK")['complete']
+
+    def test_normalized_key(self, cache):
+        cache.put("1920-qk", ["TYC"], "zzap")
+        assert cache.get("1920 QК")['brands'] == ["TYC"]
+
+    def test_expired_entries_ignored(self, cache):
+        cache.put("1920QK", ["TYC"], COMPLETE_SOURCE)
+        cache.conn.execute("UPDATE brand_cache SET seen_at = datetime('now', '-2 hours')")
+        assert cache.get("1920QK") is None
+
+    def test_empty_complete_list_cached_with_negative_ttl(self, cache):
+        cache.put("1920QK", [], COMPLETE_SOURCE)
+        assert cache.get("1920QK") == {'brands': [], 'complete': True}
+
+        cache.conn.execute("UPDATE brand_cache SET seen_at = datetime('now', '-5 minutes')")
+        assert cache.get("1920QK") is None  # negative_ttl_sec=60
+
+    def test_empty_result_completes_partial_list(self, cache):
+        cache.put("1920QK", ["TYC"], "stparts")
+        cache.put("1920QK", [], COMPLETE_SOURCE)
+        assert cache.get("1920QK") == {'brands': ["TYC"], 'complete': True}
+
+        cache.conn.execute(f"UPDATE brand_cache SET seen_at = datetime('now', '-5 minutes') WHERE source = '{NOT_FOUND_SOURCE}'")
+        assert cache.get("1920QK") == {'brands': ["TYC"], 'complete': False}
+
+    def test_empty_partial_list_not_cached(self, cache):
+        cache.put("1920QK", [], "stparts")
+        assert cache.get("1920QK") is None
+
+    def test_store_result_zzap_modal_list_is_complete(self, cache):
+        cache.store_result("1920QK", "zzap", {'brand': "TYC", 'brands': ["TYC", "SAT"]})
+        assert cache.get("1920QK") == {'brands': ["TYC", "SAT"], 'complete': True}
+
+    def test_store_result_ignores_analog_sources(self, cache):
+        cache.store_result("1920QK", "trast", {'brand': "DEPO"})
+        assert cache.get("1920QK") is None
+        cache.store_result("1920QK", "autotrade", {'brand': "SAT"})
+        assert cache.get("1920QK") == {'brands': ["SAT"], 'complete': False}
+
+    def test_api_functions_through_run_db(self, cache):
+        async def roundtrip():
+            await run_db(save_brands, "1920-qk", ["TYC", "SAT"], COMPLETE_SOURCE, db_path=cache.db_path)
+            return await run_db(load_brands, "1920QK", db_path=cache.db_path)
+
+        assert asyncio.run(roundtrip()) == {'brands': ["TYC", "SAT"], 'complete': True}
+        assert cache.get("1920QK")['brands'] == ["TYC", "SAT"]  # commit() в save_brands
+
+    def test_schema_from_migrations_on_shared_db(self, tmp_path):
+        db_path = tmp_path / "tasks.db"
+        conn = sqlite3.connect(str(db_path))
+        migrate(conn)
+        conn.close()
+        cache = BrandCache(db_path)
+        cache.put("A1", ["X"], "zzap")
+        cache.close()
+        assert BrandCache(db_path).get("A1")['brands'] == ["X"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,50 @@
+"""Unit-тесты для памяти процессов Chromium по /proc."""
+from pathlib import Path
+
+import pytest
+
+from browser_processes import find_browser_pid, process_tree_rss_mb
+
+
+def add_process(proc, pid, ppid, rss_kb, args=()):
+    entry = proc / str(pid)
+    entry.mkdir()
+    (entry / "status").write_text(f"Name:\tchrome\nPPid:\t{ppid}\nVmRSS:\t{rss_kb} kB\n")
+    (entry / "cmdline").write_bytes(b"\0".join(arg.encode() for arg in args) + b"\0")
+
+
+@pytest.fixture
+def proc(tmp_path):
+    """worker (100) -> два драйвера Playwright -> два Chromium со своими детьми."""
+    proc = tmp_path / "proc"
+    proc.mkdir()
+    add_process(proc, 100, 1, 50_000)
+    add_process(proc, 200, 100, 10_000)
+    add_process(proc, 210, 200, 100 * 1024, ["chrome", "--user-data-dir=/profiles/zzap"])
+    add_process(proc, 211, 210, 300 * 1024, ["chrome", "--type=renderer", "--user-data-dir=/profiles/zzap"])
+    add_process(proc, 300, 100, 10_000)
+    add_process(proc, 310, 300, 900 * 1024, ["chrome", "--user-data-dir=/profiles/trast"])
+    add_process(proc, 311, 310, 900 * 1024, ["chrome", "--type=renderer"])
+    return proc
+
+
+class TestProcessTreeRss:
+    def test_only_own_browser_tree(self, proc):
+        assert process_tree_rss_mb(210, proc) == 400
+        assert process_tree_rss_mb(310, proc) == 1800
+
+    def test_missing_process(self, proc):
+        assert process_tree_rss_mb(999, proc) is None
+
+
+class TestFindBrowserPid:
+    def test_root_process_of_profile(self, proc):
+        assert find_browser_pid(Path("/profiles/zzap"), proc) == 210
+        assert find_browser_pid(Path("/profiles/trast"), proc) == 310
+
+    def test_unknown_profile(self, proc):
+        assert find_browser_pid(Path("/profiles/stparts"), proc) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,84 @@
+"""Unit-тесты для статистики кэша цен."""
+import sqlite3
+
+import pytest
+
+from cache_stats import CacheStats, load_cache_stats, write_cache_stats
+from db_writer import DbWriter
+from migrate import migrate
+
+
+HIT = {'price': 1000, 'stale': False}
+STALE_HIT = {'price': 1000, 'stale': True}
+NEGATIVE_HIT = {'price': None, 'stale': False}
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+class TestCacheStats:
+    def test_lookup_counters(self, conn):
+        stats = CacheStats()
+        stats.record_lookup({'zzap': HIT, 'trast': None})
+        stats.record_lookup({'zzap': STALE_HIT, 'trast': NEGATIVE_HIT})
+        stats.flush(conn)
+        summary = load_cache_stats(conn)['sources']
+        assert summary['zzap']['hits'] == 2
+        assert summary['zzap']['stale_hits'] == 1
+        assert summary['zzap']['hit_rate'] == 1.0
+        assert summary['trast']['misses'] == 1
+        assert summary['trast']['negative_hits'] == 1
+        assert summary['trast']['hit_rate'] == 0.5
+
+    def test_saved_seconds_from_live_latency(self, conn):
+        stats = CacheStats()
+        stats.record_live('zzap', 20.0)
+        stats.record_live('zzap', 10.0)
+        stats.record_lookup({'zzap': HIT})
+        stats.flush(conn)
+        summary = load_cache_stats(conn)['sources']['zzap']
+        assert summary['saved_sec'] == 15.0
+        assert summary['avg_live_sec'] == 15.0
+
+    def test_flush_accumulates_into_same_window(self, conn):
+        stats = CacheStats()
+        stats.record_lookup({'zzap': None})
+        stats.flush(conn)
+        stats.record_lookup({'zzap': None})
+        stats.flush(conn)
+        assert conn.execute("SELECT COUNT(*), SUM(misses) FROM cache_stats").fetchone() == (1, 2)
+
+    def test_pending_written_through_writer(self, tmp_path):
+        db_path = tmp_path / "cache.db"
+        conn = sqlite3.connect(str(db_path))
+        migrate(conn)
+        stats = CacheStats()
+        stats.record_lookup({'zzap': HIT})
+        rows = stats.take_pending()
+        assert not stats.flush_due()  # счётчики сняты в памяти до записи
+        writer = DbWriter(db_path)
+        writer.submit(write_cache_stats, rows).result(timeout=5)
+        writer.close()
+        assert load_cache_stats(conn)['sources']['zzap']['hits'] == 1
+        conn.close()
+
+    def test_seed_restores_latency(self, conn):
+        stats = CacheStats()
+        stats.record_live('trast', 8.0)
+        stats.flush(conn)
+        restarted = CacheStats()
+        restarted.seed(conn)
+        assert restarted.avg_live_sec('trast') == 8.0
+
+    def test_window_start_aligned(self):
+        stats = CacheStats(window_sec=3600)
+        assert stats.window_start(now=3600 * 5 + 125) == '1970-01-01 05:00:00'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
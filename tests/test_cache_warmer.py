@@ -0,0 +1,125 @@
+"""Unit-тесты для прогрева кэша популярных артикулов."""
+import sqlite3
+
+import pytest
+
+from cache_warmer import CacheWarmer, SiteBudget, hot_score, rank_hot_partnumbers
+from migrate import migrate
+from partnumbers import normalize_brand_key, normalize_partnumber
+from price_cache import PriceCache
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "tasks.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        """
+        CREATE TABLE tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,
+            search_brand TEXT,
+            status TEXT NOT NULL DEFAULT 'PENDING',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE price_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,
+            brand TEXT,
+            source TEXT NOT NULL,
+            price REAL,
+            url TEXT,
+            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    migrate(conn)
+    conn.close()
+    return path
+
+
+def add_tasks(db_path, partnumber, count, brand=None, age_hours=0):
+    conn = sqlite3.connect(str(db_path))
+    for _ in range(count):
+        conn.execute(
+            "INSERT INTO tasks (partnumber, partnumber_norm, search_brand, search_brand_key, created_at) "
+            "VALUES (?, ?, ?, ?, datetime('now', ?))",
+            (partnumber, normalize_partnumber(partnumber), brand, normalize_brand_key(brand), f"-{age_hours} hours"),
+        )
+    conn.commit()
+    conn.close()
+
+
+class TestRanking:
+    def test_score_decays_with_age(self):
+        assert hot_score(4, 0, 72) == 4
+        assert hot_score(4, 72, 72) == 2
+
+    def test_frequency_and_recency(self, db_path):
+        add_tasks(db_path, "OLD", 6, age_hours=24 * 10)
+        add_tasks(db_path, "1920 QK", 2)
+        add_tasks(db_path, "1920-qk", 2)
+        add_tasks(db_path, "ONCE", 1)
+        conn = sqlite3.connect(str(db_path))
+        hot = rank_hot_partnumbers(conn, limit=10, days=14, min_requests=2, half_life_hours=72)
+        conn.close()
+        assert hot == [("1920-qk", None), ("OLD", None)]
+
+    def test_brand_is_separate_key(self, db_path):
+        add_tasks(db_path, "ABC", 2, brand="TYC")
+        add_tasks(db_path, "ABC", 2)
+        conn = sqlite3.connect(str(db_path))
+        hot = rank_hot_partnumbers(conn, limit=10, days=14, min_requests=2, half_life_hours=72)
+        conn.close()
+        assert set(hot) == {("ABC", "TYC"), ("ABC", None)}
+
+    def test_cyrillic_brand_case_is_one_key(self, db_path):
+        add_tasks(db_path, "ABC", 1, brand="Лада")
+        add_tasks(db_path, "ABC", 1, brand="ЛАДА")
+        conn = sqlite3.connect(str(db_path))
+        hot = rank_hot_partnumbers(conn, limit=10, days=14, min_requests=2, half_life_hours=72)
+        conn.close()
+        assert hot == [("ABC", "ЛАДА")]
+
+
+class TestSiteBudget:
+    def test_limit_per_hour(self):
+        budget = SiteBudget(per_hour=2, source_per_hour={'zzap': 1})
+        assert budget.try_spend('zzap', now=0)
+        assert not budget.try_spend('zzap', now=10)
+        assert budget.try_spend('trast', now=10)
+        assert budget.try_spend('trast', now=20)
+        assert not budget.try_spend('trast', now=30)
+        assert budget.try_spend('zzap', now=3600)
+
+
+class TestCacheWarmer:
+    def test_picks_expiring_entries_within_budget(self, db_path):
+        add_tasks(db_path, "ABC", 3)
+        cache = PriceCache(db_path, sources=("zzap", "trast"), ttl_sec=30 * 60)
+        cache.put("ABC", None, "zzap", 1000, None)
+        warmer = CacheWarmer(cache, db_path, budget=SiteBudget(per_hour=1, source_per_hour={}), lead_sec=5 * 60)
+        # zzap свежий - прогревается только trast, затем бюджет исчерпан
+        assert warmer.next_refresh() == ("ABC", None, "trast")
+        assert warmer.next_refresh() is None
+        cache.close()
+
+    def test_fresh_cache_needs_no_warming(self, db_path):
+        add_tasks(db_path, "ABC", 3)
+        cache = PriceCache(db_path, sources=("zzap",), ttl_sec=30 * 60)
+        cache.put("ABC", None, "zzap", 1000, None)
+        warmer = CacheWarmer(cache, db_path, budget=SiteBudget(per_hour=10, source_per_hour={}), lead_sec=5 * 60)
+        assert warmer.next_refresh() is None
+        warmer.lead_sec = 31 * 60
+        assert warmer.next_refresh() == ("ABC", None, "zzap")
+        cache.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
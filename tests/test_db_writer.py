@@ -0,0 +1,122 @@
+"""Unit-тесты для единственного писателя worker'а (очередь + групповые транзакции)."""
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from db_writer import DbWriter
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "tasks.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE log (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id INTEGER, step TEXT)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def add_step(conn, task_id, step):
+    conn.execute("INSERT INTO log (task_id, step) VALUES (?, ?)", (task_id, step))
+
+
+def read_steps(db_path):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return conn.execute("SELECT task_id, step FROM log ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+class TestDbWriter:
+    def test_queued_writes_share_one_transaction(self, db_path):
+        writer = DbWriter(db_path, linger_sec=0.2)
+        futures = [writer.submit(add_step, 1, f"cache{i}") for i in range(5)]
+        futures[-1].result(timeout=5)
+        writer.close()
+        assert len(read_steps(db_path)) == 5
+        assert writer.batches == 1
+        assert writer.writes == 5
+
+    def test_order_preserved_per_task(self, db_path):
+        writer = DbWriter(db_path, linger_sec=0, max_batch=3)
+        for task_id in (1, 2):
+            for step in ("cache", "history", "status"):
+                writer.submit(add_step, task_id, step)
+        writer.close()
+        steps = read_steps(db_path)
+        for task_id in (1, 2):
+            assert [step for tid, step in steps if tid == task_id] == ["cache", "history", "status"]
+
+    def test_failed_intent_does_not_roll_back_batch(self, db_path):
+        def failing(conn):
+            add_step(conn, 1, "partial")
+            raise ValueError("ошибка записи")
+
+        writer = DbWriter(db_path, linger_sec=0.2)
+        ok_before = writer.submit(add_step, 1, "before")
+        bad = writer.submit(failing)
+        ok_after = writer.submit(add_step, 1, "after")
+        ok_after.result(timeout=5)
+        writer.close()
+
+        assert ok_before.result() is None
+        with pytest.raises(ValueError):
+            bad.result()
+        assert read_steps(db_path) == [(1, "before"), (1, "after")]
+
+    def test_cancelled_write_skipped_writer_survives(self, db_path):
+        started, release = threading.Event(), threading.Event()
+
+        def blocking(conn):
+            started.set()
+            release.wait(5)
+
+        writer = DbWriter(db_path, linger_sec=0)
+        writer.submit(blocking)
+        assert started.wait(5)
+
+        async def main():
+            task = asyncio.ensure_future(writer.write(add_step, 1, "cancelled"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.sleep(0.01)  # отмена доходит до Future писателя
+            release.set()
+            # Поток-писатель жив: следующая запись коммитится
+            return await asyncio.wait_for(writer.write(lambda conn: add_step(conn, 1, "after") or "ok"), 5)
+
+        assert asyncio.run(main()) == "ok"
+        writer.close()
+        assert read_steps(db_path) == [(1, "after")]
+
+    def test_write_awaits_commit(self, db_path):
+        writer = DbWriter(db_path)
+
+        async def main():
+            return await writer.write(lambda conn: add_step(conn, 7, "done") or "ok")
+
+        assert asyncio.run(main()) == "ok"
+        assert read_steps(db_path) == [(7, "done")]
+        writer.close()
+
+    def test_writes_on_own_thread(self, db_path):
+        writer = DbWriter(db_path)
+        thread_name = writer.submit(lambda conn: threading.current_thread().name).result(timeout=5)
+        writer.close()
+        assert thread_name == "db-writer"
+
+    def test_flush_and_close_drain_queue(self, db_path):
+        writer = DbWriter(db_path, linger_sec=0)
+        for i in range(20):
+            writer.submit(add_step, 1, str(i))
+        writer.flush(timeout=5)
+        assert len(read_steps(db_path)) == 20
+        writer.submit(add_step, 1, "last")
+        writer.close()
+        assert read_steps(db_path)[-1] == (1, "last")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
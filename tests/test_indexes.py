@@ -0,0 +1,103 @@
+"""Unit-тесты для индексов: EXPLAIN QUERY PLAN горячих запросов без полного сканирования."""
+import re
+import sqlite3
+
+import pytest
+
+from cache_warmer import HOT_PARTNUMBERS_SQL
+from indexes import (
+    ACTIVE_TASK_SQL,
+    ARTICLE_BRANDS_SQL,
+    DUPLICATE_TASKS_SQL,
+    INDEXES,
+    OBSOLETE_INDEXES,
+    PENDING_TASK_SQL,
+    TASKS_LIST_SQL,
+)
+from migrate import (
+    hot_query_indexes_cache,
+    hot_query_indexes_history,
+    hot_query_indexes_tasks,
+    migrate,
+    tasks_search_brand_key,
+)
+from price_cache import PRICE_SOURCES, lookup_sql
+from task_archive import ARCHIVABLE_TASKS_SQL
+from task_results import SOURCE_LATENCY_SQL
+
+# Запрос, параметры, индекс(ы), которые он может использовать
+HOT_QUERIES = {
+    'pending_task': (PENDING_TASK_SQL, (), 'idx_tasks_pending'),
+    'duplicate_tasks': (DUPLICATE_TASKS_SQL, (1, '1920QK', 'TYC'), 'idx_tasks_search_key'),
+    'active_task': (ACTIVE_TASK_SQL, ('1920QK', 'TYC'), 'idx_tasks_search_key'),
+    'tasks_list': (TASKS_LIST_SQL, (), 'idx_tasks_created_at'),
+    'article_brands': (ARTICLE_BRANDS_SQL, ('1920QK',), 'idx_tasks_brand'),
+    'price_cache_lookup': (
+        lookup_sql(len(PRICE_SOURCES)), ('1920QK', *PRICE_SOURCES, None, None, '-3600 seconds'), 'idx_price_cache_norm_source',
+    ),
+    'hot_partnumbers': (HOT_PARTNUMBERS_SQL, ('-14 days', 2), ('idx_tasks_created_at', 'idx_tasks_search_key')),
+    'source_latency': (SOURCE_LATENCY_SQL, ('stparts', 10), 'idx_task_source_results_latency'),
+    'archivable_tasks': (ARCHIVABLE_TASKS_SQL, ('-30 days', 1000), 'idx_tasks_created_at'),
+}
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(t|tasks|price_history|price_cache|task_source_results)$')
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO tasks (partnumber, partnumber_norm, search_brand, search_brand_key, status, brand) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (f"PN{i}", f"PN{i}", "TYC" if i % 2 else None, "TYC" if i % 2 else "", "DONE" if i % 10 else "PENDING", "TYC")
+            for i in range(500)
+        ],
+    )
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+class TestIndexes:
+    def test_all_indexes_created(self, conn):
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert set(INDEXES) <= names
+
+    def test_obsolete_indexes_dropped(self, conn):
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert not names & set(OBSOLETE_INDEXES)
+
+    def test_index_tables(self, conn):
+        tables = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'"))
+        assert {name: tables[name] for name in INDEXES} == INDEXES
+
+    def test_hot_query_steps_are_idempotent(self, conn):
+        for step in (hot_query_indexes_tasks, hot_query_indexes_history, hot_query_indexes_cache, tasks_search_brand_key):
+            step(conn)
+
+
+class TestQueryPlans:
+    @pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+    def test_no_full_scan(self, conn, name):
+        sql, params, indexes = HOT_QUERIES[name]
+        plan = query_plan(conn, sql, params)
+        assert not [step for step in plan if FULL_SCAN.match(step)], plan
+        indexes = (indexes,) if isinstance(indexes, str) else indexes
+        assert any(index in step for step in plan for index in indexes), plan
+
+    # active_task сортирует только дубликаты одного ключа - временное дерево на пару строк допустимо
+    @pytest.mark.parametrize("name", ['pending_task', 'tasks_list', 'source_latency', 'archivable_tasks'])
+    def test_order_by_served_by_index(self, conn, name):
+        sql, params, _ = HOT_QUERIES[name]
+        plan = query_plan(conn, sql, params)
+        assert not [step for step in plan if 'TEMP B-TREE FOR ORDER BY' in step], plan
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
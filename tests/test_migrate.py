@@ -0,0 +1,185 @@
+"""Unit-тесты для миграций схемы БД (schema_migrations, migrate.py)."""
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import migrate as migrate_module
+from migrate import MIGRATIONS, applied_versions, main, migrate, pending_migrations, pending_store_migrations
+from storage import STORES
+
+REPO_DB = Path(__file__).resolve().parent.parent / "tasks.db"
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    yield conn
+    conn.close()
+
+
+def names(conn, kind):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+class TestMigrate:
+    def test_versions_ascending_and_unique(self):
+        versions = [version for version, _, _ in MIGRATIONS]
+        assert versions == sorted(set(versions))
+
+    def test_applied_versions_unchanged(self):
+        # Применённые версии не редактируются: новые изменения - только новые записи
+        assert [(version, name) for version, name, _ in MIGRATIONS[:6]] == [
+            (1, 'initial_schema'), (2, 'partnumber_norm'), (3, 'cache_tables'),
+            (4, 'price_history_recorded_day'), (5, 'price_history_rollups'), (6, 'task_source_results'),
+        ]
+        assert all(callable(step) for _, _, step in MIGRATIONS[:6])
+
+    def test_fresh_db(self, conn):
+        applied = migrate(conn)
+        assert [version for version, _, _ in applied] == [version for version, _, _ in MIGRATIONS]
+        assert {'tasks', 'price_history', 'price_cache', 'cache_stats', 'brand_cache',
+                'price_history_daily', 'task_source_results', 'schema_migrations'} <= names(conn, 'table')
+        assert 'tasks_view' in names(conn, 'view')
+        assert pending_migrations(conn) == []
+
+    def test_applied_once(self, conn):
+        migrate(conn)
+        assert migrate(conn) == []
+        assert applied_versions(conn) == [version for version, _, _ in MIGRATIONS]
+
+    def test_pending_check_does_no_ddl(self, conn):
+        assert len(pending_migrations(conn)) == len(MIGRATIONS)
+        assert names(conn, 'table') == set()
+
+    def test_legacy_db_upgraded(self, conn):
+        conn.execute(
+            """
+            CREATE TABLE tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                partnumber TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'PENDING',
+                min_price REAL,
+                avg_price REAL,
+                zzap_min_price REAL,
+                stparts_min_price REAL,
+                result_url TEXT,
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                completed_at TIMESTAMP
+            )
+            """
+        )
+        conn.execute("INSERT INTO tasks (partnumber, status, zzap_min_price) VALUES ('1920-qk', 'DONE', 1000)")
+        conn.commit()
+        migrate(conn)
+
+        task = conn.execute(
+            "SELECT partnumber_norm, search_brand, stale_sources, zzap_min_price FROM tasks_view"
+        ).fetchone()
+        assert task == ('1920QK', None, None, 1000.0)
+
+    def test_partnumber_norm_ddl_frozen(self, conn, monkeypatch):
+        # Миграция 2 создаёт только свои индексы - индексы горячих запросов дают миграции 8+
+        monkeypatch.setattr(migrate_module, "MIGRATIONS", MIGRATIONS[:2])
+        migrate(conn)
+        assert {name for name in names(conn, 'index') if name.startswith('idx_')} == {
+            'idx_tasks_partnumber_norm', 'idx_price_history_partnumber_norm', 'idx_price_cache_partnumber_norm',
+        }
+
+    def test_search_brand_key_backfilled(self, conn, monkeypatch):
+        monkeypatch.setattr(migrate_module, "MIGRATIONS", MIGRATIONS[:8])
+        migrate(conn)
+        conn.executemany(
+            "INSERT INTO tasks (partnumber, search_brand) VALUES ('ABC', ?)", [(" Лада ",), ("ЛАДА",), (None,)]
+        )
+        monkeypatch.setattr(migrate_module, "MIGRATIONS", MIGRATIONS)
+        migrate(conn)
+        assert [row[0] for row in conn.execute("SELECT search_brand_key FROM tasks ORDER BY id")] == ["ЛАДА", "ЛАДА", ""]
+        assert 'idx_tasks_search_key' in names(conn, 'index')
+        assert 'idx_tasks_key' not in names(conn, 'index')
+
+    def test_failed_migration_rolled_back(self, conn, monkeypatch):
+        def broken(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(migrate_module, "MIGRATIONS", MIGRATIONS[:1] + [(99, 'broken', {'tasks': broken})])
+        with pytest.raises(RuntimeError):
+            migrate(conn)
+        assert 'half_done' not in names(conn, 'table')
+        assert applied_versions(conn) == [MIGRATIONS[0][0]]
+
+    def test_store_step_runs_only_in_store_file(self, tmp_path, monkeypatch):
+        def cache_only(conn):
+            conn.execute("CREATE TABLE cache_only (id INTEGER)")
+
+        monkeypatch.setattr(migrate_module, "MIGRATIONS", MIGRATIONS + [(99, 'cache_only', {'cache': cache_only})])
+        files = {store: sqlite3.connect(str(tmp_path / f"{store}.db")) for store in STORES}
+        try:
+            for store, conn in files.items():
+                migrate(conn, (store,))
+                assert set(STORES[store]) <= names(conn, 'table')
+                assert applied_versions(conn)[-1] == 99
+            assert 'cache_only' in names(files['cache'], 'table')
+            assert 'cache_only' not in names(files['tasks'], 'table')
+        finally:
+            for conn in files.values():
+                conn.close()
+
+    def test_incremental_vacuum_only_in_cache_file(self, tmp_path):
+        files = {store: sqlite3.connect(str(tmp_path / f"{store}.db")) for store in ('tasks', 'cache')}
+        try:
+            for store, conn in files.items():
+                conn.execute("CREATE TABLE legacy (id INTEGER)")  # БД до миграций: режим меняет только VACUUM
+                migrate(conn, (store,))
+            assert files['cache'].execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            assert files['tasks'].execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+            assert 7 in applied_versions(files['tasks'])
+        finally:
+            for conn in files.values():
+                conn.close()
+
+    def test_pending_per_store_file(self, tmp_path, monkeypatch):
+        paths = {store: tmp_path / f"{store}.db" for store in STORES}
+        monkeypatch.setattr(migrate_module, "store_files", lambda: {path: (store,) for store, path in paths.items()})
+        assert set(pending_store_migrations()) == set(paths.values())
+
+        for store in ('tasks', 'cache'):
+            conn = sqlite3.connect(str(paths[store]))
+            migrate(conn, (store,))
+            conn.close()
+        assert list(pending_store_migrations()) == [paths['history']]
+
+    def test_startup_check_is_read_only(self, tmp_path, monkeypatch):
+        db_path = tmp_path / "tasks.db"
+        conn = sqlite3.connect(str(db_path))
+        migrate(conn)
+        conn.close()
+        missing = tmp_path / "cache.db"
+        monkeypatch.setattr(migrate_module, "store_files", lambda: {db_path: ('tasks',), missing: ('cache',)})
+
+        assert list(pending_store_migrations()) == [missing]
+        assert not missing.exists()
+        conn = sqlite3.connect(str(db_path))
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        conn.close()
+
+    @pytest.mark.skipif(not REPO_DB.exists(), reason="нет tasks.db")
+    def test_repo_db_copy(self, tmp_path):
+        db_path = tmp_path / "tasks.db"
+        shutil.copy(REPO_DB, db_path)
+        assert main(["--db", str(db_path)]) == 0
+        assert main(["--db", str(db_path), "--status"]) == 0
+        conn = sqlite3.connect(str(db_path))
+        try:
+            assert pending_migrations(conn) == []
+            conn.execute("SELECT * FROM tasks_view LIMIT 1").fetchall()
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
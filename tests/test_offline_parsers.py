@@ -0,0 +1,155 @@
+"""Unit-тесты для offline парсеров (общих для live- и fetch-поиска)."""
+import pytest
+
+from offline_parsers import (
+    autovid_is_logged_in,
+    html_to_text,
+    is_trast_challenge,
+    parse_autotrade_html,
+    parse_autovid_html,
+    parse_stparts_brand_links,
+    parse_trast_text,
+    parse_zzap_modal_rows,
+    trast_has_no_results,
+    trast_matches_brand_filter,
+)
+
+
+AUTOTRADE_HTML = """
+<html><body>
+<div class="balance">Баланс: 125 000 RUB</div>
+<table>
+  <tr><th>Товар</th><th>Цена</th></tr>
+  <tr><td>Артикул: ST-FDR8-087-1, Бренд: SAT, Страна: КИТАЙ</td><td>935 RUB</td><td>11</td></tr>
+  <tr><td>Артикул: ST-FDR8-087-1, Бренд: SAT, Страна: КИТАЙ</td><td>1 020 RUB</td><td>4</td></tr>
+</table>
+</body></html>
+"""
+
+AUTOVID_HTML = """
+<html><body>
+<ul class="products">
+  <li class="product"><h2>Фара BOSCH 0986</h2><span class="price">4 500 руб</span></li>
+  <li class="product"><h2>Фара SAT 0986</h2><span class="price">3 200 руб</span></li>
+  <li class="product"><h2>Фара BOSCH 0986</h2><span class="price">999 руб</span>Нет в наличии</li>
+</ul>
+</body></html>
+"""
+
+
+class TestAutoTradeHtml:
+    def test_prices_only_from_article_rows(self):
+        data = parse_autotrade_html(AUTOTRADE_HTML)
+        assert data['no_results'] is False
+        assert sorted(data['prices']) == [935.0, 1020.0]
+        assert data['brand'] == 'SAT'
+
+    def test_items_summary(self):
+        item = parse_autotrade_html(AUTOTRADE_HTML)['items'][0]
+        assert item['article'] == 'ST-FDR8-087-1'
+        assert item['price'] == 935.0
+        assert item['stock'] == 15
+
+    def test_offers_per_row(self):
+        data = parse_autotrade_html(AUTOTRADE_HTML)
+        assert [(o['brand'], o['price'], o['stock']) for o in data['offers']] == [('SAT', 935.0, 11), ('SAT', 1020.0, 4)]
+
+    def test_no_results(self):
+        data = parse_autotrade_html("<html><body>По вашему запросу ничего не найдено</body></html>")
+        assert data['no_results'] is True
+        assert data['prices'] == []
+
+    def test_unexpected_page_is_not_no_results(self):
+        # Ни строк результатов, ни сообщения: fetch уходит на обычный поиск, а не в негативный кэш
+        data = parse_autotrade_html("<html><body><div id='app'></div></body></html>")
+        assert data['no_results'] is False
+        assert data['has_results'] is False
+
+    def test_brand_filter(self):
+        html = AUTOTRADE_HTML.replace(
+            "</table>", "<tr><td>Артикул: 087-1, Бренд: DEPO, Страна: ТАЙВАНЬ</td><td>700 RUB</td><td>2</td></tr></table>"
+        )
+        data = parse_autotrade_html(html, brand_filter='depo')
+        assert data['prices'] == [700.0]
+        assert data['brand'] == 'DEPO'
+        assert data['items'][0]['stock'] == 2
+        assert len(data['offers']) == 3
+        assert sorted(parse_autotrade_html(html)['prices']) == [700.0, 935.0, 1020.0]
+
+
+class TestAutoVidHtml:
+    def test_skips_out_of_stock(self):
+        data = parse_autovid_html(AUTOVID_HTML)
+        assert sorted(data['prices']) == [3200.0, 4500.0]
+        assert data['total'] == 3
+        assert data['filtered'] == 2
+
+    def test_brand_filter(self):
+        data = parse_autovid_html(AUTOVID_HTML, brand_filter='bosch')
+        assert data['prices'] == [4500.0]
+        assert data['brand'] == 'bosch'
+
+    def test_offers_ignore_brand_filter(self):
+        data = parse_autovid_html(AUTOVID_HTML, brand_filter='bosch')
+        assert [o['price'] for o in data['offers']] == [4500.0, 3200.0]
+        assert 'SAT' in data['offers'][1]['title']
+
+    def test_nothing_found(self):
+        data = parse_autovid_html("<html><body>Ничего не найдено</body></html>")
+        assert data['prices'] == []
+        assert data['no_results'] is True
+
+    def test_no_cards_is_not_no_results(self):
+        data = parse_autovid_html("<html><body><div class='product-page'>Фара</div></body></html>")
+        assert data['no_results'] is False
+        assert data['offers'] == []
+
+    def test_logged_in_marker(self):
+        guest = '<a href="https://auto-vid.com/my-account/">Войти</a>'
+        assert not autovid_is_logged_in(guest)
+        assert autovid_is_logged_in(guest + '<a href="https://auto-vid.com/my-account/customer-logout/?_wpnonce=1">Выйти</a>')
+
+
+class TestTrastText:
+    def test_blocks_by_manufacturer(self):
+        html = (
+            "<div><p>Производитель: TYC</p><p>2 500 ₽</p></div>"
+            "<div><p>Производитель: DEPO</p><p>1 800 ₽</p></div>"
+        )
+        data = parse_trast_text(html_to_text(html), 'TYC', trast_matches_brand_filter)
+        assert data['prices'] == [2500.0]
+        assert data['brand'] == 'TYC'
+        assert data['total'] == 2
+        assert data['filtered'] == 1
+        assert [(o['brand'], o['price']) for o in data['offers']] == [('TYC', 2500.0), ('DEPO', 1800.0)]
+
+    def test_no_results_message(self):
+        assert trast_has_no_results(html_to_text("<p>Товаров, соответствующих вашему запросу, не обнаружено.</p>"))
+        assert not trast_has_no_results(html_to_text("<div id='content'></div>"))
+
+    def test_challenge_detection(self):
+        assert is_trast_challenge('<script>jsch._jsChallenge()</script>')
+        assert not is_trast_challenge('<div>Производитель: TYC</div>')
+
+
+
+class TestBrandLists:
+    def test_zzap_modal_rows_first_column_deduped(self):
+        rows = ["TYC\t1920QK\tФара", "SAT\t1920QK\tФара", "tyc\t1920-QK\t", "  \t"]
+        assert parse_zzap_modal_rows(rows) == ["TYC", "SAT"]
+
+    def test_stparts_links_for_same_partnumber(self):
+        hrefs = [
+            "https://stparts.ru/search/TYC/1920QK",
+            "/search/Hans-Pries/1920QK?disableFiltering",
+            "/search/SAT/ST1920",
+            "/search/TYC/1920QK",
+        ]
+        assert parse_stparts_brand_links(hrefs, "1920-QK") == ["TYC", "Hans Pries"]
+
+    def test_stparts_links_without_partnumber(self):
+        assert parse_stparts_brand_links(["/search/Mobis/87610%20C1000"]) == ["Mobis"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
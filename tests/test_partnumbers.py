@@ -0,0 +1,54 @@
+"""Unit-тесты для нормализации артикулов."""
+import sqlite3
+
+import pytest
+
+from partnumbers import ensure_partnumber_norm, normalize_brand_key, normalize_partnumber
+
+
+class TestNormalizePartnumber:
+    def test_spelling_variants(self):
+        variants = ["1920 QK", "1920-qk", "1920QK", " 1920.qk ", "1920\xa0QK", "1920–QK"]
+        assert {normalize_partnumber(v) for v in variants} == {"1920QK"}
+
+    def test_cyrillic_lookalikes(self):
+        # "КО" и "Р" набраны кириллицей
+        assert normalize_partnumber("1920КО-Р") == "1920KOP"
+
+    def test_other_characters_kept(self):
+        assert normalize_partnumber("A/B_12") == "A/B_12"
+
+    def test_empty(self):
+        assert normalize_partnumber(None) == ""
+        assert normalize_partnumber("  ") == ""
+
+
+class TestNormalizeBrandKey:
+    def test_case_and_spaces(self):
+        assert normalize_brand_key(" tyc ") == normalize_brand_key("TYC") == "TYC"
+
+    def test_cyrillic_case(self):
+        # UPPER() SQLite здесь не помог бы: он меняет регистр только у ASCII
+        assert normalize_brand_key("Лада") == normalize_brand_key("ЛАДА") == "ЛАДА"
+
+    def test_empty(self):
+        assert normalize_brand_key(None) == normalize_brand_key("  ") == ""
+
+
+class TestEnsurePartnumberNorm:
+    def test_adds_column_and_backfills(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            "CREATE TABLE tasks (id INTEGER PRIMARY KEY, partnumber TEXT, search_brand TEXT, "
+            "brand TEXT, status TEXT, created_at TIMESTAMP)"
+        )
+        conn.execute("INSERT INTO tasks (partnumber) VALUES ('1920-qk')")
+        ensure_partnumber_norm(conn, "tasks")
+        ensure_partnumber_norm(conn, "tasks")  # повторный вызов не падает
+        assert conn.execute("SELECT partnumber_norm FROM tasks").fetchone()[0] == "1920QK"
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(tasks)")]
+        assert "idx_tasks_partnumber_norm" in indexes
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
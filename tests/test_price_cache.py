@@ -0,0 +1,446 @@
+"""Unit-тесты для двухуровневого кэша цен (LRU + price_cache)."""
+import sqlite3
+
+import pytest
+
+from db_writer import DbWriter
+from migrate import migrate
+from offline_parsers import parse_autotrade_rows, parse_autovid_products, parse_trast_text
+from partnumbers import normalize_partnumber
+from price_cache import PriceCache, RefreshQueue, cached_search_result, decode_offers, encode_offers
+
+
+def legacy_db(path):
+    """price_cache ранней версии: без status, offers; partnumber_norm не заполнен."""
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        """
+        CREATE TABLE price_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,
+            brand TEXT,
+            source TEXT NOT NULL,
+            price REAL,
+            url TEXT,
+            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    return conn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "cache.db"
+    conn = legacy_db(path)
+    migrate(conn)
+    conn.close()
+    return path
+
+
+def insert_row(db_path, partnumber, brand, source, price, age_minutes=0):
+    conn = sqlite3.connect(str(db_path))
+    conn.execute(
+        "INSERT INTO price_cache (partnumber, partnumber_norm, brand, source, price, url, cached_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, datetime('now', ?))",
+        (partnumber, normalize_partnumber(partnumber), brand, source, price,
+         f"https://{source}/{partnumber}", f"-{age_minutes} minutes"),
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestGetMany:
+    def test_all_sources_in_one_result(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000)
+        insert_row(db_path, "ABC", None, "trast", 1200)
+        cache = PriceCache(db_path)
+        result = cache.get_many("ABC")
+        assert result["zzap"]["price"] == 1000
+        assert result["trast"]["price"] == 1200
+        assert result["stparts"] is None
+        cache.close()
+
+    def test_latest_row_wins(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 900, age_minutes=10)
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=1)
+        cache = PriceCache(db_path)
+        assert cache.get_many("ABC")["zzap"]["price"] == 1000
+        cache.close()
+
+    def test_expired_rows_ignored(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=31)
+        cache = PriceCache(db_path, ttl_sec=30 * 60)
+        assert cache.get_many("ABC")["zzap"] is None
+        cache.close()
+
+    def test_brand_filter(self, db_path):
+        insert_row(db_path, "ABC", "TYC", "autotrade", 1000)
+        cache = PriceCache(db_path)
+        assert cache.get_many("ABC", "DEPO")["autotrade"] is None
+        assert cache.get_many("ABC", "TYC")["autotrade"]["price"] == 1000
+        assert cache.get_many("ABC")["autotrade"]["price"] == 1000
+        cache.close()
+
+    def test_brand_scoped_row_only_for_same_brand(self, db_path):
+        insert_row(db_path, "ABC", "TYC", "zzap", 1000)
+        cache = PriceCache(db_path)
+        assert cache.get_many("ABC", "TYC")["zzap"]["price"] == 1000
+        assert cache.get_many("ABC")["zzap"] is None
+        assert cache.get_many("ABC", "DEPO")["zzap"] is None
+        cache.close()
+
+
+class TestMemoryTier:
+    def test_repeat_lookup_served_from_memory(self, db_path):
+        cache = PriceCache(db_path)
+        cache.put("ABC", None, "zzap", 1000, "url")
+        # Удаляем строку с диска: ответ должен прийти из памяти
+        cache.conn.execute("DELETE FROM price_cache")
+        cache.conn.commit()
+        assert cache.get_many("ABC")["zzap"]["price"] == 1000
+        cache.close()
+
+    def test_put_writes_through(self, db_path):
+        cache = PriceCache(db_path)
+        cache.put("ABC", "TYC", "trast", 1500, "url")
+        cache.close()
+
+        fresh = PriceCache(db_path)
+        assert fresh.get_many("ABC", "TYC")["trast"]["price"] == 1500
+        fresh.close()
+
+    def test_lru_evicts_oldest(self, db_path):
+        cache = PriceCache(db_path, max_entries=2)
+        cache.put("A", None, "zzap", 100, None)
+        cache.put("B", None, "zzap", 200, None)
+        cache.put("C", None, "zzap", 300, None)
+        assert ("p", "A", "zzap", None) not in cache._memory
+        assert ("p", "C", "zzap", None) in cache._memory
+        cache.close()
+
+
+OFFERS = [
+    {'brand': 'TYC', 'price': 1000, 'stock': '5', 'title': None},
+    {'brand': 'TYC', 'price': 1400, 'stock': '2', 'title': None},
+    {'brand': 'DEPO', 'price': 2500, 'stock': None, 'title': None},
+]
+
+
+class TestPartnumberNorm:
+    def test_spelling_variants_share_entry(self, db_path):
+        cache = PriceCache(db_path)
+        cache.put("1920 QK", None, "zzap", 1000, None)
+        cache._memory.clear()
+        assert cache.get_many("1920-qk")["zzap"]["price"] == 1000
+        cache.close()
+
+    def test_legacy_rows_backfilled_by_migration(self, tmp_path):
+        db_path = tmp_path / "legacy.db"
+        conn = legacy_db(db_path)
+        conn.execute("INSERT INTO price_cache (partnumber, source, price) VALUES ('1920.qk', 'zzap', 900)")
+        conn.commit()
+        migrate(conn)
+        conn.close()
+        cache = PriceCache(db_path)
+        assert cache.get_many("1920QK")["zzap"]["price"] == 900
+        cache.close()
+
+
+class TestOfferSet:
+    def test_encode_roundtrip(self):
+        data = encode_offers(OFFERS)
+        assert data.startswith('[["TYC",1000,"5",null]')
+        assert decode_offers(data) == OFFERS
+
+    def test_any_brand_answered_from_one_search(self, db_path):
+        cache = PriceCache(db_path)
+        cache.store_result("ABC", "TYC", "autotrade", {'status': 'DONE', 'prices': {'min': 1000, 'avg': 1200}, 'offers': OFFERS})
+        cache._memory.clear()
+        depo = cache.get_many("ABC", "DEPO")["autotrade"]
+        assert depo["price"] == 2500
+        assert depo["brand"] == "DEPO"
+        tyc = cache.get_many("ABC", "tyc")["autotrade"]
+        assert tyc["price"] == 1000
+        assert cached_search_result(tyc)["prices"] == {'min': 1000, 'avg': 1200}
+        assert cache.get_many("ABC")["autotrade"]["avg"] == 1633.33
+        cache.close()
+
+    @pytest.mark.parametrize("source", ["zzap", "stparts", "trast"])
+    def test_brand_narrowed_page_not_shared(self, db_path, source):
+        cache = PriceCache(db_path)
+        # Страница сужена до TYC: DEPO на ней - аналог, а не ответ на поиск DEPO или без бренда
+        cache.store_result("ABC", "TYC", source, {'status': 'DONE', 'prices': {'min': 1000, 'avg': 1200}, 'offers': OFFERS})
+        for clear in (False, True):
+            if clear:
+                cache._memory.clear()
+            assert cache.get_many("ABC", "TYC")[source]["price"] == 1000
+            assert cache.get_many("ABC", "DEPO")[source] is None
+            assert cache.get_many("ABC")[source] is None
+        cache.close()
+
+    def test_alternating_brands_keep_own_entries(self, db_path):
+        cache = PriceCache(db_path)
+        cache.put_offers("ABC", "TYC", "zzap", [{'brand': 'TYC', 'price': 1000}], None)
+        cache.put_offers("ABC", "DEPO", "zzap", [{'brand': 'DEPO', 'price': 2500}], None)
+        assert cache.compact()['superseded'] == 0
+        cache._memory.clear()
+        assert cache.get_many("ABC", "TYC")["zzap"]["price"] == 1000
+        assert cache.get_many("ABC", "DEPO")["zzap"]["price"] == 2500
+        cache.close()
+
+    def test_unknown_brand_is_miss(self, db_path):
+        cache = PriceCache(db_path)
+        cache.put_offers("ABC", None, "autotrade", OFFERS, None)
+        assert cache.get_many("ABC", "SIGNEDA")["autotrade"] is None
+        cache.close()
+
+    def test_negative_for_brand_after_offers(self, db_path):
+        cache = PriceCache(db_path)
+        cache.store_result("ABC", "SIGNEDA", "autovid", {'status': 'not_found', 'prices': None, 'offers': OFFERS})
+        cache._memory.clear()
+        assert cache.get_many("ABC", "SIGNEDA")["autovid"]["status"] == "not_found"
+        assert cache.get_many("ABC", "DEPO")["autovid"]["price"] == 2500
+        cache.close()
+
+
+def cache_hit(db_path, source, search_brand, offers):
+    """Ответ кэша на поиск search_brand после записи полного списка предложений страницы."""
+    cache = PriceCache(db_path)
+    cache.store_result("ABC", search_brand, source, {'status': 'DONE', 'prices': {'min': 1, 'avg': 1}, 'offers': offers})
+    cache._memory.clear()
+    entry = cache.get_many("ABC", search_brand)[source]
+    cache.close()
+    return entry
+
+
+class TestBrandFilterLikeLive:
+    """Попадание в кэш с фильтром бренда - те же цены, что оставляет live-парсер источника."""
+
+    def test_zzap_supplier_title_ignored(self, db_path):
+        # Live: бренд строки содержит фильтр; строка без бренда пропускается; title - поставщик
+        offers = [
+            {'brand': 'TYC', 'price': 1000, 'stock': None, 'title': 'Автодок'},
+            {'brand': 'DEPO', 'price': 800, 'stock': None, 'title': 'TYC Store'},
+            {'brand': None, 'price': 700, 'stock': None, 'title': 'TYC Store'},
+        ]
+        assert cache_hit(db_path, "zzap", "TYC", offers)["price"] == 1000
+
+    def test_stparts_brandless_row_kept(self, db_path):
+        # Live: "if brand_filter and row_brand" - строка без бренда остаётся
+        offers = [
+            {'brand': 'TYC', 'price': 1000, 'stock': None, 'title': None},
+            {'brand': None, 'price': 900, 'stock': None, 'title': None},
+            {'brand': 'DEPO', 'price': 800, 'stock': None, 'title': None},
+        ]
+        assert cache_hit(db_path, "stparts", "TYC", offers)["price"] == 900
+
+    def test_trast_same_as_parser(self, db_path):
+        text = "Производитель: PEUGEOT-CITROEN\n2 500 ₽\nПроизводитель: DEPO\n1 800 ₽\n"
+        live = parse_trast_text(text, brand_filter="peugeot")
+        assert cache_hit(db_path, "trast", "peugeot", parse_trast_text(text)['offers'])["price"] == min(live['prices'])
+
+    def test_autotrade_same_as_parser(self, db_path):
+        rows = [
+            "Артикул: 1920QK, Бренд: TYC | 1 000 RUB | 5 |",
+            "Артикул: 1920QK, Бренд: DEPO | 800 RUB | 2 |",
+        ]
+        live = parse_autotrade_rows(rows, "\n".join(rows), brand_filter="depo")
+        offers = parse_autotrade_rows(rows, "\n".join(rows))['offers']
+        assert cache_hit(db_path, "autotrade", "depo", offers)["price"] == min(live['prices']) == 800
+
+    def test_autovid_same_as_parser(self, db_path):
+        products = [
+            {'text': 'Фара DEPO 1920QK', 'price_text': '2 500 руб'},
+            {'text': 'Фара TYC 1920QK', 'price_text': '1 800 руб'},
+        ]
+        live = parse_autovid_products(products, brand_filter="depo")
+        offers = parse_autovid_products(products)['offers']
+        assert cache_hit(db_path, "autovid", "depo", offers)["price"] == min(live['prices']) == 2500
+
+
+class TestNegativeCache:
+    def test_not_found_is_cached(self, db_path):
+        cache = PriceCache(db_path)
+        cache.store_result("ABC", None, "trast", {'status': 'not_found', 'prices': {'min': None, 'avg': None}})
+        cache._memory.clear()
+        entry = cache.get_many("ABC")["trast"]
+        assert entry["status"] == "not_found"
+        assert entry["price"] is None
+        cache.close()
+
+    def test_errors_and_timeouts_not_cached(self, db_path):
+        cache = PriceCache(db_path)
+        cache.store_result("ABC", None, "zzap", {'status': 'ERROR', 'prices': None})
+        cache.store_result("ABC", None, "stparts", {'status': 'timeout', 'prices': None})
+        count = cache.conn.execute("SELECT COUNT(*) FROM price_cache").fetchone()[0]
+        assert count == 0
+        cache.close()
+
+    def test_negative_ttl_is_shorter(self, db_path):
+        cache = PriceCache(db_path, ttl_sec=30 * 60, negative_ttl_sec=10 * 60)
+        cache.conn.execute(
+            "INSERT INTO price_cache (partnumber, partnumber_norm, brand, source, price, status, cached_at) "
+            "VALUES ('ABC', 'ABC', NULL, 'autotrade', NULL, 'NO_RESULTS', datetime('now', '-15 minutes'))"
+        )
+        cache.conn.commit()
+        assert cache.get_many("ABC")["autotrade"] is None
+        cache.close()
+
+    def test_negative_for_brand_does_not_hide_unfiltered_search(self, db_path):
+        cache = PriceCache(db_path)
+        cache.store_result("ABC", "TYC", "trast", {'status': 'not_found', 'prices': None})
+        cache._memory.clear()
+        assert cache.get_many("ABC")["trast"] is None
+        assert cache.get_many("ABC", "TYC")["trast"]["status"] == "not_found"
+        cache.close()
+
+
+class TestStaleWhileRevalidate:
+    def test_stale_entry_returned_and_queued(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=40)
+        cache = PriceCache(db_path, ttl_sec=30 * 60, stale_sec=60 * 60)
+        entry = cache.get_many("ABC")["zzap"]
+        assert entry["price"] == 1000
+        assert entry["stale"] is True
+        assert cached_search_result(entry)["stale"] is True
+        assert cache.refresh_queue.pop() == ("ABC", None, "zzap")
+        cache.close()
+
+    def test_refresh_queued_once(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=40)
+        cache = PriceCache(db_path, ttl_sec=30 * 60, stale_sec=60 * 60)
+        cache.get_many("ABC")
+        cache.get_many("ABC")
+        assert len(cache.refresh_queue) == 1
+        cache.close()
+
+    def test_beyond_stale_window_is_miss(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=100)
+        cache = PriceCache(db_path, ttl_sec=30 * 60, stale_sec=60 * 60)
+        assert cache.get_many("ABC")["zzap"] is None
+        assert len(cache.refresh_queue) == 0
+        cache.close()
+
+    def test_put_clears_pending_refresh(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=40)
+        cache = PriceCache(db_path, ttl_sec=30 * 60, stale_sec=60 * 60)
+        cache.get_many("ABC")
+        cache.put("ABC", None, "zzap", 1100, None)
+        assert len(cache.refresh_queue) == 0
+        assert cache.get_many("ABC")["zzap"]["stale"] is False
+        cache.close()
+
+
+class TestSourceTtl:
+    def test_source_ttl_overrides_default(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=40)
+        insert_row(db_path, "ABC", None, "trast", 1200, age_minutes=40)
+        cache = PriceCache(db_path, ttl_sec=30 * 60, source_ttl_sec={'zzap': 60 * 60})
+        result = cache.get_many("ABC")
+        assert result["zzap"]["price"] == 1000
+        assert result["trast"] is None
+        cache.close()
+
+
+class TestCompact:
+    def count_rows(self, cache):
+        return cache.conn.execute("SELECT COUNT(*) FROM price_cache").fetchone()[0]
+
+    def test_removes_expired_and_superseded(self, db_path):
+        insert_row(db_path, "ABC", None, "zzap", 900, age_minutes=50)
+        insert_row(db_path, "ABC", None, "zzap", 950, age_minutes=5)
+        insert_row(db_path, "ABC", None, "zzap", 1000, age_minutes=1)
+        insert_row(db_path, "XYZ", None, "trast", 500, age_minutes=5)
+        cache = PriceCache(db_path, ttl_sec=30 * 60)
+        stats = cache.compact()
+        assert stats['expired'] == 1
+        assert stats['superseded'] == 1
+        assert self.count_rows(cache) == 2
+        cache._memory.clear()
+        assert cache.get_many("ABC")["zzap"]["price"] == 1000
+        cache.close()
+
+    def test_negative_kept_per_brand(self, db_path):
+        cache = PriceCache(db_path)
+        cache.put("ABC", "TYC", "trast", None, None, status="not_found")
+        cache.put("ABC", "DEPO", "trast", None, None, status="not_found")
+        cache.put_offers("ABC", None, "trast", [{'brand': 'SAT', 'price': 700}], None)
+        assert cache.compact()['superseded'] == 0
+        assert self.count_rows(cache) == 3
+        cache.close()
+
+    def test_size_cap_keeps_newest(self, db_path):
+        cache = PriceCache(db_path)
+        for i, partnumber in enumerate(["A", "B", "C", "D"]):
+            cache.put(partnumber, None, "zzap", 100 + i, None)
+        assert cache.compact(max_rows=2)['capped'] == 2
+        partnumbers = [r[0] for r in cache.conn.execute("SELECT partnumber FROM price_cache ORDER BY id")]
+        assert partnumbers == ["C", "D"]
+        cache.close()
+
+    def test_vacuum_in_writer_transaction(self, db_path):
+        cache = PriceCache(db_path)
+        for i in range(200):
+            cache.put(f"P{i}", None, "zzap", 100 + i, "https://zzap/" + "x" * 1000)
+        writer = DbWriter(db_path)
+        try:
+            stats = writer.submit(cache.compact, 10).result(timeout=5)
+        finally:
+            writer.close()
+        assert stats['capped'] == 190
+        assert stats['vacuumed_pages'] > 0
+        assert cache.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert self.count_rows(cache) == 10
+        cache.close()
+
+    def test_no_full_vacuum_outside_migration(self, db_path):
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.execute("VACUUM")
+        conn.close()
+        cache = PriceCache(db_path)
+        assert cache.compact()['vacuumed_pages'] == 0
+        assert cache.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+        cache.close()
+
+
+class TestWriter:
+    def test_writes_through_writer_queue(self, db_path):
+        writer = DbWriter(db_path)
+        cache = PriceCache(db_path, writer=writer)
+        cache.put("ABC", "TYC", "zzap", 1000.0, "u1")
+        assert cache.get_many("ABC", "TYC")["zzap"]["price"] == 1000.0  # из памяти до коммита
+        writer.flush(timeout=5)
+        cache._memory.clear()
+        assert cache.get_many("ABC", "TYC")["zzap"]["price"] == 1000.0
+        writer.close()
+        cache.close()
+
+    def test_row_ids_keep_write_order(self, db_path):
+        insert_row(db_path, "ABC", "TYC", "trast", 900.0)
+        writer = DbWriter(db_path)
+        cache = PriceCache(db_path, writer=writer)
+        cache.store_result("ABC", "TYC", "trast", {'status': 'not_found', 'prices': None})
+        writer.flush(timeout=5)
+        cache._memory.clear()
+        # Негативная запись новее позитивной (id выданы кэшем по порядку записи)
+        assert cache.get_many("ABC", "TYC")["trast"]["status"] == "not_found"
+        writer.close()
+        cache.close()
+
+
+class TestRefreshQueue:
+    def test_fifo_without_duplicates(self):
+        queue = RefreshQueue()
+        assert queue.add(("A", None, "zzap")) is True
+        assert queue.add(("B", None, "zzap")) is True
+        assert queue.add(("A", None, "zzap")) is False
+        assert queue.pop() == ("A", None, "zzap")
+        assert queue.pop() == ("B", None, "zzap")
+        assert queue.pop() is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
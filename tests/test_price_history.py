@@ -0,0 +1,213 @@
+"""Unit-тесты для истории цен (одна точка на цену за день, агрегаты, срок хранения)."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from price_history import (
+    ensure_recorded_day,
+    ensure_rollups,
+    history_rows,
+    load_rollups,
+    load_rollups_sql,
+    prune_price_history,
+    save_price_history,
+    summarize_rollups,
+)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        """
+        CREATE TABLE price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            partnumber TEXT NOT NULL,
+            partnumber_norm TEXT,
+            brand TEXT,
+            source TEXT NOT NULL,
+            price REAL NOT NULL,
+            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    yield conn
+    conn.close()
+
+
+def count_rows(conn, table="price_history"):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def ensure_price_history_schema(conn):
+    """Миграции 4 и 5 (migrate.py)."""
+    ensure_recorded_day(conn)
+    ensure_rollups(conn)
+
+
+def days_ago(days):
+    return (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def insert_points(conn, points):
+    """points: [(source, price, recorded_at)] артикула 1920QK."""
+    conn.executemany(
+        "INSERT INTO price_history (partnumber, partnumber_norm, brand, source, price, recorded_at) "
+        "VALUES ('1920QK', '1920QK', 'TYC', ?, ?, ?)",
+        points,
+    )
+
+
+class TestEnsureRecordedDay:
+    def test_backfills_and_removes_old_duplicates(self, conn):
+        rows = [
+            ("1920QK", "1920QK", "TYC", "zzap", 1000.0, "2026-01-10 08:00:00"),
+            ("1920QK", "1920QK", "TYC", "zzap", 1000.0, "2026-01-10 18:00:00"),
+            ("1920QK", "1920QK", "TYC", "zzap", 1000.0, "2026-01-11 08:00:00"),
+        ]
+        conn.executemany(
+            "INSERT INTO price_history (partnumber, partnumber_norm, brand, source, price, recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        ensure_recorded_day(conn)
+        ensure_recorded_day(conn)  # повторный вызов не падает
+        days = [row[0] for row in conn.execute("SELECT recorded_day FROM price_history ORDER BY id")]
+        assert days == ["2026-01-10", "2026-01-11"]
+
+
+class TestSavePriceHistory:
+    def test_all_sources_in_one_call(self, conn):
+        ensure_recorded_day(conn)
+        added = save_price_history(conn, "1920-QK", "TYC", {"zzap": 1000.0, "stparts": 1100.0, "trast": None})
+        assert added == 2
+        assert conn.execute("SELECT DISTINCT partnumber_norm FROM price_history").fetchone()[0] == "1920QK"
+
+    def test_same_price_same_day_ignored(self, conn):
+        ensure_recorded_day(conn)
+        save_price_history(conn, "1920QK", "TYC", {"zzap": 1000.0})
+        assert save_price_history(conn, "1920 qk", "TYC", {"zzap": 1000.0}) == 0
+        assert save_price_history(conn, "1920QK", "TYC", {"zzap": 990.0}) == 1
+        assert count_rows(conn) == 2
+
+    def test_null_brand_deduplicated(self, conn):
+        ensure_recorded_day(conn)
+        save_price_history(conn, "1920QK", None, {"zzap": 1000.0})
+        save_price_history(conn, "1920QK", None, {"zzap": 1000.0})
+        assert count_rows(conn) == 1
+
+    def test_history_rows_skip_missing_prices(self):
+        assert history_rows("ABC", None, {"zzap": None, "autovid": 0, "trast": 500.0}) == [
+            ("ABC", "ABC", None, "trast", 500.0)
+        ]
+
+
+class TestRollups:
+    POINTS = [
+        ("zzap", 1000.0, "2026-01-12 08:00:00"),  # понедельник
+        ("zzap", 900.0, "2026-01-12 12:00:00"),
+        ("zzap", 1200.0, "2026-01-12 18:00:00"),
+        ("zzap", 1100.0, "2026-01-14 09:00:00"),  # среда той же недели
+    ]
+
+    def daily(self, conn):
+        return conn.execute(
+            "SELECT day, min_price, max_price, first_price, last_price, points FROM price_history_daily ORDER BY day"
+        ).fetchall()
+
+    def test_trigger_builds_daily_and_weekly(self, conn):
+        ensure_price_history_schema(conn)
+        insert_points(conn, self.POINTS)
+        assert self.daily(conn) == [
+            ("2026-01-12", 900.0, 1200.0, 1000.0, 1200.0, 3),
+            ("2026-01-14", 1100.0, 1100.0, 1100.0, 1100.0, 1),
+        ]
+        weekly = conn.execute(
+            "SELECT week_start, min_price, max_price, first_price, last_price, points FROM price_history_weekly"
+        ).fetchall()
+        assert weekly == [("2026-01-12", 900.0, 1200.0, 1000.0, 1100.0, 4)]
+
+    def test_out_of_order_point_keeps_first_and_last(self, conn):
+        ensure_price_history_schema(conn)
+        insert_points(conn, [self.POINTS[1], self.POINTS[0]])
+        assert self.daily(conn) == [("2026-01-12", 900.0, 1000.0, 1000.0, 900.0, 2)]
+
+    def test_backfill_from_existing_points(self, conn):
+        insert_points(conn, self.POINTS)
+        ensure_price_history_schema(conn)
+        ensure_price_history_schema(conn)  # повторный вызов не пересчитывает агрегаты
+        assert self.daily(conn)[0] == ("2026-01-12", 900.0, 1200.0, 1000.0, 1200.0, 3)
+        assert count_rows(conn, "price_history_weekly") == 1
+
+    def test_ignored_duplicate_not_counted(self, conn):
+        ensure_price_history_schema(conn)
+        save_price_history(conn, "1920QK", "TYC", {"zzap": 1000.0})
+        save_price_history(conn, "1920QK", "TYC", {"zzap": 1000.0})
+        assert conn.execute("SELECT points FROM price_history_daily").fetchone()[0] == 1
+
+    def test_load_and_summarize(self, conn):
+        ensure_price_history_schema(conn)
+        insert_points(conn, [
+            ("zzap", 1000.0, days_ago(60)),  # вне окна
+            ("zzap", 1100.0, days_ago(3)),
+            ("stparts", 950.0, days_ago(3)),
+            ("zzap", 1050.0, days_ago(0)),
+        ])
+
+        rollups = load_rollups(conn, "1920QK", 30)
+        assert [(r["source"], r["last_price"]) for r in rollups] == [
+            ("zzap", 1050.0),
+            ("zzap", 1100.0),
+            ("stparts", 950.0),
+        ]
+        assert summarize_rollups(rollups) == {
+            "stparts": {"first_price": 950.0, "last_price": 950.0, "min_price": 950.0, "max_price": 950.0, "points": 1},
+            "zzap": {"first_price": 1100.0, "last_price": 1050.0, "min_price": 1050.0, "max_price": 1100.0, "points": 2},
+        }
+        assert len(load_rollups(conn, "1920QK", 30, period="week")) >= 2
+
+    def test_weekly_window_includes_partial_first_week(self, conn):
+        ensure_price_history_schema(conn)
+        # Окно начинается не в понедельник: первая неделя попадает в него частично
+        days = 8 if (datetime.utcnow() - timedelta(days=7)).weekday() == 0 else 7
+        insert_points(conn, [
+            ("zzap", 1000.0, days_ago(days + 7)),  # неделя до окна
+            ("zzap", 1100.0, days_ago(days)),
+        ])
+        first_week = conn.execute("SELECT date(?, '-6 days', 'weekday 1')", (days_ago(days),)).fetchone()[0]
+        rollups = load_rollups(conn, "1920QK", days, period="week")
+        assert rollups[-1]["period"] == first_week
+        assert [r["last_price"] for r in rollups] == [1100.0]
+
+    @pytest.mark.parametrize("period, table", [("day", "price_history_daily"), ("week", "price_history_weekly")])
+    def test_load_rollups_uses_primary_key(self, conn, period, table):
+        ensure_price_history_schema(conn)
+        plan = " | ".join(
+            row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {load_rollups_sql(period)}", ("1920QK", "-30 days"))
+        )
+        assert f"sqlite_autoindex_{table}" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestPrune:
+    def test_prunes_raw_and_daily_keeps_weekly(self, conn):
+        ensure_price_history_schema(conn)
+        insert_points(conn, [
+            ("zzap", 1000.0, days_ago(800)),
+            ("zzap", 1100.0, days_ago(400)),
+            ("zzap", 1200.0, days_ago(0)),
+        ])
+
+        deleted = prune_price_history(conn, raw_days=90, daily_days=0)
+        assert deleted == {"raw": 2, "daily": 0}
+        assert count_rows(conn) == 1
+        assert count_rows(conn, "price_history_daily") == 3  # агрегаты пережили сырые точки
+
+        deleted = prune_price_history(conn, raw_days=0, daily_days=365)
+        assert deleted == {"raw": 0, "daily": 2}
+        assert count_rows(conn, "price_history_weekly") == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,161 @@
+"""Unit-тесты для фабрики подключений SQLite (WAL, pragmas, пул)."""
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+import storage
+from storage import STORES, ConnectionPool, connect, run_db, store_files
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "tasks.db", size=2)
+    yield pool
+    pool.close()
+
+
+class TestConnect:
+    def test_wal_and_pragmas(self, tmp_path):
+        conn = connect(tmp_path / "tasks.db")
+        try:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] < 0  # размер в КБ
+        finally:
+            conn.close()
+
+    def test_reader_not_blocked_by_open_write(self, tmp_path):
+        db_path = tmp_path / "tasks.db"
+        writer = connect(db_path)
+        reader = connect(db_path)
+        try:
+            writer.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, status TEXT)")
+            writer.execute("INSERT INTO tasks (status) VALUES ('DONE')")
+            writer.commit()
+
+            writer.execute("UPDATE tasks SET status = 'RUNNING'")  # транзакция записи открыта
+            assert reader.execute("SELECT status FROM tasks").fetchone()[0] == "DONE"
+            writer.commit()
+            assert reader.execute("SELECT status FROM tasks").fetchone()[0] == "RUNNING"
+        finally:
+            writer.close()
+            reader.close()
+
+
+class TestConnectionPool:
+    def test_close_returns_connection_to_pool(self, pool):
+        conn = pool.acquire()
+        conn.close()
+        assert pool.acquire() is conn
+
+    def test_row_factory_per_acquire(self, pool):
+        conn = pool.acquire()
+        assert conn.row_factory is sqlite3.Row
+        conn.close()
+        assert pool.acquire(row_factory=None).row_factory is None
+
+    def test_uncommitted_changes_rolled_back_on_release(self, pool):
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.commit()
+            conn.execute("INSERT INTO t VALUES (1)")
+        with pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+    def test_double_close_does_not_duplicate(self, pool):
+        conn = pool.acquire()
+        conn.close()
+        conn.close()
+        assert pool.acquire() is conn
+        assert pool.acquire() is not conn
+
+    def test_overflow_connections_closed(self, pool):
+        conns = [pool.acquire() for _ in range(3)]
+        for conn in conns:
+            conn.close()
+        with pytest.raises(sqlite3.ProgrammingError):
+            conns[2].execute("SELECT 1")
+
+    def test_connection_reused_across_threads(self, pool):
+        conn = pool.acquire()
+        conn.close()
+        seen = []
+
+        def worker():
+            with pool.connection() as other:
+                seen.append((other is conn, other.execute("SELECT 1").fetchone()[0]))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert seen == [(True, 1)]
+
+
+    def test_autocommit_reset_on_acquire(self, pool):
+        conn = pool.acquire()
+        conn.isolation_level = None
+        conn.close()
+        assert pool.acquire().isolation_level == ""
+
+
+class TestRunDb:
+    def test_runs_off_event_loop(self, tmp_path):
+        db_path = tmp_path / "tasks.db"
+        loop_thread = threading.get_ident()
+
+        def query(conn, value):
+            return threading.get_ident(), conn.execute("SELECT ?", (value,)).fetchone()[0]
+
+        thread_id, value = asyncio.run(run_db(query, 42, db_path=db_path))
+        assert value == 42
+        assert thread_id != loop_thread
+
+    def test_event_loop_not_blocked(self, tmp_path):
+        db_path = tmp_path / "tasks.db"
+        ticks = []
+
+        def slow_query(conn):
+            threading.Event().wait(0.2)
+            conn.execute("SELECT 1")
+            return len(ticks)  # сколько раз event loop успел отработать за время запроса
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            return await asyncio.gather(run_db(slow_query, db_path=db_path), ticker())
+
+        ticks_during_query, _ = asyncio.run(main())
+        assert ticks_during_query == 5
+
+    def test_exception_propagates(self, tmp_path):
+        def failing(conn):
+            raise LookupError("нет задачи")
+
+        with pytest.raises(LookupError):
+            asyncio.run(run_db(failing, db_path=tmp_path / "tasks.db"))
+
+
+class TestStoreFiles:
+    def test_single_file(self, tmp_path, monkeypatch):
+        for name in ("DB_PATH", "CACHE_DB_PATH", "HISTORY_DB_PATH"):
+            monkeypatch.setattr(storage, name, tmp_path / "tasks.db")
+        assert store_files() == {(tmp_path / "tasks.db").resolve(): tuple(STORES)}
+
+    def test_separate_files(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(storage, "CACHE_DB_PATH", tmp_path / "cache.db")
+        monkeypatch.setattr(storage, "HISTORY_DB_PATH", tmp_path / "tasks.db")
+        monkeypatch.setattr(storage, "DB_PATH", tmp_path / "tasks.db")
+        assert store_files() == {
+            (tmp_path / "tasks.db").resolve(): ('tasks', 'history'),
+            (tmp_path / "cache.db").resolve(): ('cache',),
+        }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+"""Unit-тесты для архива завершённых задач (файлы tasks-YYYY-MM-DD.jsonl.gz)."""
+import gzip
+import sqlite3
+from datetime import date
+
+import pytest
+
+from migrate import migrate
+from task_archive import (
+    delete_tasks,
+    export_tasks,
+    find_archived_tasks,
+    partition_path,
+    read_partition,
+)
+from task_results import save_source_results
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = tmp_path / "tasks.db"
+    conn = sqlite3.connect(str(db_path))
+    migrate(conn)
+    conn.executemany(
+        "INSERT INTO tasks (partnumber, partnumber_norm, status, min_price, created_at) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("1920-qk", "1920QK", "DONE", 1000, "2024-01-10 08:00:00"),
+            ("1920QK", "1920QK", "ERROR", None, "2024-01-10 09:00:00"),
+            ("A1", "A1", "DONE", 500, "2024-01-11 10:00:00"),
+            ("A1", "A1", "RUNNING", None, "2024-01-11 11:00:00"),  # зависшая - не архивируется
+            ("B2", "B2", "DONE", 700, "2999-01-01 00:00:00"),  # свежая
+        ],
+    )
+    save_source_results(conn, [1], {'zzap': {'status': 'success', 'prices': {'min': 1000, 'avg': 1100},
+                                            'elapsed_time': 2.0, 'from_cache': False}})
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def remaining_ids(db_path):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM tasks ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def archive(db_path, archive_dir, limit=100):
+    task_ids = export_tasks(db_path, archive_dir, 30, limit)
+    conn = sqlite3.connect(str(db_path))
+    try:
+        delete_tasks(conn, task_ids)
+        conn.commit()
+    finally:
+        conn.close()
+    return task_ids
+
+
+class TestArchive:
+    def test_old_finished_tasks_moved_by_day(self, db_path, tmp_path):
+        archive_dir = tmp_path / "archive"
+        assert archive(db_path, archive_dir) == [1, 2, 3]
+        assert remaining_ids(db_path) == [4, 5]
+
+        day = read_partition(partition_path(archive_dir, "2024-01-10"))
+        assert [task['id'] for task in day] == [1, 2]
+        assert day[0]['zzap_min_price'] == 1000.0  # формат /api/tasks
+        assert day[0]['sources'][0]['source'] == 'zzap'
+        assert day[0]['sources'][0]['elapsed_ms'] == 2000
+        assert [task['id'] for task in read_partition(partition_path(archive_dir, "2024-01-11"))] == [3]
+
+        conn = sqlite3.connect(str(db_path))
+        assert conn.execute("SELECT COUNT(*) FROM task_source_results").fetchone()[0] == 0
+        conn.close()
+
+    def test_batches_and_reexport_do_not_duplicate(self, db_path, tmp_path):
+        archive_dir = tmp_path / "archive"
+        # Экспорт без удаления (сбой до delete_tasks) - следующий запуск пишет те же задачи
+        assert export_tasks(db_path, archive_dir, 30, 1) == [1]
+        assert archive(db_path, archive_dir, limit=2) == [1, 2]
+        assert archive(db_path, archive_dir, limit=2) == [3]
+        assert archive(db_path, archive_dir) == []
+        assert [task['id'] for task in read_partition(partition_path(archive_dir, "2024-01-10"))] == [1, 2]
+
+    def test_partition_is_gzip_jsonl(self, db_path, tmp_path):
+        archive(db_path, tmp_path)
+        with gzip.open(partition_path(tmp_path, "2024-01-11"), 'rt', encoding='utf-8') as f:
+            assert len(f.read().splitlines()) == 1
+        assert not list(tmp_path.glob(".*.tmp"))
+
+
+class TestFindArchivedTasks:
+    def test_range_and_partnumber(self, db_path, tmp_path):
+        archive(db_path, tmp_path)
+        tasks = find_archived_tasks(tmp_path, date(2024, 1, 1), date(2024, 1, 31))
+        assert [task['id'] for task in tasks] == [3, 2, 1]  # новые первыми
+
+        tasks = find_archived_tasks(tmp_path, date(2024, 1, 1), date(2024, 1, 31), partnumber="1920 qk")
+        assert [task['id'] for task in tasks] == [2, 1]
+        assert find_archived_tasks(tmp_path, date(2024, 1, 11), date(2024, 1, 31), partnumber="1920QK") == []
+
+    def test_limit(self, db_path, tmp_path):
+        archive(db_path, tmp_path)
+        tasks = find_archived_tasks(tmp_path, date(2024, 1, 1), date(2024, 1, 31), limit=2)
+        assert [task['id'] for task in tasks] == [3, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
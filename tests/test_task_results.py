@@ -0,0 +1,126 @@
+"""Unit-тесты для результатов задачи по источникам (task_source_results, tasks_view)."""
+import sqlite3
+
+import pytest
+
+from task_results import (
+    ensure_task_source_results,
+    load_source_stats,
+    save_source_results,
+    source_latency_percentile,
+    source_result_rows,
+)
+
+# tasks до миграции - с колонками <source>_min_price
+LEGACY_TASKS = """
+    CREATE TABLE tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        partnumber TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'PENDING',
+        min_price REAL,
+        zzap_min_price REAL,
+        stparts_min_price REAL,
+        trast_min_price REAL,
+        autovid_min_price REAL,
+        autotrade_min_price REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(LEGACY_TASKS)
+    yield conn
+    conn.close()
+
+
+def result(status='success', price=None, elapsed=1.5, from_cache=False, offers=None):
+    return {
+        'status': status,
+        'prices': {'min': price, 'avg': price} if price else None,
+        'offers': offers,
+        'elapsed_time': elapsed,
+        'from_cache': from_cache,
+        'url': f'https://example/{status}',
+    }
+
+
+class TestMigration:
+    def test_legacy_prices_moved_and_columns_dropped(self, conn):
+        conn.execute(
+            "INSERT INTO tasks (partnumber, status, min_price, zzap_min_price, trast_min_price) "
+            "VALUES ('1920QK', 'DONE', 900, 1000, 900)"
+        )
+        ensure_task_source_results(conn)
+        ensure_task_source_results(conn)  # повторный вызов не падает
+
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+        assert not any(column.endswith('_min_price') for column in columns)
+        rows = conn.execute("SELECT source, min_price FROM task_source_results ORDER BY source").fetchall()
+        assert [tuple(row) for row in rows] == [('trast', 900.0), ('zzap', 1000.0)]
+
+    def test_view_keeps_task_response_shape(self, conn):
+        ensure_task_source_results(conn)
+        conn.execute("INSERT INTO tasks (partnumber, status, min_price) VALUES ('1920QK', 'DONE', 1000)")
+        save_source_results(conn, [1], {'zzap': result(price=1000.0), 'stparts': result('NO_RESULTS')})
+
+        task = dict(conn.execute("SELECT * FROM tasks_view WHERE id = 1").fetchone())
+        assert task['partnumber'] == '1920QK'
+        assert task['zzap_min_price'] == 1000.0
+        assert task['stparts_min_price'] is None
+        assert task['autotrade_min_price'] is None
+
+    def test_view_follows_new_task_columns(self, conn):
+        ensure_task_source_results(conn)
+        conn.execute("ALTER TABLE tasks ADD COLUMN stale_sources TEXT")
+        ensure_task_source_results(conn)
+        assert 'stale_sources' in {row[1] for row in conn.execute("PRAGMA table_info(tasks_view)")}
+
+
+class TestSourceResultRows:
+    def test_rows_for_each_task(self):
+        rows = source_result_rows([1, 2], {
+            'zzap': result('DONE', 1000.0, elapsed=2.345, offers=[1, 2, 3]),
+            'trast': {'status': 'timeout', 'prices': None, 'elapsed_time': 30, 'from_cache': False},
+        })
+        assert rows == [
+            (1, 'zzap', 'DONE', 1000.0, 1000.0, 3, 2345, 0, 'https://example/DONE'),
+            (1, 'trast', 'timeout', None, None, None, 30000, 0, None),
+            (2, 'zzap', 'DONE', 1000.0, 1000.0, 3, 2345, 0, 'https://example/DONE'),
+            (2, 'trast', 'timeout', None, None, None, 30000, 0, None),
+        ]
+
+    def test_resave_replaces(self, conn):
+        ensure_task_source_results(conn)
+        save_source_results(conn, [1], {'zzap': result('timeout')})
+        save_source_results(conn, [1], {'zzap': result(price=990.0)})
+        rows = conn.execute("SELECT status, min_price FROM task_source_results").fetchall()
+        assert [tuple(row) for row in rows] == [('success', 990.0)]
+
+
+class TestSourceStats:
+    def test_cheapest_and_latency(self, conn):
+        ensure_task_source_results(conn)
+        for task_id in range(1, 21):
+            save_source_results(conn, [task_id], {
+                'zzap': result(price=1000.0, elapsed=task_id / 10),
+                'trast': result(price=900.0 if task_id % 4 else 1000.0, elapsed=1.0),
+                'stparts': result(price=1200.0, elapsed=0.0, from_cache=True),
+            })
+
+        assert source_latency_percentile(conn, 'zzap') == 1900
+        assert source_latency_percentile(conn, 'zzap', 0.5) == 1000
+        assert source_latency_percentile(conn, 'stparts') is None  # только из кэша
+        stats = load_source_stats(conn)
+        assert stats['trast']['cheapest'] == 20  # при равенстве с zzap - оба
+        assert stats['zzap']['cheapest'] == 5
+        assert stats['stparts']['cheapest'] == 0
+        assert stats['stparts']['from_cache'] == 20
+        assert stats['zzap']['cheapest_share'] == 0.25
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -10,12 +10,19 @@ CDP клиент для trast.ru - подключается к уже запущ
 import asyncio
 import logging
 import os
-import re
 from typing import Dict, Any, List, Optional
 
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
 from base_browser_client import BaseBrowserClient
 from config import TRAST_LOGIN, TRAST_PASSWORD, COOKIES_BACKUP_DIR
+from offline_parsers import (
+    TRAST_BRAND_MAPPING,
+    trast_matches_brand_filter,
+    parse_trast_text,
+    html_to_text,
+    is_trast_challenge,
+    trast_has_no_results,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +39,9 @@ class TrastCDPClient(BaseBrowserClient):
     SITE_NAME = "trast"
     BASE_URL = "https://trast-zapchast.ru"
 
+    # Ноутбучный экран вместо 1920x1080: дешевле рендеринг, fingerprint остаётся правдоподобным
+    RENDER_PROFILE = {'viewport': {'width': 1366, 'height': 768}}
+
     async def connect(self) -> bool:
         """Подключиться к браузеру со stealth настройками для обхода защиты."""
         try:
@@ -47,15 +57,8 @@ class TrastCDPClient(BaseBrowserClient):
                 '--disable-blink-features=AutomationControlled',  # Hide automation
                 '--no-first-run',
                 '--disable-infobars',
-                '--window-size=1920,1080',
-                '--start-maximized',
             ]
 
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=launch_args
-            )
-
             # Proxy settings
             proxy_config = None
             if TRAST_PROXY:
@@ -63,15 +66,14 @@ class TrastCDPClient(BaseBrowserClient):
                 proxy_config = {"server": TRAST_PROXY}
 
             # Stealth context with realistic fingerprint
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
+            await self._launch_context(
+                launch_args,
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 locale='ru-RU',
                 timezone_id='Europe/Moscow',
                 proxy=proxy_config,
                 java_script_enabled=True,
                 bypass_csp=True,
-                permissions=['geolocation'],
                 color_scheme='light',
                 extra_http_headers={
                     'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -81,9 +83,6 @@ class TrastCDPClient(BaseBrowserClient):
                     'sec-ch-ua-platform': '"Windows"',
                 }
             )
-            # Блокируем изображения, CSS и шрифты для ускорения
-            await self.context.route("**/*.{png,jpg,jpeg,gif,webp,css,woff,woff2}", lambda route: route.abort())
-            logger.info(f"[{self.SITE_NAME}] Создан stealth контекст с блокировкой ресурсов")
 
             # Anti-detection scripts
             await self.context.add_init_script("""
@@ -113,7 +112,7 @@ class TrastCDPClient(BaseBrowserClient):
             await self._load_cookies_from_backup()
 
             # Create page
-            self.page = await self.context.new_page()
+            self.page = self._track_page(await self._new_work_page())
 
             self.is_connected = True
             logger.info(f"[{self.SITE_NAME}] Подключение установлено (stealth режим)")
@@ -335,21 +334,6 @@ class TrastCDPClient(BaseBrowserClient):
             logger.error(f"[trast] Ошибка автологина: {e}")
             return False
 
-    async def keep_alive(self) -> None:
-        """Keep-alive для trast.ru."""
-        try:
-            logger.debug("[trast] Keep-alive: проверка сессии...")
-
-            await self.page.evaluate('''
-                fetch("/", {method: "HEAD", credentials: "include"})
-                    .catch(() => {});
-            ''')
-
-            logger.debug("[trast] Keep-alive OK")
-
-        except Exception as e:
-            logger.warning(f"[trast] Keep-alive ошибка: {e}")
-
     # ========== Методы поиска ==========
 
     async def search_part(self, partnumber: str, brand_filter: str = None) -> Dict[str, Any]:
@@ -362,6 +346,13 @@ class TrastCDPClient(BaseBrowserClient):
         try:
             # Формируем URL поиска (используем ?s= вместо /search/?query=)
             search_url = f"{self.BASE_URL}/?s={partnumber}"
+
+            # Быстрый путь: fetch() в уже открытой странице + offline парсер
+            if self.FETCH_SEARCH:
+                result = await self._search_via_fetch(partnumber, search_url, brand_filter)
+                if result:
+                    return result
+
             await self.page.goto(search_url, wait_until='networkidle', timeout=60000)
             await self.page.wait_for_timeout(3000)
 
@@ -384,6 +375,7 @@ class TrastCDPClient(BaseBrowserClient):
                     'status': 'not_found',
                     'prices': {'min': None, 'avg': None},
                     'brand': brand,
+                    'offers': data['offers'],
                     'url': self.page.url
                 }
 
@@ -395,6 +387,7 @@ class TrastCDPClient(BaseBrowserClient):
                     'avg': round(sum(prices) / len(prices), 2)
                 },
                 'brand': brand,
+                'offers': data['offers'],
                 'url': self.page.url
             }
 
@@ -407,6 +400,50 @@ class TrastCDPClient(BaseBrowserClient):
                 'error': str(e)
             }
 
+    async def _search_via_fetch(self, partnumber: str, search_url: str, brand_filter: str = None) -> Optional[Dict[str, Any]]:
+        """Поиск через fetch() без навигации. None - нужен обычный путь через page.goto."""
+        response = await self.fetch_in_page(search_url)
+        if not response or response['status'] != 200:
+            return None
+
+        html = response['text']
+        if is_trast_challenge(html):
+            logger.info("[trast] fetch вернул JS challenge, переходим на обычный поиск")
+            return None
+
+        plain_text = html_to_text(html)
+        data = parse_trast_text(plain_text, brand_filter=brand_filter)
+        # Ни карточек товаров, ни сообщения "ничего не найдено" - это не ответ
+        # "товара нет" (его закэширует негативный кэш), а повод загрузить страницу
+        if not data['total'] and not trast_has_no_results(plain_text):
+            logger.info("[trast] fetch: нет ни товаров, ни сообщения об их отсутствии, переходим на обычный поиск")
+            return None
+
+        prices = data['prices']
+        logger.info(f"[trast] Поиск (fetch): {partnumber}, найдено {len(prices)} цен")
+
+        if not prices:
+            return {
+                'partnumber': partnumber,
+                'status': 'not_found',
+                'prices': {'min': None, 'avg': None},
+                'brand': data['brand'],
+                'offers': data['offers'],
+                'url': search_url
+            }
+
+        return {
+            'partnumber': partnumber,
+            'status': 'success',
+            'prices': {
+                'min': min(prices),
+                'avg': round(sum(prices) / len(prices), 2)
+            },
+            'brand': data['brand'],
+            'offers': data['offers'],
+            'url': search_url
+        }
+
     async def search_part_with_retry(self, partnumber: str, brand_filter: str = None, max_retries: int = 3) -> Dict[str, Any]:
         """Поиск с повторными попытками."""
         for attempt in range(1, max_retries + 1):
@@ -453,122 +490,39 @@ class TrastCDPClient(BaseBrowserClient):
             return False
 
     # Маппинг брендов: что ищем -> что должно быть в производителе
-    BRAND_MAPPING = {
-        'peugeot': ['peugeot-citroen', 'peugeot', 'citroen', 'psa'],
-        'citroen': ['peugeot-citroen', 'citroen', 'peugeot', 'psa'],
-        'toyota': ['toyota'],
-        'honda': ['honda'],
-        'nissan': ['nissan'],
-        'ford': ['ford'],
-        'vw': ['volkswagen', 'vw', 'vag'],
-        'volkswagen': ['volkswagen', 'vw', 'vag'],
-        'bmw': ['bmw'],
-        'mercedes': ['mercedes', 'mercedes-benz', 'daimler'],
-        'opel': ['opel', 'gm'],
-        'renault': ['renault'],
-        'hyundai': ['hyundai', 'kia', 'mobis'],
-        'kia': ['kia', 'hyundai', 'mobis'],
-    }
+    BRAND_MAPPING = TRAST_BRAND_MAPPING
 
     def _matches_brand_filter(self, manufacturer: str, brand_filter: str) -> bool:
         """Проверить, соответствует ли производитель фильтру по бренду."""
-        if not brand_filter or not manufacturer:
-            return True
-
-        brand_lower = brand_filter.lower().strip()
-        manuf_lower = manufacturer.lower().strip()
-
-        # Получаем список допустимых производителей для этого бренда
-        allowed_manufacturers = self.BRAND_MAPPING.get(brand_lower, [brand_lower])
-
-        # Проверяем, содержит ли производитель любой из допустимых вариантов
-        for allowed in allowed_manufacturers:
-            if allowed in manuf_lower:
-                return True
-
-        return False
+        return trast_matches_brand_filter(manufacturer, brand_filter)
 
     async def _extract_prices_and_brand(self, brand_filter: str = None) -> Dict[str, Any]:
         """Извлечь цены и бренд из результатов поиска."""
         prices = []
         brand = None
-        total_count = 0
-        filtered_count = 0
+        offers = []
 
         try:
             # Ждём появления результатов
             await self.page.wait_for_timeout(2000)
 
-            # Получаем чистый текст страницы
+            # Получаем чистый текст страницы и разбираем общим offline парсером
             plain_text = await self.page.inner_text('body')
+            data = parse_trast_text(plain_text, brand_filter=brand_filter)
+            prices = data['prices']
+            brand = data['brand']
+            offers = data['offers']
 
-            # Разбиваем на блоки товаров по паттерну "Производитель:"
-            # Каждый блок содержит информацию о товаре
-            product_blocks = re.split(r'(?=Производитель:)', plain_text)
-
-            for block in product_blocks:
-                if 'Производитель:' not in block:
-                    continue
-
-                total_count += 1
-
-                # Извлекаем производителя
-                manuf_match = re.search(r'Производитель:\s*([^\n₽]+)', block)
-                if not manuf_match:
-                    continue
-
-                manufacturer = manuf_match.group(1).strip()
-
-                # Если есть фильтр по бренду - проверяем соответствие
-                if brand_filter:
-                    if not self._matches_brand_filter(manufacturer, brand_filter):
-                        logger.debug(f"[trast] Пропускаем производителя '{manufacturer}' (фильтр: {brand_filter})")
-                        continue
-                    logger.debug(f"[trast] Производитель '{manufacturer}' соответствует фильтру '{brand_filter}'")
-
-                filtered_count += 1
-
-                # Сохраняем бренд первого подходящего товара
-                if not brand:
-                    brand = manufacturer
-
-                # Извлекаем цену из этого блока
-                price_match = re.search(r'([\d\s\xa0]{1,15})\s*₽', block)
-                if price_match:
-                    try:
-                        price_str = price_match.group(1).replace(" ", "").replace("\xa0", "").strip()
-                        if price_str:
-                            val = float(price_str)
-                            if 100 < val < 500000:
-                                prices.append(val)
-                                logger.debug(f"[trast] Цена {val}₽ от {manufacturer}")
-                    except ValueError:
-                        pass
-
-            # Если не нашли блоки с производителем, пробуем простой поиск цен
-            if not prices and not brand_filter:
-                all_prices = re.findall(r'([\d\s\xa0]{1,15})\s*₽', plain_text)
-                for price_str in all_prices:
-                    try:
-                        price_str = price_str.replace(" ", "").replace("\xa0", "").strip()
-                        if price_str:
-                            val = float(price_str)
-                            if 100 < val < 500000:
-                                prices.append(val)
-                    except ValueError:
-                        pass
+            if brand_filter:
+                logger.info(f"[trast] Отфильтровано по бренду '{brand_filter}': {data['filtered']}/{data['total']} товаров")
 
         except Exception as e:
             logger.debug(f"[trast] Ошибка извлечения данных: {e}")
 
-        if brand_filter:
-            logger.info(f"[trast] Отфильтровано по бренду '{brand_filter}': {filtered_count}/{total_count} товаров")
-
-        unique_prices = list(set(prices))
-        if unique_prices:
-            logger.info(f"[trast] Найдено {len(unique_prices)} уникальных цен: {sorted(unique_prices)[:5]}...")
+        if prices:
+            logger.info(f"[trast] Найдено {len(prices)} уникальных цен: {sorted(prices)[:5]}...")
 
-        return {'prices': unique_prices, 'brand': brand}
+        return {'prices': prices, 'brand': brand, 'offers': offers}
 
 
 # ========== Тест ==========
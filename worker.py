@@ -26,7 +26,20 @@ from stparts_cdp_client import STPartsCDPClient
 from trast_cdp_client import TrastCDPClient  # Stealth mode с обходом JS-challenge
 from autovid_cdp_client import AutoVidCDPClient  # Auto-VID с WooCommerce
 from autotrade_client import AutoTradeClient  # sklad.autotrade.su
-from config import DB_PATH
+from config import DB_PATH, CACHE_DB_PATH, PRICE_CACHE_TTL_MIN, PRICE_CACHE_COMPACT_INTERVAL_MIN, CACHE_WARM_ENABLED
+from config import TASK_ARCHIVE_DIR, TASK_ARCHIVE_AFTER_DAYS, TASK_ARCHIVE_BATCH
+from price_cache import PriceCache, cached_search_result, describe_cache_entry
+from cache_warmer import CacheWarmer
+from cache_stats import CacheStats, write_cache_stats
+from brand_cache import BrandCache
+from partnumbers import normalize_brand_key, normalize_partnumber
+from indexes import PENDING_TASK_SQL, DUPLICATE_TASKS_SQL
+from price_history import prune_price_history, save_price_history
+from task_results import save_source_results
+from task_archive import delete_tasks, export_tasks
+from migrate import describe_pending, pending_store_migrations
+from storage import get_connection, close_pools, store_files
+from db_writer import store_writers
 
 logging.basicConfig(
     level=logging.INFO,
@@ -37,11 +50,75 @@ logger = logging.getLogger(__name__)
 
 DBPATH = DB_PATH
 
+# Таймаут для каждого сайта (30 секунд, ZZAP - 60 сек)
+SITE_TIMEOUT = 30
+ZZAP_TIMEOUT = 60
+
 def get_db_connection():
-    """Создать подключение к БД"""
-    conn = sqlite3.connect(str(DBPATH))
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Подключение к БД из пула (WAL, busy_timeout; close() возвращает его в пул)"""
+    return get_connection(DBPATH)
+
+def claim_duplicate_tasks(conn, task_id, partnumber, search_brand):
+    """
+    Забрать в работу все PENDING задачи с тем же ключом, что и task_id.
+
+    Один поиск - результат раздаётся всем задачам (fan-out).
+    Запись для tasks_writer: выбор дубликатов и UPDATE - в одной транзакции писателя.
+
+    Returns:
+        Список id задач (первым - task_id)
+    """
+    rows = conn.execute(
+        DUPLICATE_TASKS_SQL,
+        (task_id, normalize_partnumber(partnumber), normalize_brand_key(search_brand))
+    ).fetchall()
+    task_ids = [task_id] + [row[0] for row in rows]
+    placeholders = ", ".join("?" for _ in task_ids)
+    conn.execute(
+        f"UPDATE tasks SET status = 'RUNNING', started_at = CURRENT_TIMESTAMP WHERE id IN ({placeholders})",
+        task_ids
+    )
+    return task_ids
+
+def write_price_history(conn, partnumber, brand, history_prices):
+    """Запись для DbWriter хранилища history: цены задачи по источникам ({source: min_price})."""
+    # После того как определён бренд (если он нашёлся), сохраняем историю цен;
+    # повтор цены за сегодня отсекает UNIQUE-индекс (INSERT OR IGNORE)
+    try:
+        save_price_history(conn, partnumber, brand, history_prices)
+    except Exception as e:
+        logger.error(f"⚠️ Ошибка сохранения истории цен: {e}", exc_info=True)
+
+def write_task_result(conn, task_update, task_ids, source_results):
+    """
+    Запись для DbWriter хранилища tasks: результаты источников и итог задачи в одной транзакции.
+
+    task_update - (sql, params) UPDATE tasks; source_results - {source: результат клиента}.
+    """
+    try:
+        save_source_results(conn, task_ids, source_results)
+    except Exception as e:
+        logger.error(f"⚠️ Ошибка сохранения результатов источников: {e}", exc_info=True)
+    conn.execute(*task_update)
+
+def mark_tasks_failed(conn, task_ids, error_message):
+    """Запись для DbWriter: задачи с ошибкой worker'а."""
+    conn.execute(
+        f"""UPDATE tasks SET
+            status = 'ERROR',
+            error_message = ?,
+            completed_at = CURRENT_TIMESTAMP
+        WHERE id IN ({", ".join("?" for _ in task_ids)})""",
+        (error_message, *task_ids)
+    )
+
+def check_schema():
+    """Схема БД актуальна (все файлы хранилищ)? Worker DDL не выполняет - миграции применяет python migrate.py."""
+    pending = pending_store_migrations()
+    if pending:
+        logger.error(f"❌ {describe_pending(pending)}")
+        return False
+    return True
 
 async def process_tasks():
     """
@@ -49,10 +126,14 @@ async def process_tasks():
     Последовательно запускает ZZAP, STparts и Trast для каждой задачи.
     """
     logger.info("🔥 Worker запущен!")
-    logger.info(f"📁 База данных: {DBPATH}")
+    for path, stores in store_files().items():
+        logger.info(f"📁 База данных: {path} ({', '.join(stores)})")
     logger.info("🌐 Режим: CDP (подключение к Chrome)")
     logger.info("💡 Убедитесь, что Chrome запущен через start_chrome_debug.bat")
 
+    if not check_schema():
+        return
+
     # Подключаемся к Chrome через CDP
     logger.info("🔧 Подключение к Chrome CDP...")
     
@@ -97,19 +178,119 @@ async def process_tasks():
         return
     
     logger.info("✅ Все клиенты готовы к работе!")
-    
+
+    # Все записи worker'а (кэш, бренды, история, итог задачи) - через поток-писатель своего
+    # файла БД: записи, накопленные за DB_WRITER_LINGER_MS, коммитятся одной транзакцией
+    db_writers = store_writers()
+    tasks_writer, cache_writer, history_writer = (db_writers[store] for store in ('tasks', 'cache', 'history'))
+
+    # Кэш цен: LRU в памяти + price_cache, одно подключение на всё время работы
+    price_cache = PriceCache(CACHE_DB_PATH, writer=cache_writer)
+    clients_by_source = {
+        "zzap": zzap_client,
+        "stparts": stparts_client,
+        "trast": trast_client,
+        "autovid": autovid_client,
+        "autotrade": autotrade_client,
+    }
+
+    # Бренды артикулов из результатов поиска - для подсказок /api/brands без живого запроса к ZZAP
+    brand_cache = BrandCache(CACHE_DB_PATH, writer=cache_writer)
+
+    # Счётчики попаданий/промахов кэша, средняя длительность живого поиска - из прошлой статистики
+    cache_stats = CacheStats()
+    stats_conn = get_connection(CACHE_DB_PATH)
+    try:
+        cache_stats.seed(stats_conn)
+    finally:
+        stats_conn.close()
+
+    async def live_search(source, partnumber, search_brand, max_retries=2):
+        """
+        Живой поиск на сайте с записью результата в кэш.
+
+        Worker выполняет одну задачу за раз и ждёт фоновые обновления в простое,
+        поэтому одинаковые живые поиски не пересекаются; дубликаты задач
+        объединяет claim_duplicate_tasks (один поиск на все задачи с ключом).
+        """
+        client = clients_by_source[source]
+        started = time.time()
+        async with client.page_session():
+            result = await client.search_part_with_retry(partnumber, brand_filter=search_brand, max_retries=max_retries)
+        client.note_search_result(result)
+        cache_stats.record_live(source, time.time() - started)
+        price_cache.store_result(partnumber, search_brand, source, result)
+        brand_cache.store_result(partnumber, source, result)
+        return result
+
+    # Прогрев популярных артикулов в простое (с бюджетом поисков на сайт)
+    cache_warmer = CacheWarmer(price_cache, DBPATH) if CACHE_WARM_ENABLED else None
+
+    async def refresh_stale_price(source, partnumber, search_brand, reason="устаревшей цены"):
+        """Фоновое обновление цены в кэше (stale-while-revalidate, прогрев), когда нет задач."""
+        timeout = ZZAP_TIMEOUT if source == "zzap" else SITE_TIMEOUT
+        logger.info(f"🔄 Обновление {reason}: {source} {partnumber} {search_brand or ''}")
+        try:
+            await asyncio.wait_for(live_search(source, partnumber, search_brand, max_retries=1), timeout=timeout)
+        except Exception as e:
+            logger.warning(f"  ⚠️ {source}: обновление кэша не удалось: {e}")
+
+    last_compact = None
+
+    async def compact_price_cache():
+        """Обслуживание price_cache: просроченные/вытесненные строки, лимит размера, vacuum (через писателя)."""
+        started = time.time()
+        try:
+            stats = await cache_writer.write(price_cache.compact)
+        except sqlite3.OperationalError as e:
+            # БД занята API - повторим на следующем интервале
+            logger.warning(f"⚠️ Обслуживание кэша цен отложено: {e}")
+            return
+        logger.info(
+            f"🧹 Кэш цен: удалено просроченных {stats['expired']}, вытесненных {stats['superseded']}, "
+            f"сверх лимита {stats['capped']}, освобождено страниц {stats['vacuumed_pages']} "
+            f"({time.time() - started:.1f} сек)"
+        )
+
+    async def prune_history():
+        """Срок хранения price_history: старые сырые точки и дневные агрегаты (через писателя)."""
+        try:
+            stats = await history_writer.write(prune_price_history)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"⚠️ Очистка истории цен отложена: {e}")
+            return
+        logger.info(f"🧹 История цен: удалено точек {stats['raw']}, дневных агрегатов {stats['daily']}")
+
+    async def archive_tasks():
+        """Архив задач: старые DONE/ERROR - в файлы по дням, затем удаление из tasks (через писателя)."""
+        if not TASK_ARCHIVE_AFTER_DAYS:
+            return
+        started = time.time()
+        try:
+            task_ids = await asyncio.to_thread(
+                export_tasks, DBPATH, TASK_ARCHIVE_DIR, TASK_ARCHIVE_AFTER_DAYS, TASK_ARCHIVE_BATCH
+            )
+            deleted = await tasks_writer.write(delete_tasks, task_ids)
+        except (OSError, sqlite3.OperationalError) as e:
+            # Строки удаляются только после записи файла - повторим на следующем интервале
+            logger.warning(f"⚠️ Архивация задач отложена: {e}")
+            return
+        if task_ids:
+            logger.info(f"📦 Архив задач: перенесено {deleted} в {TASK_ARCHIVE_DIR} ({time.time() - started:.1f} сек)")
+
     try:
 
         while True:
             conn = None
             task_id = None
+            task_ids = []
 
             try:
+                if cache_stats.flush_due():
+                    cache_writer.submit(write_cache_stats, cache_stats.take_pending())
                 conn = get_db_connection()
                 cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT id, partnumber, search_brand FROM tasks WHERE status = 'PENDING' ORDER BY created_at ASC LIMIT 1"
-                )
+                cursor.execute(PENDING_TASK_SQL)
 
                 task = cursor.fetchone()
 
@@ -126,72 +307,37 @@ async def process_tasks():
                         logger.info(f"   🔍 Фильтр по бренду: {search_brand}")
                     logger.info(f"{'='*60}")
 
-                    cursor.execute(
-                        "UPDATE tasks SET status = 'RUNNING', started_at = CURRENT_TIMESTAMP WHERE id = ?",
-                        (task_id,)
-                    )
-                    conn.commit()
+                    task_ids = await tasks_writer.write(claim_duplicate_tasks, task_id, partnumber, search_brand)
+                    if len(task_ids) > 1:
+                        logger.info(f"   🔗 Объединено с дубликатами: {task_ids[1:]} (один поиск на всех)")
+                    task_ids_placeholders = ", ".join("?" for _ in task_ids)
 
-                    # Таймаут для каждого сайта (30 секунд, ZZAP - 60 сек)
-                    SITE_TIMEOUT = 30
-                    ZZAP_TIMEOUT = 60
                     print(f"[TIMING] Таймаут: {SITE_TIMEOUT} сек (ZZAP: {ZZAP_TIMEOUT} сек)")
                     print(f"[TIMING] Режим выполнения: ПАРАЛЛЕЛЬНО (asyncio.gather)")
-                    print(f"[TIMING] Кэширование: ВКЛЮЧЕНО (30 минут)")
+                    print(f"[TIMING] Кэширование: ВКЛЮЧЕНО ({PRICE_CACHE_TTL_MIN} минут, LRU + SQLite)")
+
+                    # Проверяем кэш перед парсингом: все источники одним запросом (или из памяти)
+                    cached = price_cache.get_many(partnumber, search_brand)
+                    cache_stats.record_lookup(cached)
+                    zzap_cache = cached['zzap']
+                    stparts_cache = cached['stparts']
+                    trast_cache = cached['trast']
+                    autovid_cache = cached['autovid']
+                    autotrade_cache = cached['autotrade']
 
-                    # Проверяем кэш перед парсингом (используем одно подключение для чтения)
-                    cache_conn_read = get_db_connection()
-                    cache_cursor_read = cache_conn_read.cursor()
-                    
-                    def check_cache(source_name, cache_key_brand):
-                        """Проверить кэш для источника."""
-                        cache_cursor_read.execute(
-                            """
-                            SELECT price, url FROM price_cache
-                            WHERE partnumber = ? AND (? IS NULL OR brand = ?) AND source = ?
-                            AND datetime(cached_at) > datetime('now', '-30 minutes')
-                            ORDER BY cached_at DESC
-                            LIMIT 1
-                            """,
-                            (partnumber, cache_key_brand, cache_key_brand, source_name)
-                        )
-                        return cache_cursor_read.fetchone()
-                    
-                    # Проверяем кэш для всех источников
-                    zzap_cache = check_cache("zzap", search_brand)
-                    stparts_cache = check_cache("stparts", search_brand)
-                    trast_cache = check_cache("trast", search_brand)
-                    autovid_cache = check_cache("autovid", search_brand)
-                    autotrade_cache = check_cache("autotrade", search_brand)
-                    
-                    cache_conn_read.close()
-                    
                     # Функции для парсинга с проверкой кэша
                     async def parse_zzap():
                         start_time = time.time()
                         if zzap_cache:
                             elapsed = time.time() - start_time
-                            logger.info(f"  ✅ zzap: результат из кэша (цена: {zzap_cache['price']}₽)")
+                            logger.info(f"  ✅ zzap: результат из кэша ({describe_cache_entry(zzap_cache)})")
                             print(f"[TIMING] ZZAP: {elapsed:.1f} сек (ИЗ КЭША)")
-                            return {
-                                'status': 'success',
-                                'prices': {'min': zzap_cache['price'], 'avg': zzap_cache['price']},
-                                'url': zzap_cache['url'],
-                                'from_cache': True,
-                                'elapsed_time': elapsed
-                            }
+                            result = cached_search_result(zzap_cache)
+                            result['elapsed_time'] = elapsed
+                            return result
                         print(f"[TIMING] ZZAP: начало парсинга...")
-                        result = await zzap_client.search_part_with_retry(partnumber, brand_filter=search_brand, max_retries=2)
+                        result = await live_search("zzap", partnumber, search_brand)
                         elapsed = time.time() - start_time
-                        if result.get('prices') and result['prices'].get('min'):
-                            cache_conn = get_db_connection()
-                            cache_cursor = cache_conn.cursor()
-                            cache_cursor.execute(
-                                "INSERT INTO price_cache (partnumber, brand, source, price, url) VALUES (?, ?, ?, ?, ?)",
-                                (partnumber, search_brand, "zzap", result['prices']['min'], result.get('url'))
-                            )
-                            cache_conn.commit()
-                            cache_conn.close()
                         result['elapsed_time'] = elapsed
                         result['from_cache'] = False
                         print(f"[TIMING] ZZAP: {elapsed:.1f} сек (ПАРСИНГ)")
@@ -201,27 +347,14 @@ async def process_tasks():
                         start_time = time.time()
                         if stparts_cache:
                             elapsed = time.time() - start_time
-                            logger.info(f"  ✅ stparts: результат из кэша (цена: {stparts_cache['price']}₽)")
+                            logger.info(f"  ✅ stparts: результат из кэша ({describe_cache_entry(stparts_cache)})")
                             print(f"[TIMING] STparts: {elapsed:.1f} сек (ИЗ КЭША)")
-                            return {
-                                'status': 'success',
-                                'prices': {'min': stparts_cache['price'], 'avg': stparts_cache['price']},
-                                'url': stparts_cache['url'],
-                                'from_cache': True,
-                                'elapsed_time': elapsed
-                            }
+                            result = cached_search_result(stparts_cache)
+                            result['elapsed_time'] = elapsed
+                            return result
                         print(f"[TIMING] STparts: начало парсинга...")
-                        result = await stparts_client.search_part_with_retry(partnumber, brand_filter=search_brand, max_retries=2)
+                        result = await live_search("stparts", partnumber, search_brand)
                         elapsed = time.time() - start_time
-                        if result.get('prices') and result['prices'].get('min'):
-                            cache_conn = get_db_connection()
-                            cache_cursor = cache_conn.cursor()
-                            cache_cursor.execute(
-                                "INSERT INTO price_cache (partnumber, brand, source, price, url) VALUES (?, ?, ?, ?, ?)",
-                                (partnumber, search_brand, "stparts", result['prices']['min'], result.get('url'))
-                            )
-                            cache_conn.commit()
-                            cache_conn.close()
                         result['elapsed_time'] = elapsed
                         result['from_cache'] = False
                         print(f"[TIMING] STparts: {elapsed:.1f} сек (ПАРСИНГ)")
@@ -231,27 +364,14 @@ async def process_tasks():
                         start_time = time.time()
                         if trast_cache:
                             elapsed = time.time() - start_time
-                            logger.info(f"  ✅ trast: результат из кэша (цена: {trast_cache['price']}₽)")
+                            logger.info(f"  ✅ trast: результат из кэша ({describe_cache_entry(trast_cache)})")
                             print(f"[TIMING] Trast: {elapsed:.1f} сек (ИЗ КЭША)")
-                            return {
-                                'status': 'success',
-                                'prices': {'min': trast_cache['price'], 'avg': trast_cache['price']},
-                                'url': trast_cache['url'],
-                                'from_cache': True,
-                                'elapsed_time': elapsed
-                            }
+                            result = cached_search_result(trast_cache)
+                            result['elapsed_time'] = elapsed
+                            return result
                         print(f"[TIMING] Trast: начало парсинга...")
-                        result = await trast_client.search_part_with_retry(partnumber, brand_filter=search_brand, max_retries=2)
+                        result = await live_search("trast", partnumber, search_brand)
                         elapsed = time.time() - start_time
-                        if result.get('prices') and result['prices'].get('min'):
-                            cache_conn = get_db_connection()
-                            cache_cursor = cache_conn.cursor()
-                            cache_cursor.execute(
-                                "INSERT INTO price_cache (partnumber, brand, source, price, url) VALUES (?, ?, ?, ?, ?)",
-                                (partnumber, search_brand, "trast", result['prices']['min'], result.get('url'))
-                            )
-                            cache_conn.commit()
-                            cache_conn.close()
                         result['elapsed_time'] = elapsed
                         result['from_cache'] = False
                         print(f"[TIMING] Trast: {elapsed:.1f} сек (ПАРСИНГ)")
@@ -261,27 +381,14 @@ async def process_tasks():
                         start_time = time.time()
                         if autovid_cache:
                             elapsed = time.time() - start_time
-                            logger.info(f"  ✅ autovid: результат из кэша (цена: {autovid_cache['price']}₽)")
+                            logger.info(f"  ✅ autovid: результат из кэша ({describe_cache_entry(autovid_cache)})")
                             print(f"[TIMING] AutoVID: {elapsed:.1f} сек (ИЗ КЭША)")
-                            return {
-                                'status': 'success',
-                                'prices': {'min': autovid_cache['price'], 'avg': autovid_cache['price']},
-                                'url': autovid_cache['url'],
-                                'from_cache': True,
-                                'elapsed_time': elapsed
-                            }
+                            result = cached_search_result(autovid_cache)
+                            result['elapsed_time'] = elapsed
+                            return result
                         print(f"[TIMING] AutoVID: начало парсинга...")
-                        result = await autovid_client.search_part_with_retry(partnumber, brand_filter=search_brand, max_retries=2)
+                        result = await live_search("autovid", partnumber, search_brand)
                         elapsed = time.time() - start_time
-                        if result.get('prices') and result['prices'].get('min'):
-                            cache_conn = get_db_connection()
-                            cache_cursor = cache_conn.cursor()
-                            cache_cursor.execute(
-                                "INSERT INTO price_cache (partnumber, brand, source, price, url) VALUES (?, ?, ?, ?, ?)",
-                                (partnumber, search_brand, "autovid", result['prices']['min'], result.get('url'))
-                            )
-                            cache_conn.commit()
-                            cache_conn.close()
                         result['elapsed_time'] = elapsed
                         result['from_cache'] = False
                         print(f"[TIMING] AutoVID: {elapsed:.1f} сек (ПАРСИНГ)")
@@ -291,27 +398,14 @@ async def process_tasks():
                         start_time = time.time()
                         if autotrade_cache:
                             elapsed = time.time() - start_time
-                            logger.info(f"  ✅ autotrade: результат из кэша (цена: {autotrade_cache['price']}₽)")
+                            logger.info(f"  ✅ autotrade: результат из кэша ({describe_cache_entry(autotrade_cache)})")
                             print(f"[TIMING] AutoTrade: {elapsed:.1f} сек (ИЗ КЭША)")
-                            return {
-                                'status': 'success',
-                                'prices': {'min': autotrade_cache['price'], 'avg': autotrade_cache['price']},
-                                'url': autotrade_cache['url'],
-                                'from_cache': True,
-                                'elapsed_time': elapsed
-                            }
+                            result = cached_search_result(autotrade_cache)
+                            result['elapsed_time'] = elapsed
+                            return result
                         print(f"[TIMING] AutoTrade: начало парсинга...")
-                        result = await autotrade_client.search_part_with_retry(partnumber, brand_filter=search_brand, max_retries=2)
+                        result = await live_search("autotrade", partnumber, search_brand)
                         elapsed = time.time() - start_time
-                        if result.get('prices') and result['prices'].get('min'):
-                            cache_conn = get_db_connection()
-                            cache_cursor = cache_conn.cursor()
-                            cache_cursor.execute(
-                                "INSERT INTO price_cache (partnumber, brand, source, price, url) VALUES (?, ?, ?, ?, ?)",
-                                (partnumber, search_brand, "autotrade", result['prices']['min'], result.get('url'))
-                            )
-                            cache_conn.commit()
-                            cache_conn.close()
                         result['elapsed_time'] = elapsed
                         result['from_cache'] = False
                         print(f"[TIMING] AutoTrade: {elapsed:.1f} сек (ПАРСИНГ)")
@@ -381,143 +475,53 @@ async def process_tasks():
                     print(f"[TIMING] AutoVID: {autovid_result.get('elapsed_time', 0):.1f} сек {'(КЭШ)' if autovid_result.get('from_cache') else '(ПАРСИНГ)'}")
                     print(f"[TIMING] AutoTrade: {autotrade_result.get('elapsed_time', 0):.1f} сек {'(КЭШ)' if autotrade_result.get('from_cache') else '(ПАРСИНГ)'}")
 
-                    all_prices = []
-                    zzap_min = None
-                    stparts_min = None
-                    trast_min = None
-                    autovid_min = None
-                    autotrade_min = None
+                    # Результаты источников (в порядке приоритета бренда: ZZAP первым)
+                    source_results = dict(zip(
+                        clients_by_source,
+                        (zzap_result, stparts_result, trast_result, autovid_result, autotrade_result)
+                    ))
+                    history_prices = {}
                     brand = None
-
-                    def save_price_history(cur, partnumber_value, brand_value, source, price_value):
-                        """
-                        Сохраняем цену в price_history, если за сегодня по этому источнику
-                        ещё не было записи с такой же ценой.
-                        """
-                        if not price_value:
-                            return
-                        cur.execute(
-                            """
-                            SELECT 1 FROM price_history
-                            WHERE partnumber = ?
-                              AND (? IS NULL OR brand = ?)
-                              AND source = ?
-                              AND price = ?
-                              AND date(recorded_at) = date('now')
-                            LIMIT 1
-                            """,
-                            (partnumber_value, brand_value, brand_value, source, price_value),
-                        )
-                        if cur.fetchone():
-                            return
-
-                        cur.execute(
-                            """
-                            INSERT INTO price_history (partnumber, brand, source, price)
-                            VALUES (?, ?, ?, ?)
-                            """,
-                            (partnumber_value, brand_value, source, price_value),
-                        )
-
-                    if zzap_result.get('status') in ['DONE', 'success'] and zzap_result.get('prices'):
-                        zzap_min = zzap_result['prices'].get('min')
-                        if zzap_min:
-                            all_prices.append(zzap_min)
-                            logger.info(f"  ✅ ZZAP: {zzap_min}₽")
-                        # Получаем бренд из ZZAP
-                        if not brand and zzap_result.get('brand'):
-                            brand = zzap_result['brand']
-                            logger.info(f"  🏷️ Бренд (ZZAP): {brand}")
-                    else:
-                        logger.warning(f"  ⚠️ ZZAP: {zzap_result.get('status', 'error')}")
-
-                    if stparts_result.get('status') == 'success' and stparts_result.get('prices'):
-                        stparts_min = stparts_result['prices'].get('min')
-                        if stparts_min:
-                            all_prices.append(stparts_min)
-                            logger.info(f"  ✅ STparts: {stparts_min}₽")
-                        # Получаем бренд из STparts если не нашли ранее
-                        if not brand and stparts_result.get('brand'):
-                            brand = stparts_result['brand']
-                            logger.info(f"  🏷️ Бренд (STparts): {brand}")
-                    else:
-                        logger.warning(f"  ⚠️ STparts: {stparts_result.get('status', 'error')}")
-
-                    if trast_result.get('status') == 'success' and trast_result.get('prices'):
-                        trast_min = trast_result['prices'].get('min')
-                        if trast_min:
-                            all_prices.append(trast_min)
-                            logger.info(f"  ✅ Trast: {trast_min}₽")
-                        # Получаем бренд из Trast если не нашли ранее
-                        if not brand and trast_result.get('brand'):
-                            brand = trast_result['brand']
-                            logger.info(f"  🏷️ Бренд (Trast): {brand}")
-                    else:
-                        logger.warning(f"  ⚠️ Trast: {trast_result.get('status', 'error')}")
-
-                    if autovid_result.get('status') == 'success' and autovid_result.get('prices'):
-                        autovid_min = autovid_result['prices'].get('min')
-                        if autovid_min:
-                            all_prices.append(autovid_min)
-                            logger.info(f"  ✅ AutoVID: {autovid_min}₽")
-                        # Получаем бренд из AutoVID если не нашли ранее
-                        if not brand and autovid_result.get('brand'):
-                            brand = autovid_result['brand']
-                            logger.info(f"  🏷️ Бренд (AutoVID): {brand}")
-                    else:
-                        logger.warning(f"  ⚠️ AutoVID: {autovid_result.get('status', 'error')}")
-
-                    if autotrade_result.get('status') in ['DONE', 'success'] and autotrade_result.get('prices'):
-                        autotrade_min = autotrade_result['prices'].get('min')
-                        if autotrade_min:
-                            all_prices.append(autotrade_min)
-                            logger.info(f"  ✅ AutoTrade: {autotrade_min}₽")
-                        # Получаем бренд из AutoTrade если не нашли ранее
-                        if not brand and autotrade_result.get('brand'):
-                            brand = autotrade_result['brand']
-                            logger.info(f"  🏷️ Бренд (AutoTrade): {brand}")
-                    else:
-                        logger.warning(f"  ⚠️ AutoTrade: {autotrade_result.get('status', 'error')}")
-
-                    # После того как определён бренд (если он нашёлся), сохраняем историю цен
-                    try:
-                        save_price_history(cursor, partnumber, brand, "zzap", zzap_min)
-                        save_price_history(cursor, partnumber, brand, "stparts", stparts_min)
-                        save_price_history(cursor, partnumber, brand, "trast", trast_min)
-                        save_price_history(cursor, partnumber, brand, "autovid", autovid_min)
-                        save_price_history(cursor, partnumber, brand, "autotrade", autotrade_min)
-                    except Exception as e:
-                        logger.error(f"⚠️ Ошибка сохранения истории цен: {e}", exc_info=True)
+                    for name, (source, source_result) in zip(parser_names, source_results.items()):
+                        history_prices[source] = None
+                        if source_result.get('status') in ['DONE', 'success'] and source_result.get('prices'):
+                            history_prices[source] = source_result['prices'].get('min')
+                            if history_prices[source]:
+                                logger.info(f"  ✅ {name}: {history_prices[source]}₽")
+                            # Бренд - из первого источника, который его вернул
+                            if not brand and source_result.get('brand'):
+                                brand = source_result['brand']
+                                logger.info(f"  🏷️ Бренд ({name}): {brand}")
+                        else:
+                            logger.warning(f"  ⚠️ {name}: {source_result.get('status', 'error')}")
+                    all_prices = [price for price in history_prices.values() if price]
+
+                    # Источники, ответившие устаревшей ценой из кэша (обновляются в фоне)
+                    stale_sources = [
+                        source for source, source_result in source_results.items() if source_result.get('stale')
+                    ]
 
                     if all_prices:
                         min_price = min(all_prices)
                         avg_price = round(sum(all_prices) / len(all_prices), 2)
 
-                        cursor.execute(
-                            """UPDATE tasks SET
+                        task_update = (
+                            f"""UPDATE tasks SET
                                 status = 'DONE',
                                 min_price = ?,
                                 avg_price = ?,
-                                zzap_min_price = ?,
-                                stparts_min_price = ?,
-                                trast_min_price = ?,
-                                autovid_min_price = ?,
-                                autotrade_min_price = ?,
                                 brand = ?,
                                 result_url = ?,
+                                stale_sources = ?,
                                 completed_at = CURRENT_TIMESTAMP
-                            WHERE id = ?""",
+                            WHERE id IN ({task_ids_placeholders})""",
                             (
                                 min_price,
                                 avg_price,
-                                zzap_min,
-                                stparts_min,
-                                trast_min,
-                                autovid_min,
-                                autotrade_min,
                                 brand,
                                 zzap_result.get('url') or stparts_result.get('url') or trast_result.get('url') or autovid_result.get('url') or autotrade_result.get('url'),
-                                task_id
+                                ",".join(stale_sources) or None,
+                                *task_ids
                             )
                         )
 
@@ -526,26 +530,19 @@ async def process_tasks():
                         logger.info(f"   📊 Средняя: {avg_price}₽")
                         if brand:
                             logger.info(f"   🏷️ Бренд: {brand}")
-                        if zzap_min:
-                            logger.info(f"   🔵 ZZAP: {zzap_min}₽")
-                        if stparts_min:
-                            logger.info(f"   🟢 STparts: {stparts_min}₽")
-                        if trast_min:
-                            logger.info(f"   🟠 Trast: {trast_min}₽")
-                        if autovid_min:
-                            logger.info(f"   🟣 AutoVID: {autovid_min}₽")
-                        if autotrade_min:
-                            logger.info(f"   🟤 AutoTrade: {autotrade_min}₽")
+                        for icon, name, source_min in zip("🔵🟢🟠🟣🟤", parser_names, history_prices.values()):
+                            if source_min:
+                                logger.info(f"   {icon} {name}: {source_min}₽")
 
                     else:
                         error_msg = f"ZZAP: {zzap_result.get('status')}, STparts: {stparts_result.get('status')}, Trast: {trast_result.get('status')}, AutoVID: {autovid_result.get('status')}, AutoTrade: {autotrade_result.get('status')}"
-                        cursor.execute(
-                            """UPDATE tasks SET
+                        task_update = (
+                            f"""UPDATE tasks SET
                                 status = 'ERROR',
                                 error_message = ?,
                                 completed_at = CURRENT_TIMESTAMP
-                            WHERE id = ?""",
-                            (error_msg, task_id)
+                            WHERE id IN ({task_ids_placeholders})""",
+                            (error_msg, *task_ids)
                         )
                         logger.error(f"❌ Задача #{task_id}: цены не найдены")
 
@@ -569,27 +566,50 @@ async def process_tasks():
                     print(f"[TIMING] Таймаут: {SITE_TIMEOUT} сек (на каждый парсер)")
                     print(f"[TIMING] {'='*60}\n")
 
-                    conn.commit()
+                    # История и статус задачи - параллельно, каждая запись в очереди писателя своего файла
+                    # (в одном файле - одна очередь: кэш -> история -> статус)
+                    await asyncio.gather(
+                        history_writer.write(write_price_history, partnumber, brand, history_prices),
+                        tasks_writer.write(write_task_result, task_update, task_ids, source_results),
+                    )
+
+                    # Recycling страниц в фоне (между задачами, вне критического пути)
+                    for client in (zzap_client, stparts_client, trast_client, autovid_client, autotrade_client):
+                        client.schedule_page_recycle()
 
                 else:
-                    logger.debug("💤 Нет задач, ожидание...")
-                    await asyncio.sleep(2)
+                    # Нет задач - время для фоновых обновлений устаревших цен и прогрева
+                    refresh_key = price_cache.refresh_queue.pop()
+                    warm_key = None
+                    if not refresh_key and cache_warmer:
+                        warm_key = cache_warmer.next_refresh()
+                    if refresh_key or warm_key:
+                        # Не держим подключение (и блокировку чтения) на время живого поиска
+                        conn.close()
+                        conn = None
+                        if refresh_key:
+                            stale_partnumber, stale_brand, stale_source = refresh_key
+                            await refresh_stale_price(stale_source, stale_partnumber, stale_brand)
+                        else:
+                            warm_partnumber, warm_brand, warm_source = warm_key
+                            await refresh_stale_price(warm_source, warm_partnumber, warm_brand, reason="популярного артикула")
+                    elif last_compact is None or time.monotonic() - last_compact >= PRICE_CACHE_COMPACT_INTERVAL_MIN * 60:
+                        conn.close()
+                        conn = None
+                        last_compact = time.monotonic()
+                        await compact_price_cache()
+                        await prune_history()
+                        await archive_tasks()
+                    else:
+                        logger.debug("💤 Нет задач, ожидание...")
+                        await asyncio.sleep(2)
 
             except Exception as e:
                 logger.error(f"❌ Ошибка worker: {e}", exc_info=True)
 
-                if task_id and conn:
+                if task_id:
                     try:
-                        cursor = conn.cursor()
-                        cursor.execute(
-                            """UPDATE tasks SET
-                                status = 'ERROR',
-                                error_message = ?,
-                                completed_at = CURRENT_TIMESTAMP
-                            WHERE id = ?""",
-                            (str(e), task_id)
-                        )
-                        conn.commit()
+                        await tasks_writer.write(mark_tasks_failed, task_ids or [task_id], str(e))
                     except:
                         pass
 
@@ -601,6 +621,13 @@ async def process_tasks():
     
     # Закрываем все клиенты
     finally:
+        cache_writer.submit(write_cache_stats, cache_stats.take_pending())
+        for writer in {id(writer): writer for writer in db_writers.values()}.values():
+            writer.close()
+            logger.info(f"💾 Записей в {writer.db_path.name}: {writer.writes}, транзакций: {writer.batches}")
+        price_cache.close()
+        brand_cache.close()
+        close_pools()
         logger.info("🔌 Закрытие всех клиентов...")
         await asyncio.gather(
             zzap_client.disconnect() if hasattr(zzap_client, 'disconnect') else asyncio.sleep(0),
@@ -15,6 +15,7 @@ from typing import Dict, Any, List
 from playwright.async_api import TimeoutError as PlaywrightTimeout
 
 from base_browser_client import BaseBrowserClient
+from offline_parsers import parse_zzap_modal_rows, zzap_matches_brand_filter
 
 logger = logging.getLogger(__name__)
 
@@ -39,21 +40,6 @@ class ZZapCDPClient(BaseBrowserClient):
         """
         return True
 
-    async def keep_alive(self) -> None:
-        """Keep-alive для zzap.ru."""
-        try:
-            logger.debug("[zzap] Keep-alive ping...")
-
-            await self.page.evaluate('''
-                fetch("https://www.zzap.ru/", {method: "HEAD", credentials: "include"})
-                    .catch(() => {});
-            ''')
-
-            logger.debug("[zzap] Keep-alive OK")
-
-        except Exception as e:
-            logger.warning(f"[zzap] Keep-alive ошибка: {e}")
-
     # ========== Методы поиска ==========
 
     async def search_part(self, partnumber: str, brand_filter: str = None) -> Dict[str, Any]:
@@ -73,9 +59,13 @@ class ZZapCDPClient(BaseBrowserClient):
 
             # Обработка модального окна выбора бренда
             modal_popup = self.page.locator('#ctl00_TopPanel_HeaderPlace_GridLayoutSearchControl_SearchSuggestPopupControl_PWC-1')
+            modal_brands = []  # все бренды артикула из модального окна (для кэша брендов)
 
             try:
                 await modal_popup.wait_for(state='visible', timeout=5000)
+                modal_brands = parse_zzap_modal_rows(
+                    await modal_popup.locator("tr[id*='DXDataRow']").all_inner_texts()
+                )
 
                 if brand_filter:
                     # Ищем строку с нужным брендом
@@ -107,6 +97,7 @@ class ZZapCDPClient(BaseBrowserClient):
                     'partnumber': partnumber,
                     'status': 'NO_RESULTS',
                     'prices': None,
+                    'brands': modal_brands,
                     'url': self.page.url
                 }
 
@@ -167,6 +158,8 @@ class ZZapCDPClient(BaseBrowserClient):
                     'status': 'NO_RESULTS',
                     'prices': None,
                     'brand': brand,
+                    'brands': modal_brands,
+                    'offers': data['offers'],
                     'url': self.page.url
                 }
 
@@ -185,6 +178,8 @@ class ZZapCDPClient(BaseBrowserClient):
                     'avg': avg_price
                 },
                 'brand': brand,
+                'brands': modal_brands,
+                'offers': data['offers'],
                 'url': self.page.url
             }
 
@@ -294,22 +289,10 @@ class ZZapCDPClient(BaseBrowserClient):
                 await modal_popup.wait_for(state='visible', timeout=8000)
                 logger.info("[zzap] Модальное окно появилось")
 
-                # Извлекаем бренды из строк
-                rows = modal_popup.locator("tr[id*='DXDataRow']")
-                count = await rows.count()
-                logger.info(f"[zzap] Найдено {count} вариантов брендов")
-
-                for i in range(count):
-                    row = rows.nth(i)
-                    row_text = await row.inner_text()
-
-                    # Формат строки: "BRAND\tPARTNUMBER\tDescription"
-                    # Извлекаем первую часть - бренд
-                    parts = row_text.strip().split('\t')
-                    if parts:
-                        brand = parts[0].strip()
-                        if brand and brand not in brands:
-                            brands.append(brand)
+                # Извлекаем бренды из строк (формат: "BRAND\tPARTNUMBER\tDescription") одним вызовом
+                row_texts = await modal_popup.locator("tr[id*='DXDataRow']").all_inner_texts()
+                logger.info(f"[zzap] Найдено {len(row_texts)} вариантов брендов")
+                brands = parse_zzap_modal_rows(row_texts)
 
                 logger.info(f"[zzap] Найденные бренды: {brands}")
 
@@ -345,6 +328,7 @@ class ZZapCDPClient(BaseBrowserClient):
         - Цены в ячейках с классом 'pricewhitecell' в формате "3 083р."
         """
         prices = []
+        offers = []  # все строки с ценой, без фильтра бренда (для кэша)
         brand = None
         filtered_count = 0
         total_count = 0
@@ -357,7 +341,7 @@ class ZZapCDPClient(BaseBrowserClient):
 
             if not await table.is_visible(timeout=5000):
                 logger.warning("[zzap] Таблица не видна")
-                return {'prices': prices, 'brand': brand}
+                return {'prices': prices, 'brand': brand, 'offers': offers}
 
             rows = await table.locator("tr").all()
             total_rows = len(rows)
@@ -437,29 +421,24 @@ class ZZapCDPClient(BaseBrowserClient):
                                     brand = row_brand
                                     logger.info(f"[zzap] Найден бренд: {brand}")
 
-                    # Если указан фильтр по бренду - пропускаем строки с другим брендом
+                    # Если указан фильтр по бренду - цены строк с другим брендом не учитываем,
+                    # но строка всё равно попадает в offers
+                    brand_matches = True
                     if brand_filter:
                         total_count += 1
                         # Если не удалось определить бренд строки - пропускаем
                         if not row_brand:
                             continue
                         
-                        # Проверяем: бренд должен начинаться с фильтра ИЛИ содержать его
+                        # Бренд должен содержать фильтр (та же проверка - у кэша, price_cache.py)
                         # Примеры: "FORD" → проходит "FORD", "FORD JMC", "FORD USA"
-                        brand_filter_lower = brand_filter.lower()
-                        row_brand_lower = row_brand.lower()
-                        
-                        brand_matches = (
-                            row_brand_lower.startswith(brand_filter_lower) or
-                            brand_filter_lower in row_brand_lower
-                        )
+                        brand_matches = zzap_matches_brand_filter(row_brand, brand_filter)
                         
                         if not brand_matches:
                             logger.debug(f"[zzap] Пропуск: бренд '{row_brand}' не соответствует фильтру '{brand_filter}'")
-                            continue
-                        
-                        filtered_count += 1
-                        logger.debug(f"[zzap] Бренд совпал: '{row_brand}' соответствует фильтру '{brand_filter}'")
+                        else:
+                            filtered_count += 1
+                            logger.debug(f"[zzap] Бренд совпал: '{row_brand}' соответствует фильтру '{brand_filter}'")
 
                     # Логируем поставщика для отладки (ячейка с названием магазина)
                     supplier_name = ""
@@ -522,14 +501,24 @@ class ZZapCDPClient(BaseBrowserClient):
                     
                     # Если нашли цену в ячейке
                     if price:
-                        # Добавляем цену в список
-                        prices.append(price)
                         # Логируем статус товара для отладки
                         status_info = ""
                         if "под заказ" in row_text_lower:
                             status_info = " [под заказ]"
                         elif "в наличии" in row_text_lower:
                             status_info = " [в наличии]"
+
+                        offers.append({
+                            'brand': row_brand,
+                            'price': price,
+                            'stock': status_info.strip(' []') or None,
+                            'title': supplier_name or None,
+                        })
+                        if not brand_matches:
+                            continue
+
+                        # Добавляем цену в список
+                        prices.append(price)
                         
                         # Детальное логирование найденной цены
                         logger.info(f"[zzap] ✅ НАЙДЕНА ЦЕНА: {price}₽{status_info} | ID: {row_id} | ячейка {price_cell_index} | поставщик: {supplier_name} | бренд: {row_brand}")
@@ -551,7 +540,7 @@ class ZZapCDPClient(BaseBrowserClient):
         except Exception as e:
             logger.error(f"[zzap] Ошибка извлечения данных: {e}")
 
-        return {'prices': prices, 'brand': brand}
+        return {'prices': prices, 'brand': brand, 'offers': offers}
 
 
 # ========== Тест ==========